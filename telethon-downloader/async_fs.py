@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import shutil
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import logger
+from constants import EnvironmentReader
+from utils import Utils
+
+
+class AsyncFS:
+    """
+    Operaciones de sistema de archivos fuera del event loop
+
+    En montajes NFS o SMB un stat, un chown o un rename pueden tardar
+    cientos de milisegundos; aquí se ejecutan en un pool de FS_MAX_WORKERS
+    hilos para que el progreso de las demás descargas y los eventos
+    entrantes no se detengan. Las operaciones compuestas (mover un
+    archivo, enlazar un duplicado) son un solo trabajo del pool que reutiliza
+    el resultado de cada stat en vez de repetir exists/isdir/isfile.
+    """
+
+    def __init__(self, utils=None):
+        self.constants = EnvironmentReader()
+        self.utils = utils or Utils()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, self.constants.get_variable("FS_MAX_WORKERS")),
+            thread_name_prefix="fs",
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """Ejecuta func(*args, **kwargs) en el pool de E/S"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def create_folders(self, path):
+        return await self.run(self.utils.create_folders, path)
+
+    async def create_folder(self, path):
+        return await self.run(self.utils.create_folder, path)
+
+    async def change_owner_permissions(self, path):
+        return await self.run(self.utils.change_owner_permissions, path)
+
+    async def change_owner_permissions_tree(self, path):
+        """Permisos recursivos; ver Utils.change_owner_permissions_tree"""
+        return await self.run(self.utils.change_owner_permissions_tree, path)
+
+    async def rename_file(self, old_path, new_path):
+        return await self.run(self.utils.rename_file, old_path, new_path)
+
+    async def rename(self, source, destination):
+        return await self.run(os.rename, source, destination)
+
+    async def remove(self, path):
+        return await self.run(os.remove, path)
+
+    async def exists(self, path):
+        return await self.run(os.path.exists, path)
+
+    async def copy_file(self, source, destination, progress=None):
+        return await self.run(self.utils.copy_file, source, destination, progress)
+
+    async def prepare_move(self, source, final_path, unique_path=None):
+        """
+        Prepara el movimiento de source a final_path en un solo trabajo:
+        crea la carpeta de destino, resuelve el nombre libre y decide si
+        basta con un rename
+
+        Args:
+            source: Archivo o carpeta a mover
+            final_path: Ruta destino deseada
+            unique_path: Función que devuelve una ruta libre para final_path
+
+        Returns:
+            dict: final_path, is_dir y same_device
+        """
+        return await self.run(self._prepare_move, source, final_path, unique_path)
+
+    def _prepare_move(self, source, final_path, unique_path):
+        directory = os.path.dirname(final_path)
+        self.utils.create_folder(directory)
+        if unique_path:
+            final_path = unique_path(final_path)
+
+        source_stat = os.stat(source)
+        is_dir = stat.S_ISDIR(source_stat.st_mode)
+        same_device = source_stat.st_dev == os.stat(directory).st_dev
+        return {"final_path": final_path, "is_dir": is_dir, "same_device": same_device}
+
+    async def move(self, source, final_path, is_dir=False):
+        """
+        Mueve dentro del mismo dispositivo (o una carpeta con shutil.move)
+
+        Un archivo se mueve con os.rename, que lanza OSError EXDEV si origen
+        y destino son montajes distintos aunque compartan st_dev; quien
+        llama decide entonces copiar con progreso (ver moveFile)
+        """
+        if is_dir:
+            return await self.run(shutil.move, source, final_path)
+        await self.run(os.rename, source, final_path)
+        return final_path
+
+    async def link(self, source, link_path):
+        """
+        Crea un enlace duro con su carpeta y permisos en un solo trabajo
+
+        Returns:
+            bool: True si se creó el enlace
+        """
+        return await self.run(self._link, source, link_path)
+
+    def _link(self, source, link_path):
+        try:
+            self.utils.create_folder(os.path.dirname(link_path))
+            os.link(source, link_path)
+            self.utils.change_owner_permissions(link_path)
+            return True
+        except OSError as e:
+            logger.logger.error(f"AsyncFS link Exception: {source} -> {link_path} [{e}]")
+            return False
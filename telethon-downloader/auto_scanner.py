@@ -18,6 +18,8 @@ class AutoScanner:
         self.min_file_size = self.constants.get_variable("AUTO_SCAN_MIN_SIZE_MB") * 1024 * 1024  # MB a bytes
         self.notify_user = self.constants.get_variable("AUTO_SCAN_NOTIFY_USER")
         self.whitelist_only = self.constants.get_variable("AUTO_SCAN_WHITELIST_ONLY")
+        self.skipped_files = 0
+        self.skipped_bytes = 0
         
         logger.logger.info(f"AutoScanner initialized:")
         logger.logger.info(f"  - Enabled: {self.enabled}")
@@ -189,6 +191,17 @@ class AutoScanner:
             if not file_info:
                 return False
             
+            # Omitir documentos ya descargados desde otro grupo
+            duplicate = await self.bot.deduplicate(message)
+            if duplicate:
+                self.skipped_files += 1
+                self.skipped_bytes += duplicate['size']
+                logger.logger.info(
+                    f"Auto-download skipped, already downloaded: {file_info['filename']} "
+                    f"=> {duplicate['link_path'] or duplicate['file_path']}"
+                )
+                return True
+            
             # Notificar al usuario si está habilitado
             await self.notify_auto_download(file_info)
             
@@ -197,7 +210,7 @@ class AutoScanner:
             
             # Crear una tarea asíncrona para la descarga
             asyncio.create_task(
-                self.bot.download_media_with_retries(message)
+                self.bot.download_media_with_retries(message, source="auto")
             )
             
             return True
@@ -219,5 +232,7 @@ class AutoScanner:
             'min_file_size_mb': self.constants.get_variable('AUTO_SCAN_MIN_SIZE_MB'),
             'notify_user': self.notify_user,
             'whitelist_only': self.whitelist_only,
-            'total_monitored_groups': len(self.monitored_groups)
+            'total_monitored_groups': len(self.monitored_groups),
+            'skipped_files': self.skipped_files,
+            'skipped_mb': round(self.skipped_bytes / (1024 * 1024), 2)
         }
\ No newline at end of file
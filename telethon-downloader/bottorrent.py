@@ -12,15 +12,16 @@ from telethon.tl.types import (
     PeerChannel,
 )
 from telethon.utils import get_peer_id, resolve_id
+from telethon.errors import FloodWaitError
 import yt_dlp
 
 import os
 import re
 import ast
+import errno
 import time
 import shutil
 import asyncio
-import requests
 from pathlib import Path
 from urllib.parse import urlparse
 from datetime import timedelta
@@ -32,12 +33,19 @@ from youtube import YouTubeDownloader
 from command_handler import CommandHandler
 from language_templates import LanguageTemplates
 from file_extractor import FileExtractor
-from download_manager import DownloadPathManager
+from volume_sets import VolumeSetTracker
 from pending_messages_handler import PendingMessagesHandler
-from db_downloads import DownloadFilesDB
+from db_downloads import DownloadFilesDB, DocumentIndexDB
 from utils import Utils
+from async_fs import AsyncFS
+from post_processor import PostProcessor
 from group_scanner import GroupScanner
 from auto_scanner import AutoScanner
+from parallel_downloader import ParallelDownloader
+from http_downloader import HttpDownloader
+from download_scheduler import DownloadScheduler
+from concurrency_controller import AdaptiveConcurrencyController
+from progress_bus import ProgressBus
 
 
 class TelegramBot:
@@ -48,11 +56,15 @@ class TelegramBot:
 
         self.constants = EnvironmentReader()
         self.utils = Utils()
+        self.fs = AsyncFS(self.utils)
+        self.volume_sets = VolumeSetTracker()
+        self.post_processor = PostProcessor()
         self.templatesLanguage = LanguageTemplates(
             language=self.constants.get_variable("LANGUAGE")
         )
         self.pendingMessagesHandler = PendingMessagesHandler()
         self.downloadFilesDB = DownloadFilesDB()
+        self.documentIndexDB = DocumentIndexDB()
 
         self.SESSION = self.constants.get_variable("SESSION")
         self.API_ID = self.constants.get_variable("API_ID")
@@ -97,13 +109,27 @@ class TelegramBot:
             self.constants.get_variable("ENABLED_7Z") == "True"
             or self.constants.get_variable("ENABLED_7Z") == True
         )
+        self.TG_DOWNLOAD_RESUME = (
+            self.constants.get_variable("TG_DOWNLOAD_RESUME") == "True"
+            or self.constants.get_variable("TG_DOWNLOAD_RESUME") == True
+        )
         self.TG_MAX_PARALLEL = self.constants.get_variable("TG_MAX_PARALLEL")
+        self.TG_STAGING_SAME_DEVICE = (
+            self.constants.get_variable("TG_STAGING_SAME_DEVICE") == "True"
+            or self.constants.get_variable("TG_STAGING_SAME_DEVICE") == True
+        )
+        self.TG_STAGING_DIR_NAME = self.constants.get_variable("TG_STAGING_DIR_NAME")
+        self.DEDUP_ENABLED = self.constants.get_variable("DEDUP_ENABLED")
+        self.DEDUP_ACTION = self.constants.get_variable("DEDUP_ACTION")
+        self.DEDUP_MATCH_DC = self.constants.get_variable("DEDUP_MATCH_DC")
+        self.EXTRACT_VOLUMES_CLEANUP = self.constants.get_variable("EXTRACT_VOLUMES_CLEANUP")
         self.PROGRESS_STATUS_SHOW = int(
             self.constants.get_variable("PROGRESS_STATUS_SHOW")
         )
 
         self.max_retries = 3
-        self.semaphore = asyncio.Semaphore(self.TG_MAX_PARALLEL)
+        self.scheduler = DownloadScheduler(self.TG_MAX_PARALLEL)
+        self.concurrency_controller = AdaptiveConcurrencyController(self.scheduler)
 
         self.TG_DOWNLOAD_PATH = self.constants.get_variable("TG_DOWNLOAD_PATH")
         self.PATH_COMPLETED = self.constants.get_variable("PATH_COMPLETED")
@@ -116,9 +142,7 @@ class TelegramBot:
 
         self.PATH_CONFIG = self.constants.get_variable("PATH_CONFIG")
 
-        self.DEFAULT_PATH_EXTENSIONS = self.getConfigurationManager()
-        self.GROUP_PATH = self.getConfigurationManager("GROUP_PATH")
-        self.SECTIONS = self.getConfigurationManagerAll()
+        self.routing_config = config_manager.RoutingConfig(self.PATH_CONFIG)
 
         self.YOUTUBE_LINKS_SUPPORTED = (
             self.constants.get_variable("YOUTUBE_LINKS_SUPPORTED")
@@ -157,7 +181,12 @@ class TelegramBot:
         self.client.add_event_handler(self.handle_new_message, events.NewMessage)
         self.client.add_event_handler(self.handle_buttons, events.CallbackQuery)
 
-        self.ytdownloader = YouTubeDownloader()
+        self.progress_bus = ProgressBus(self.client, self.templatesLanguage)
+        self.ytdownloader = YouTubeDownloader(
+            self.progress_bus, self.templatesLanguage, self.fs
+        )
+        self.parallel_downloader = ParallelDownloader(self.client)
+        self.http_downloader = HttpDownloader()
         self.command_handler = CommandHandler(self)
         self.group_scanner = GroupScanner(self)
         self.auto_scanner = AutoScanner(self)
@@ -183,6 +212,8 @@ class TelegramBot:
         await self.client.send_message(int(self.TG_AUTHORIZED_USER_ID[0]), msg_txt)
         logger.logger.info("********** START TELETHON DOWNLOADER **********")
 
+        self.concurrency_controller.start()
+
         await self.download_pending_messages()
 
         await self.client.run_until_disconnected()
@@ -237,7 +268,7 @@ class TelegramBot:
         logger.logger.info(f"handle_buttons => data: [{url}] => [{data_list[1]}]")
 
         self.utils.create_folders(self.PATH_YOUTUBE)
-        async with self.semaphore:
+        async with self.scheduler.slot("youtube", label=url):
             if data_list[1] == "V":
                 await event.edit("Downloading video")
                 await self.ytdownloader.downloadVideo(url, event)
@@ -253,9 +284,35 @@ class TelegramBot:
         self.printAttribute("PUID")
         self.printAttribute("PGID")
         self.printAttribute("TG_MAX_PARALLEL")
+        self.printAttribute("TG_SCHEDULER_WEIGHTS")
+        self.printAttribute("TG_SCHEDULER_SMALL_FILE_MB")
+        self.printAttribute("TG_ADAPTIVE_PARALLEL")
+        self.printAttribute("TG_ADAPTIVE_MIN_PARALLEL")
+        self.printAttribute("TG_ADAPTIVE_MAX_PARALLEL")
+        self.printAttribute("TG_ADAPTIVE_INTERVAL")
         self.printAttribute("TG_DL_TIMEOUT")
+        self.printAttribute("TG_DOWNLOAD_WORKERS")
+        self.printAttribute("TG_DOWNLOAD_PART_SIZE_KB")
+        self.printAttribute("TG_DOWNLOAD_PARALLEL_MIN_MB")
+        self.printAttribute("TG_DOWNLOAD_RESUME")
+        self.printAttribute("TG_STAGING_SAME_DEVICE")
+        self.printAttribute("TG_STAGING_DIR_NAME")
+        self.printAttribute("TG_RESUME_CHECKPOINT_MB")
+        self.printAttribute("FS_MAX_WORKERS")
+        self.printAttribute("PERMISSIONS_WORKERS")
+        self.printAttribute("EXTRACT_WORKERS")
+        self.printAttribute("EXTRACT_VOLUMES_CLEANUP")
+        self.printAttribute("POST_WORKERS")
+        self.printAttribute("POST_QUEUE_SIZE")
+        self.printAttribute("HTTP_SEGMENTS")
+        self.printAttribute("HTTP_SEGMENT_MIN_MB")
+        self.printAttribute("HTTP_CHUNK_SIZE_KB")
+        self.printAttribute("HTTP_MAX_PER_HOST")
+        self.printAttribute("HTTP_POOL_HOSTS")
         self.printAttribute("TG_PROGRESS_DOWNLOAD")
         self.printAttribute("PROGRESS_STATUS_SHOW")
+        self.printAttribute("PROGRESS_EDITS_PER_SECOND")
+        self.printAttribute("PROGRESS_MIN_INTERVAL")
         self.printAttribute("YOUTUBE_FORMAT_AUDIO")
         self.printAttribute("YOUTUBE_FORMAT_VIDEO")
         self.printAttribute("YOUTUBE_LINKS_SUPPORTED")
@@ -263,6 +320,11 @@ class TelegramBot:
         self.printAttribute("YOUTUBE_DEFAULT_EXTENSION")
         self.printAttribute("YOUTUBE_SHOW_OPTION")
         self.printAttribute("YOUTUBE_SHOW_OPTION_TIMEOUT")
+        self.printAttribute("YOUTUBE_MAX_WORKERS")
+        self.printAttribute("YOUTUBE_PLAYLIST_WORKERS")
+        self.printAttribute("YOUTUBE_PLAYLIST_RETRIES")
+        self.printAttribute("YOUTUBE_INFO_CACHE_TTL")
+        self.printAttribute("YOUTUBE_INFO_CACHE_SIZE")
         self.printAttribute("ENABLED_UNZIP")
         self.printAttribute("ENABLED_UNRAR")
         self.printAttribute("ENABLED_7Z")
@@ -273,6 +335,11 @@ class TelegramBot:
         self.printAttribute("SCAN_DEFAULT_DAYS")
         self.printAttribute("SCAN_MAX_DAYS")
         self.printAttribute("SCAN_DEFAULT_LIMIT")
+        self.printAttribute("SCAN_SERVER_FILTER")
+        self.printAttribute("SCAN_PAGE_SIZE")
+        self.printAttribute("SCAN_QUEUE_SIZE")
+        self.printAttribute("SCAN_REQUESTS_PER_SECOND")
+        self.printAttribute("SCAN_BATCH_PARALLEL")
         
         # Auto Scanner attributes
         self.printAttribute("AUTO_SCAN_ENABLED")
@@ -280,8 +347,12 @@ class TelegramBot:
         self.printAttribute("AUTO_SCAN_MIN_SIZE_MB")
         self.printAttribute("AUTO_SCAN_NOTIFY_USER")
         self.printAttribute("AUTO_SCAN_WHITELIST_ONLY")
+        self.printAttribute("DEDUP_ENABLED")
+        self.printAttribute("DEDUP_ACTION")
+        self.printAttribute("DEDUP_MATCH_DC")
 
         self.printAttribute("LANGUAGE")
+        self.printAttribute("PENDING_JOURNAL_COMPACT_OPS")
 
         self.printAttribute("BOT_VERSION")
         self.printAttribute("TELETHON_VERSION")
@@ -316,14 +387,6 @@ class TelegramBot:
             )
             logger.logger.info(f"{attribute_name}: {attribute_value}")
 
-    def getConfigurationManager(self, section_keys="DEFAULT_PATH"):
-        self.CONFIG_MANAGER = config_manager.ConfigurationManager(self.PATH_CONFIG)
-        return self.CONFIG_MANAGER.get_section_keys(section_keys)
-
-    def getConfigurationManagerAll(self):
-        self.CONFIG_MANAGER = config_manager.ConfigurationManager(self.PATH_CONFIG)
-        return self.CONFIG_MANAGER.get_all_sections()
-
     def create_directorys(self):
         self.utils.create_folders(self.TG_DOWNLOAD_PATH)
         self.utils.create_folders(self.PATH_TMP)
@@ -357,9 +420,11 @@ class TelegramBot:
             grouped = None
             # Group messages by user_id
             grouped_dict = {}
+            sources = {}
             for item in loaded_messages:
                 user_id = str(item["user_id"])
                 message = item["message"]
+                sources[(user_id, message)] = item.get("source", "interactive")
 
                 if user_id in grouped_dict:
                     grouped_dict[user_id].append(message)
@@ -380,14 +445,22 @@ class TelegramBot:
                 )
 
                 for message in messages:
-                    asyncio.create_task(self.download_media_with_retries(message))
+                    # Cada trabajo vuelve a la cola de su origen (scan, auto...)
+                    asyncio.create_task(
+                        self.download_media_with_retries(
+                            message,
+                            source=sources.get((grouped, message.id), "interactive"),
+                        )
+                    )
 
         except Exception as e:
             logger.logger.error(f"download_pending_messages Exception {grouped}: {e}")
 
-    async def download_media_with_retries(self, event, retry_count=1, message=None):
+    async def download_media_with_retries(
+        self, event, retry_count=1, message=None, source="interactive"
+    ):
         try:
-            download_response = await self.download_media(event, message)
+            download_response = await self.download_media(event, message, source)
             logger.logger.info(
                 f" [!!] download_media_with_retries download_response: [{download_response}] => [{message}]"
             )
@@ -397,22 +470,27 @@ class TelegramBot:
                     logger.logger.error(
                         f"Download failed, retrying... isinstance {retry_count} => [{download_response}]"
                     )
-                    await self.download_media_with_retries(
-                        event, retry_count + 1, download_response["message"]
+                    return await self.download_media_with_retries(
+                        event, retry_count + 1, download_response["message"], source
                     )
 
+            return download_response
+
         except Exception as e:
             if retry_count < self.max_retries:
                 logger.logger.error(
                     f"Download failed, retrying... Attempt {retry_count} => {e}"
                 )
-                await self.download_media_with_retries(event, retry_count + 1)
+                return await self.download_media_with_retries(
+                    event, retry_count + 1, source=source
+                )
             else:
                 logger.logger.error(
                     f"Download failed after {self.max_retries} attempts => {e}"
                 )
+                return {"exception": e, "message": message}
 
-    async def download_media(self, event, message=None):
+    async def download_media(self, event, message=None, source="interactive"):
         try:
             if not message:
                 message = await event.reply("Download in queue...")
@@ -420,15 +498,9 @@ class TelegramBot:
                 message = await message.edit("Download in queue, retrying... ")
                 await asyncio.sleep(3)
 
-            user_or_chat_id = (
-                event.peer_id.user_id
-                if hasattr(event.peer_id, "user_id")
-                else event.peer_id.chat_id
-                if hasattr(event.peer_id, "chat_id")
-                else None
-            )
+            user_or_chat_id = self.get_user_or_chat_id(event)
             self.pendingMessagesHandler.add_pending_message(
-                user_or_chat_id, event.id
+                user_or_chat_id, event.id, source
             ) if user_or_chat_id is not None else None
 
             is_torrent_file = None
@@ -453,46 +525,54 @@ class TelegramBot:
                             "message": download_response["message"],
                         }
 
-                    self.pendingMessagesHandler.remove_pending_message(
-                        user_or_chat_id, event.id
+                    self.remove_pending_after_post(
+                        download_response, user_or_chat_id, event.id
                     )
                     return {
                         "exception": None,
                         "message": message,
                     }
 
-            async with self.semaphore:
+            total_size = (
+                event.media.document.size
+                if isinstance(event.media, MessageMediaDocument)
+                else 0
+            )
+            if isinstance(event.media, (MessageMediaDocument, MessageMediaPhoto)):
+                async with self.scheduler.slot(source, total_size, label=event.id):
+                    message = await message.edit("Download in progress")
+                    if isinstance(event.media, MessageMediaDocument):
+                        download_response = await self.downloadDocumentAttributeFilename(
+                            event, message
+                        )
+                    else:
+                        download_response = await self.downloadMessageMediaPhoto(
+                            event, message
+                        )
+            else:
+                # Los enlaces reservan un hueco del planificador por cada URL
                 message = await message.edit("Download in progress")
-                if isinstance(event.media, MessageMediaDocument):
-                    download_response = await self.downloadDocumentAttributeFilename(
-                        event, message
-                    )
-                elif isinstance(event.media, MessageMediaPhoto):
-                    download_response = await self.downloadMessageMediaPhoto(
-                        event, message
-                    )
-                elif isinstance(event.media, MessageMediaWebPage):
+                if isinstance(event.media, MessageMediaWebPage):
                     download_response = await self.downloadMessageMediaWebPage(
-                        event, message
+                        event, message, source
                     )
                 else:
-                    download_response = await self.downloadLinks(event, message)
-                if isinstance(download_response["exception"], Exception):
-                    logger.logger.info(
-                        f"download_media Exception if: [{download_response}]"
-                    )
-                    return {
-                        "exception": download_response["exception"],
-                        "message": download_response["message"],
-                    }
+                    download_response = await self.downloadLinks(event, message, source)
 
-                self.pendingMessagesHandler.remove_pending_message(
-                    user_or_chat_id, event.id
+            if isinstance(download_response["exception"], Exception):
+                logger.logger.info(
+                    f"download_media Exception if: [{download_response}]"
                 )
                 return {
-                    "exception": None,
-                    "message": message,
+                    "exception": download_response["exception"],
+                    "message": download_response["message"],
                 }
+
+            self.remove_pending_after_post(download_response, user_or_chat_id, event.id)
+            return {
+                "exception": None,
+                "message": message,
+            }
         except Exception as e:
             logger.logger.error(f"Exception 998: {e}")
             message = await message.edit(f"Exception 998: {e} ")
@@ -501,6 +581,55 @@ class TelegramBot:
                 "message": message,
             }
 
+    def remove_pending_after_post(self, download_response, user_or_chat_id, event_id):
+        """
+        Quita el mensaje de pendientes cuando termina su post-proceso; si
+        no se pudo mover el archivo, sigue pendiente y se reintenta al
+        reiniciar
+        """
+        post = download_response.get("post")
+        if post is None:
+            self.pendingMessagesHandler.remove_pending_message(user_or_chat_id, event_id)
+            return
+
+        def done(job):
+            if job.result()["exception"] is None:
+                self.pendingMessagesHandler.remove_pending_message(
+                    user_or_chat_id, event_id
+                )
+
+        post.add_done_callback(done)
+
+    def get_user_or_chat_id(self, event):
+        return (
+            event.peer_id.user_id
+            if hasattr(event.peer_id, "user_id")
+            else event.peer_id.chat_id
+            if hasattr(event.peer_id, "chat_id")
+            else None
+        )
+
+    def get_resume_offset(self, event, file_path):
+        if not self.TG_DOWNLOAD_RESUME:
+            return 0
+
+        pending_file, pending_offset = self.pendingMessagesHandler.get_pending_offset(
+            self.get_user_or_chat_id(event), event.id
+        )
+        offset = pending_offset if pending_file == file_path else 0
+        return max(offset, self.parallel_downloader.get_checkpoint(file_path))
+
+    def resume_checkpoint(self, event, file_path):
+        user_or_chat_id = self.get_user_or_chat_id(event)
+
+        def checkpoint(offset):
+            if user_or_chat_id is not None:
+                self.pendingMessagesHandler.update_pending_offset(
+                    user_or_chat_id, event.id, file_path, offset
+                )
+
+        return checkpoint if self.TG_DOWNLOAD_RESUME else None
+
     async def get_group_name(self, chat_id):
         try:
             chat = await self.client.get_entity(chat_id)
@@ -510,13 +639,14 @@ class TelegramBot:
         except Exception as e:
             return None
 
-    async def downloadMessageMediaWebPage(self, event, message):
+    async def downloadMessageMediaWebPage(self, event, message, source="interactive"):
         try:
             logger.logger.info("downloadMessageMediaWebPage")
-            await self.downloadLinks(event, message)
+            download_response = await self.downloadLinks(event, message, source)
             return {
-                "exception": None,
+                "exception": download_response["exception"],
                 "message": message,
+                "post": download_response.get("post"),
             }
         except Exception as e:
             logger.logger.error(f"downloadMessageMediaWebPage Exception: {e}")
@@ -547,6 +677,7 @@ class TelegramBot:
             return {
                 "exception": download_response["exception"],
                 "message": download_response["message"],
+                "post": download_response.get("post"),
             }
 
         except Exception as e:
@@ -565,6 +696,7 @@ class TelegramBot:
             return {
                 "exception": download_response["exception"],
                 "message": download_response["message"],
+                "post": download_response.get("post"),
             }
 
         except Exception as e:
@@ -579,44 +711,80 @@ class TelegramBot:
 
             megabytes_total = total_size / 1024 / 1024
             download_start_time = time.time()
-            self.utils.create_folders(self.PATH_TMP)
+
+            if isinstance(event.media, MessageMediaDocument):
+                for attr in event.media.document.attributes:
+                    if isinstance(attr, DocumentAttributeFilename):
+                        file_name = f"{attr.file_name}.tmp"
+                        break
+
+            tmp_dir = (
+                await self.fs.run(self.getStagingDir, file_name[:-4], from_id)
+                if file_name
+                else self.PATH_TMP
+            )
+            await self.fs.create_folders(tmp_dir)
 
             message_text = self.templatesLanguage.template("MESSAGE_DOWNLOAD").format(
-                path=self.PATH_TMP
+                path=tmp_dir
             )
             message_text += self.templatesLanguage.template(
                 "MESSAGE_DOWNLOAD_FROM_ID"
             ).format(from_id=from_id)
             message = await message.edit(message_text)
 
-            if isinstance(event.media, MessageMediaDocument):
-                for attr in event.media.document.attributes:
-                    if isinstance(attr, DocumentAttributeFilename):
-                        file_name = f"{attr.file_name}.tmp"
-                        break
-
+            progress = self.progress_callback(message, event.id, from_id, path=tmp_dir)
             loop = asyncio.get_event_loop()
-            task = loop.create_task(
-                self.client.download_media(
-                    event.media,
-                    file=os.path.join(self.PATH_TMP, file_name),
-                    progress_callback=self.progress_callback(
-                        message, event.id, from_id
-                    ),
+            if (
+                file_name
+                and isinstance(event.media, MessageMediaDocument)
+                and (
+                    self.TG_DOWNLOAD_RESUME
+                    or self.parallel_downloader.should_use(total_size)
+                )
+            ):
+                file_path = await self.fs.run(self.getTmpPath, event, tmp_dir, file_name)
+                offset = self.get_resume_offset(event, file_path)
+                if offset:
+                    logger.logger.info(
+                        f"download => resuming: {event.id} > [{file_path}] at {offset} bytes"
+                    )
+                task = loop.create_task(
+                    self.parallel_downloader.download(
+                        event.media,
+                        file_path,
+                        total_size,
+                        progress_callback=progress,
+                        workers=self.parallel_downloader.workers_for(total_size),
+                        offset=offset,
+                        checkpoint_callback=self.resume_checkpoint(event, file_path),
+                    )
+                )
+            else:
+                task = loop.create_task(
+                    self.client.download_media(
+                        event.media,
+                        file=os.path.join(tmp_dir, file_name),
+                        progress_callback=progress,
+                    )
                 )
-            )
             logger.logger.info(
                 f"download => task: {event.id} > {message.id} > [{from_id}] >> [{self.TG_DL_TIMEOUT}]"
             )
 
-            downloaded_file = await asyncio.wait_for(task, timeout=self.TG_DL_TIMEOUT)
+            try:
+                downloaded_file = await asyncio.wait_for(
+                    task, timeout=self.TG_DL_TIMEOUT
+                )
+            finally:
+                await progress.tracker.close()
 
             logger.logger.info(f"download => downloaded_file: {downloaded_file}")
 
             # Check if the downloaded file ends with ".tmp" and remove it from the file name
             if downloaded_file.endswith(".tmp"):
                 file_path = os.path.join(self.PATH_TMP, downloaded_file)
-                os.rename(
+                await self.fs.rename(
                     file_path, file_path[:-4]
                 )  # Remove the last 4 characters (".tmp")
                 logger.logger.info(
@@ -628,7 +796,73 @@ class TelegramBot:
                 f"download => downloaded_file: {event.id} > [{downloaded_file}]"
             )
 
-            downloaded_file = await self.moveFile(downloaded_file, from_id)
+            # Mover, extraer y avisar sigue en el PostProcessor: el hueco de
+            # descarga queda libre al terminar la transferencia
+            post = await self.post_processor.submit(
+                self.postDownload(
+                    event,
+                    message,
+                    downloaded_file,
+                    from_id,
+                    megabytes_total,
+                    download_start_time,
+                ),
+                label=event.id,
+            )
+
+            return {
+                "exception": None,
+                "message": message,
+                "post": post,
+            }
+
+        except asyncio.TimeoutError as e:
+            end_time_short = time.strftime("%H:%M", time.localtime())
+            logger.logger.exception(f"Download TimeoutError Exception: {event.id}")
+            self.concurrency_controller.record_congestion("timeout")
+            self.TG_DL_TIMEOUT = self.TG_DL_TIMEOUT + (60 * 30)
+            message_text = self.templatesLanguage.template("MESSAGE_TIMEOUT_EXCEEDED")
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_AT"
+            ).format(end_time=end_time_short)
+            message = await message.edit(message_text)
+            return {
+                "exception": e,
+                "message": message,
+            }
+
+        except Exception as e:
+            end_time_short = time.strftime("%H:%M", time.localtime())
+            logger.logger.exception(f"Download Exception: {event.id} > {e}")
+            if isinstance(e, FloodWaitError):
+                self.concurrency_controller.record_congestion("FloodWait")
+            message_text = self.templatesLanguage.template("MESSAGE_EXCEPTION")
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_AT"
+            ).format(end_time=end_time_short)
+            message = await message.edit(message_text)
+            return {
+                "exception": e,
+                "message": message,
+            }
+            return e
+
+    async def postDownload(
+        self, event, message, downloaded_file, from_id, megabytes_total, download_start_time
+    ):
+        """
+        Etapa de post-proceso de download(): mueve el archivo a su destino,
+        lo registra, lo extrae y edita el mensaje final. Se ejecuta en el
+        PostProcessor, fuera del hueco del planificador. Lanza una excepción
+        si no se puede mover, para que el mensaje siga pendiente; un fallo de
+        extracción solo se muestra, porque el archivo ya está en su destino y
+        repetir la descarga volvería a fallar igual.
+        """
+        try:
+            moved_file = await self.moveFile(downloaded_file, from_id, message)
+            if moved_file is None:
+                raise RuntimeError(f"moveFile failed: {downloaded_file}")
+            downloaded_file = moved_file
 
             logger.logger.info(
                 f"download => finish moveFile: {event.id} > {downloaded_file}"
@@ -637,9 +871,19 @@ class TelegramBot:
             self.downloadFilesDB.add_download_files(
                 from_id, event.id, message.id, downloaded_file
             )
+            if downloaded_file and isinstance(event.media, MessageMediaDocument):
+                document = event.media.document
+                self.documentIndexDB.add_document(
+                    document.id,
+                    document.size,
+                    document.dc_id,
+                    downloaded_file,
+                    self.get_user_or_chat_id(event),
+                    event.id,
+                )
 
             self.postProcess(downloaded_file)
-            await self.unCompress(downloaded_file)
+            extraction = await self.unCompress(downloaded_file, message)
 
             # asyncio.create_task(extract_unrar("archivo.rar", "destino/", client, chat_id, message_id))
 
@@ -671,46 +915,26 @@ class TelegramBot:
             message_text += self.templatesLanguage.template(
                 "MESSAGE_DOWNLOAD_FROM_ID"
             ).format(from_id=from_id)
+            message_text += self.extractionText(extraction)
             message_text += self.templatesLanguage.template(
                 "MESSAGE_DOWNLOAD_AT"
             ).format(end_time=end_time_short)
 
             message = await message.edit(f"{message_text}")
 
-            return {
-                "exception": None,
-                "message": message,
-            }
-
-        except asyncio.TimeoutError as e:
-            end_time_short = time.strftime("%H:%M", time.localtime())
-            logger.logger.exception(f"Download TimeoutError Exception: {event.id}")
-            self.TG_DL_TIMEOUT = self.TG_DL_TIMEOUT + (60 * 30)
-            message_text = self.templatesLanguage.template("MESSAGE_TIMEOUT_EXCEEDED")
-            message_text += self.templatesLanguage.template(
-                "MESSAGE_DOWNLOAD_AT"
-            ).format(end_time=end_time_short)
-            message = await message.edit(message_text)
-            return {
-                "exception": e,
-                "message": message,
-            }
+            return message
 
         except Exception as e:
             end_time_short = time.strftime("%H:%M", time.localtime())
-            logger.logger.exception(f"Download Exception: {event.id} > {e}")
+            logger.logger.exception(f"postDownload Exception: {event.id} > {e}")
             message_text = self.templatesLanguage.template("MESSAGE_EXCEPTION")
             message_text += self.templatesLanguage.template(
                 "MESSAGE_DOWNLOAD_AT"
             ).format(end_time=end_time_short)
-            message = await message.edit(message_text)
-            return {
-                "exception": e,
-                "message": message,
-            }
-            return e
+            await message.edit(message_text)
+            raise
 
-    async def downloadLinks(self, event, message):
+    async def downloadLinks(self, event, message, source="interactive"):
         try:
             logger.logger.info(f"downloadLinks => event.message: {event.message}")
 
@@ -724,17 +948,21 @@ class TelegramBot:
                     task = self.youTubeDownloader(message, url)
                     tasks.append(task)
                 elif all([urlparse(url).scheme, urlparse(url).netloc]):
-                    task = self.download_url_file(message, url)
+                    task = self.download_url_file_slot(message, url, source)
                     tasks.append(task)
 
+            posts = []
             if tasks:
-                await asyncio.gather(*tasks)
+                # download_url_file devuelve el trabajo del PostProcessor
+                results = await asyncio.gather(*tasks)
+                posts = [result for result in results if isinstance(result, asyncio.Future)]
             else:
                 logger.logger.info(f"downloadLinks => NO ULRS: {urls}")
                 await message.delete()
             return {
                 "exception": None,
                 "message": message,
+                "post": asyncio.ensure_future(self.gather_posts(posts)) if posts else None,
             }
         except Exception as e:
             logger.logger.error(f"downloadLinks Exception: {e}")
@@ -743,57 +971,250 @@ class TelegramBot:
                 "message": message,
             }
 
-    async def moveFile(self, file_path, from_id=None):
-        try:
-            logger.logger.info(f"moveFile file_path: {file_path}")
-            logger.logger.info(f"moveFile from_id: {from_id}")
-            final_path = None
+    async def gather_posts(self, posts):
+        """
+        Une varios trabajos del PostProcessor en uno solo, con la primera
+        excepción que haya, para remove_pending_after_post()
+        """
+        jobs = await asyncio.gather(*posts)
+        return {
+            "exception": next((job["exception"] for job in jobs if job["exception"]), None),
+            "result": [job["result"] for job in jobs],
+        }
+
+    async def download_url_file_slot(self, message, url, source="interactive"):
+        """
+        Descarga un enlace dentro de un hueco del planificador y del
+        límite por host, para que un mensaje con muchos enlaces no los
+        lance todos a la vez contra el mismo servidor. El hueco del
+        planificador se pide dentro del de host: un enlace que espera a un
+        servidor saturado no bloquea descargas de Telegram o YouTube.
+        """
+        async with self.http_downloader.host_slot(url):
+            async with self.scheduler.slot(source, label=url):
+                return await self.download_url_file(message, url)
+
+    def getDestinationPath(self, file_path, from_id=None, unique=True):
+        """
+        Ruta final de un archivo según las reglas de config.ini; con
+        unique añade un sufijo " (n)" si ya existe un archivo con ese nombre
+        """
+        final_path, _ = self.getRoute(file_path, from_id)
+        return self.getUniquePath(final_path) if unique else final_path
+
+    def getRoute(self, file_path, from_id=None):
+        """
+        Resuelve la regla de config.ini que decide el destino de un archivo
+
+        Returns:
+            tuple: (ruta final, descripción de la regla aplicada)
+        """
+        path_obj = Path(file_path)
+
+        basename = path_obj.name
+        filename = path_obj.stem
+        extension = path_obj.suffix
+
+        routing = self.routing_config.snapshot()
+
+        if file_path.endswith(".torrent"):
+            return os.path.join(self.TG_DOWNLOAD_PATH_TORRENTS, basename), "torrent"
+        if str(from_id) in routing.group_path:
+            return (
+                os.path.join(routing.group_path[str(from_id)], basename),
+                f"GROUP_PATH {from_id}",
+            )
+        logger.logger.info(f"getRoute :::: filename=[{filename}]")
+        if rule := routing.path_manager.match(filename):
+            return os.path.join(rule["path"], basename), f"REGEX_PATH {rule['rule']}"
+        if extension[1:] in routing.default_path:
+            return (
+                os.path.join(routing.default_path[extension[1:]], basename),
+                f"DEFAULT_PATH {extension[1:]}",
+            )
+        return os.path.join(self.PATH_COMPLETED, basename), "PATH_COMPLETED"
+
+    def getUniquePath(self, final_path):
+        path_obj = Path(final_path)
+        directorio_base = path_obj.parent
+        if os.path.exists(final_path):
+            destination_filename = path_obj.name
+            counter = 1
+            while os.path.exists(
+                os.path.join(directorio_base, destination_filename)
+            ):
+                destination_filename = f"{path_obj.stem} ({counter}){path_obj.suffix}"
+                counter += 1
+            final_path = os.path.join(directorio_base, destination_filename)
+        return final_path
+
+    def find_duplicate(self, event):
+        """
+        Busca en el índice de documentos una copia ya descargada del
+        documento del mensaje
+
+        Returns:
+            dict: Entrada del índice, o None si no hay copia en disco
+        """
+        if not self.DEDUP_ENABLED or not isinstance(event.media, MessageMediaDocument):
+            return None
+        document = event.media.document
+        if not document:
+            return None
 
-            path_obj = Path(file_path)
+        found = self.documentIndexDB.get_document(
+            document.id, document.size, document.dc_id if self.DEDUP_MATCH_DC else None
+        )
+        if found and not os.path.exists(found["file_path"]):
+            self.documentIndexDB.remove_document(document.id, document.size)
+            return None
+        return found
 
-            basename = path_obj.name
-            filename = path_obj.stem
-            extension = path_obj.suffix
-            directory = path_obj.parent
+    async def deduplicate(self, event):
+        """
+        Evita volver a descargar un documento que ya está en disco
 
-            self.DEFAULT_PATH_EXTENSIONS = self.getConfigurationManager()
-            self.GROUP_PATH = self.getConfigurationManager("GROUP_PATH")
-            self.REGEX_PATH = self.getConfigurationManager("REGEX_PATH")
+        Con DEDUP_ACTION=link crea un enlace duro a la copia existente en la
+        ruta que correspondería al mensaje; con skip solo lo omite.
 
-            self.SECTIONS = self.getConfigurationManagerAll()
-            self.DownloadPathManager = DownloadPathManager(self.SECTIONS)
+        Returns:
+            dict: file_path existente, link_path (o None) y size, o None si
+            el documento no se había descargado
+        """
+        duplicate = await self.fs.run(self.find_duplicate, event)
+        if not duplicate:
+            return None
 
-            if file_path.endswith(".torrent"):
-                final_path = os.path.join(self.TG_DOWNLOAD_PATH_TORRENTS, basename)
-            elif str(from_id) in self.GROUP_PATH:
-                final_path = os.path.join(
-                    self.CONFIG_MANAGER.get_value("GROUP_PATH", str(from_id)), basename
-                )
-            elif downloadPath := self.DownloadPathManager.getREGEXPATH(filename):
-                final_path = os.path.join(downloadPath, basename)
-            elif extension[1:] in self.DEFAULT_PATH_EXTENSIONS:
-                final_path = os.path.join(
-                    self.CONFIG_MANAGER.get_value("DEFAULT_PATH", extension[1:]),
-                    basename,
+        document = event.media.document
+        link_path = None
+        if self.DEDUP_ACTION == "link":
+            file_name = next(
+                (attr.file_name for attr in document.attributes if isinstance(attr, DocumentAttributeFilename)),
+                os.path.basename(duplicate["file_path"]),
+            )
+            from_id = self.resolve_id(event.fwd_from) if event.fwd_from else None
+            target = self.getDestinationPath(file_name, from_id, unique=False)
+            if os.path.abspath(target) != os.path.abspath(duplicate["file_path"]):
+                link_path = await self.fs.run(self.getUniquePath, target)
+                if not await self.fs.link(duplicate["file_path"], link_path):
+                    link_path = None
+
+        logger.logger.info(
+            f"deduplicate => {event.id} already downloaded: {duplicate['file_path']} "
+            f"link: {link_path} ({document.size / 1024 / 1024:.2f} MB skipped)"
+        )
+        return {
+            "file_path": duplicate["file_path"],
+            "link_path": link_path,
+            "size": document.size,
+        }
+
+    def getStagingDir(self, file_name, from_id=None):
+        """
+        Carpeta temporal en el mismo dispositivo que el destino del archivo,
+        para que moveFile sea un rename y no una copia. Si el destino está
+        en otro volumen se usa TG_STAGING_DIR_NAME en su punto de montaje;
+        si no se puede escribir allí se usa PATH_TMP.
+        """
+        if not self.TG_STAGING_SAME_DEVICE:
+            return self.PATH_TMP
+        try:
+            destination = Path(
+                self.getDestinationPath(file_name, from_id, unique=False)
+            ).parent
+            if self.utils.same_device(self.PATH_TMP, destination):
+                return self.PATH_TMP
+
+            staging_dir = os.path.join(
+                self.utils.mount_point(destination), self.TG_STAGING_DIR_NAME
+            )
+            self.utils.create_folder(staging_dir)
+            if os.access(staging_dir, os.W_OK):
+                logger.logger.info(
+                    f"getStagingDir => {file_name}: {staging_dir} (destination {destination})"
                 )
-            else:
-                final_path = os.path.join(self.PATH_COMPLETED, basename)
+                return staging_dir
+        except Exception as e:
+            logger.logger.error(f"getStagingDir Exception: {file_name} [{e}]")
+        return self.PATH_TMP
+
+    def getTmpPath(self, event, tmp_dir, file_name):
+        """
+        Ruta del .tmp de un documento; si hay una descarga a medias
+        registrada se reutiliza su ruta aunque el destino haya cambiado
+        """
+        file_path = os.path.join(tmp_dir, file_name)
+        if self.TG_DOWNLOAD_RESUME:
+            pending_file, _ = self.pendingMessagesHandler.get_pending_offset(
+                self.get_user_or_chat_id(event), event.id
+            )
+            if (
+                pending_file
+                and pending_file != file_path
+                and os.path.basename(pending_file) == file_name
+                and os.path.exists(pending_file)
+            ):
+                return pending_file
+        return file_path
 
+    async def moveFile(self, file_path, from_id=None, message=None):
+        try:
+            logger.logger.info(f"moveFile file_path: {file_path}")
+            logger.logger.info(f"moveFile from_id: {from_id}")
+
+            # Carpeta destino, nombre libre y tipo de movimiento en un solo
+            # trabajo del pool de E/S
+            move = await self.fs.prepare_move(
+                file_path,
+                self.getDestinationPath(file_path, from_id, unique=False),
+                self.getUniquePath,
+            )
+            final_path = move["final_path"]
             directorio_base = Path(final_path).parent
-            if os.path.exists(final_path):
-                destination_filename = basename
-                counter = 1
-                while os.path.exists(
-                    os.path.join(directorio_base, destination_filename)
-                ):
-                    destination_filename = f"{filename} ({counter}){extension}"
-                    counter += 1
-                final_path = os.path.join(directorio_base, destination_filename)
-
-            self.utils.create_folders(directorio_base)
-            final_path = shutil.move(file_path, final_path)
-            logger.logger.info(f"shutil.move final_path: {final_path}")
-            self.utils.change_owner_permissions(final_path)
+
+            copy = not (move["is_dir"] or move["same_device"])
+            if not copy:
+                try:
+                    final_path = await self.fs.move(file_path, final_path, move["is_dir"])
+                except OSError as e:
+                    # Dos bind mounts de Docker del mismo disco comparten
+                    # st_dev, pero rename entre ellos falla con EXDEV
+                    if e.errno != errno.EXDEV:
+                        raise
+                    logger.logger.info(f"moveFile rename EXDEV, copying: {file_path}")
+                    copy = True
+            if copy:
+                # Copia inevitable entre volúmenes: en un hilo y con progreso
+                logger.logger.info(
+                    f"moveFile cross-device copy: {file_path} -> {final_path}"
+                )
+                tracker = (
+                    self.progress_bus.track(
+                        message,
+                        self.templatesLanguage.template("PROGRESS_CALLBACK_MOVE").format(
+                            path=directorio_base
+                        ),
+                        final_path,
+                    )
+                    if message
+                    else None
+                )
+                try:
+                    await self.fs.copy_file(
+                        file_path,
+                        final_path,
+                        tracker.update if tracker else None,
+                    )
+                finally:
+                    if tracker:
+                        await tracker.close()
+                await self.fs.remove(file_path)
+            logger.logger.info(f"moveFile moved final_path: {final_path}")
+            self.volume_sets.add_part(final_path)
+            if move["is_dir"]:
+                await self.fs.change_owner_permissions_tree(final_path)
+            else:
+                await self.fs.change_owner_permissions(final_path)
             logger.logger.info(f"moveFile final_path: {final_path}")
 
             return final_path
@@ -801,7 +1222,40 @@ class TelegramBot:
         except Exception as e:
             logger.logger.error(f"moveFile Exception : {file_path} [{e}]")
 
-    async def unCompress(self, file_path):
+    def extractionText(self, extraction):
+        """Líneas de resultado de la extracción para el mensaje final"""
+        if not extraction:
+            return ""
+        if "waiting" in extraction:
+            return self.templatesLanguage.template(
+                "MESSAGE_VOLUMES_WAITING",
+                "Archive {base}: {found} volumes so far, waiting for the rest",
+            ).format(
+                base=extraction["waiting"]["base"], found=extraction["waiting"]["found"]
+            )
+        if not extraction["success"]:
+            return self.templatesLanguage.template(
+                "MESSAGE_EXTRACT_FAILED", "Extraction failed: {error}"
+            ).format(error=extraction["error"])
+        return self.templatesLanguage.template(
+            "MESSAGE_EXTRACTED",
+            "Extracted {files} files ({size:.2f} MB) in {elapsed:.2f}s, {speed:.2f} MB/s",
+        ).format(
+            files=extraction["files"],
+            size=extraction["bytes"] / 1024 / 1024,
+            elapsed=extraction["elapsed"],
+            speed=extraction["speed"],
+        ) + self.templatesLanguage.permissionsText(extraction.get("permissions"))
+
+    async def unCompress(self, file_path, message=None):
+        """
+        Extrae zip/tar/rar/7z junto al archivo y corrige dueño y permisos
+        de todo lo extraído
+
+        Returns:
+            dict: Resultado de FileExtractor con las estadísticas de
+            permisos en "permissions", o None si no se extrae
+        """
         try:
             file_name_with_extension = os.path.basename(file_path)
             file_name, file_extension = os.path.splitext(file_name_with_extension)
@@ -810,44 +1264,87 @@ class TelegramBot:
                 f"unCompress path: [{file_path}] [{file_name_with_extension}] file_name:[{file_name}] file_extension:[{file_extension}]"
             )
 
-            invalid_patterns = [
-                r"\.part[0-9]+\.rar",
-                r"\.part[0-9]+.*\.rar",
-                r"\.zip\.[0-9]+",
-                r"\.zip.*\.[0-9]+",
-                r"\.z[0-9]+",
-            ]
-
-            for pattern in invalid_patterns:
-                if re.search(pattern, file_name_with_extension, re.IGNORECASE):
-                    return
-
-            directorio_destino = os.path.join(
-                os.path.dirname(file_path),
-                os.path.splitext(os.path.basename(file_path))[0],
+            volume = self.volume_sets.match(file_path)
+            archive_type = (
+                self.volume_sets.archive_type(volume)
+                if volume
+                else FileExtractor.archive_type(file_name_with_extension)
             )
+            enabled = {
+                "zip": self.ENABLED_UNZIP,
+                "tar": self.ENABLED_UNZIP,
+                "rar": self.ENABLED_UNRAR,
+                "7z": self.ENABLED_7Z,
+            }
+            if not enabled.get(archive_type):
+                return
 
-            if self.ENABLED_UNRAR and file_name_with_extension.endswith(".rar"):
+            # Volúmenes de un archivo partido: se extrae una sola vez, desde
+            # el primero, cuando han llegado todos
+            status, volume_set = await self.fs.run(self.volume_sets.claim, file_path)
+            if status == "waiting":
                 logger.logger.info(
-                    f"unCompress endswith rar: [{file_path}] [{file_name_with_extension}] file_name:[{file_name}] file_extension:[{file_extension}]"
+                    f"unCompress waiting volumes: {volume_set['base']} "
+                    f"{volume_set['found']}/{volume_set['expected'] or '?'} [{volume_set['state']}]"
                 )
+                return None if volume_set["state"] else {"waiting": volume_set}
 
-                self.utils.create_folders(directorio_destino)
-                fileExtractor = FileExtractor()
-                await fileExtractor.extract_unrar(file_path, directorio_destino)
-                self.utils.change_owner_permissions(directorio_destino)
+            if volume_set:
+                file_path = volume_set["first"]
+                file_name_with_extension = os.path.basename(file_path)
+                base_name = FileExtractor.base_name(volume_set["base"])
+            else:
+                base_name = FileExtractor.base_name(file_name_with_extension)
+            directorio_destino = os.path.join(os.path.dirname(file_path), base_name)
+            logger.logger.info(
+                f"unCompress {archive_type}: [{file_path}] => [{directorio_destino}]"
+            )
 
-            elif self.ENABLED_UNZIP and file_name_with_extension.endswith(".zip"):
-                logger.logger.info(
-                    f"unCompress endswith zip: [{file_path}] [{file_name_with_extension}] file_name:[{file_name}] file_extension:[{file_extension}]"
+            await self.fs.create_folder(directorio_destino)
+            tracker = (
+                self.progress_bus.track(
+                    message,
+                    self.templatesLanguage.template(
+                        "PROGRESS_CALLBACK_EXTRACT", "Extracting {file}"
+                    ).format(file=file_name_with_extension),
+                    file_path,
                 )
-
-                self.utils.create_folders(directorio_destino)
+                if message
+                else None
+            )
+            extraction = None
+            try:
                 fileExtractor = FileExtractor()
-                await fileExtractor.extract_unzip(file_path, directorio_destino)
-                self.utils.change_owner_permissions(directorio_destino)
+                if volume_set and volume_set["kind"] in ("zip_split", "split"):
+                    # Ni zipfile ni unzip leen volúmenes; 7z sí
+                    extraction = await fileExtractor.extract_7z(
+                        file_path, directorio_destino, tracker
+                    )
+                else:
+                    extraction = await fileExtractor.extract(
+                        file_path, directorio_destino, tracker
+                    )
+            finally:
+                if tracker:
+                    await tracker.close()
+                if volume_set:
+                    self.volume_sets.release(
+                        volume_set["key"], bool(extraction and extraction["success"])
+                    )
 
-            return
+            if volume_set and extraction["success"]:
+                extraction["volumes"] = len(volume_set["volumes"])
+                if self.EXTRACT_VOLUMES_CLEANUP == "delete":
+                    for volume_path in volume_set["volumes"]:
+                        await self.fs.remove(volume_path)
+                    logger.logger.info(
+                        f"unCompress removed {len(volume_set['volumes'])} volumes of {volume_set['base']}"
+                    )
+
+            extraction["permissions"] = await self.fs.change_owner_permissions_tree(
+                directorio_destino
+            )
+            return extraction
 
         except Exception as e:
             logger.logger.error(f"unCompress Exception : {file_path} [{e}]")
@@ -876,15 +1373,16 @@ class TelegramBot:
 
             if message.id in self.youtubeLinks:
                 removed_value = self.youtubeLinks.pop(int(message.id))
-                if self.YOUTUBE_DEFAULT_DOWNLOAD.upper() == "VIDEO":
-                    await message.edit("Downloading video")
-                    await self.ytdownloader.downloadVideo(text, message)
-                elif self.YOUTUBE_DEFAULT_DOWNLOAD.upper() == "AUDIO":
-                    await message.edit("Downloading Audio")
-                    await self.ytdownloader.downloadAudio(text, message)
-                else:
-                    await message.edit("Downloading video")
-                    await self.ytdownloader.downloadVideo(text, message)
+                async with self.scheduler.slot("youtube", label=text):
+                    if self.YOUTUBE_DEFAULT_DOWNLOAD.upper() == "VIDEO":
+                        await message.edit("Downloading video")
+                        await self.ytdownloader.downloadVideo(text, message)
+                    elif self.YOUTUBE_DEFAULT_DOWNLOAD.upper() == "AUDIO":
+                        await message.edit("Downloading Audio")
+                        await self.ytdownloader.downloadAudio(text, message)
+                    else:
+                        await message.edit("Downloading video")
+                        await self.ytdownloader.downloadVideo(text, message)
 
         except Exception as e:
             logger.logger.error(f"youTubeDownloader => Exception: {e}")
@@ -893,69 +1391,46 @@ class TelegramBot:
 
     async def download_url_file(self, message, url):
         try:
-            parsed_url = urlparse(url)
-            file_name = os.path.basename(parsed_url.path)
-
             download_start_time = time.time()
 
-            response = requests.head(url, allow_redirects=True)
-            content_type = response.headers.get("content-type", "").lower()
-            if "text/html" in content_type:
+            probe = await self.http_downloader.probe(url)
+            if "text/html" in probe["content_type"]:
                 logger.logger.info(f"download_url_file => NO DOWNLOADED LINK: {url}")
                 await message.delete()
 
                 return
 
-            response = requests.get(url, stream=True)
-            if response.status_code == 200:
-                file_path = os.path.join(self.PATH_LINKS, file_name)
+            if probe["status"] == 200:
+                file_path = os.path.join(self.PATH_LINKS, probe["filename"])
                 message = await message.edit(
                     self.templatesLanguage.template("MESSAGE_DOWNLOAD").format(
                         path=self.PATH_LINKS
                     )
                 )
-                self.utils.create_folders(self.PATH_LINKS)
-
-                with open(file_path, "wb") as file:
-                    file.write(response.content)
-
-                    file_path = await self.moveFile(file_path)
-
-                    self.utils.change_owner_permissions(file_path)
-                    file_size = len(response.content) / 1024 / 1024
-                    download_end_time = time.time()
-                    elapsed_time_total = download_end_time - download_start_time
-                    total_speed = (
-                        file_size / elapsed_time_total if elapsed_time_total > 0 else 0
+                await self.fs.create_folders(self.PATH_LINKS)
+
+                progress = self.progress_callback(message, url, path=self.PATH_LINKS)
+                try:
+                    written = await self.http_downloader.download(
+                        url,
+                        file_path,
+                        probe,
+                        tracker=progress.tracker,
+                        on_bytes=self.concurrency_controller.record_bytes,
                     )
-                    end_time_short = time.strftime("%H:%M", time.localtime())
-                    f_elapsed_time_total = self.format_time(elapsed_time_total)
-
-                    message_text = self.templatesLanguage.template(
-                        "MESSAGE_DOWNLOAD_FILE"
-                    ).format(downloaded_file=file_path)
-                    message_text += self.templatesLanguage.template(
-                        "MESSAGE_DOWNLOAD_FILE_SIZE"
-                    ).format(file_size=file_size)
-                    message_text += self.templatesLanguage.template(
-                        "MESSAGE_DOWNLOAD_COMPLETED"
-                    ).format(elapsed_time=f_elapsed_time_total)
-                    message_text += self.templatesLanguage.template(
-                        "MESSAGE_DOWNLOAD_SPEED"
-                    ).format(speed=total_speed)
-                    message_text += self.templatesLanguage.template(
-                        "MESSAGE_DOWNLOAD_AT"
-                    ).format(end_time=end_time_short)
-
-                    message = await message.edit(f"{message_text}")
+                finally:
+                    await progress.tracker.close()
 
-                    logger.logger.info(
-                        f"download_url_file {url}. Status code: {response.status_code} => {file_path}"
-                    )
-                return file_path
+                # Mover, permisos, aviso y extracción siguen en el PostProcessor
+                return await self.post_processor.submit(
+                    self.postDownloadUrl(
+                        message, url, file_path, written, probe, download_start_time
+                    ),
+                    label=url,
+                )
             else:
                 logger.logger.info(
-                    f"download_url_file {url}. Status code: {response.status_code}"
+                    f"download_url_file {url}. Status code: {probe['status']}"
                 )
                 await message.delete()
 
@@ -964,6 +1439,63 @@ class TelegramBot:
             logger.logger.error(f"download_url_file {url}. {e}")
             await message.delete()
 
+    async def postDownloadUrl(
+        self, message, url, file_path, written, probe, download_start_time
+    ):
+        """
+        Etapa de post-proceso de download_url_file(), ejecutada en el
+        PostProcessor fuera del hueco del planificador y del límite por host
+        """
+        try:
+            moved_path = await self.moveFile(file_path, message=message)
+            if moved_path is None:
+                raise RuntimeError(f"moveFile failed: {file_path}")
+            file_path = moved_path
+
+            await self.fs.change_owner_permissions(file_path)
+            file_size = written / 1024 / 1024
+            download_end_time = time.time()
+            elapsed_time_total = download_end_time - download_start_time
+            total_speed = (
+                file_size / elapsed_time_total if elapsed_time_total > 0 else 0
+            )
+            end_time_short = time.strftime("%H:%M", time.localtime())
+            f_elapsed_time_total = self.format_time(elapsed_time_total)
+
+            message_text = self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_FILE"
+            ).format(downloaded_file=file_path)
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_FILE_SIZE"
+            ).format(file_size=file_size)
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_COMPLETED"
+            ).format(elapsed_time=f_elapsed_time_total)
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_SPEED"
+            ).format(speed=total_speed)
+            message_text += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_AT"
+            ).format(end_time=end_time_short)
+
+            message = await message.edit(f"{message_text}")
+
+            logger.logger.info(
+                f"download_url_file {url}. Status code: {probe['status']} => {file_path}"
+            )
+
+            extraction = await self.unCompress(file_path, message)
+            if extraction:
+                message = await message.edit(
+                    f"{message_text}{self.extractionText(extraction)}"
+                )
+            return file_path
+
+        except Exception as e:
+            logger.logger.error(f"postDownloadUrl {url}. {e}")
+            await message.delete()
+            raise
+
     async def commands(self, message):
         try:
             logger.logger.info(f"commands => message: {message}")
@@ -980,19 +1512,46 @@ class TelegramBot:
                                 group_id=process_command['group_id'],
                                 days_back=process_command['days_back'],
                                 limit=process_command['limit'],
-                                auto_download=process_command['auto_download']
+                                auto_download=process_command['auto_download'],
+                                incremental=process_command.get('incremental', False)
                             )
                         )
                         
                         # Enviar confirmación inmediata
                         action_text = "descarga" if process_command['auto_download'] else "listado"
+                        incremental_text = (
+                            "🆕 Incremental desde el último escaneo\n"
+                            if process_command.get('incremental')
+                            else ""
+                        )
                         await message.respond(
                             f"🔍 Iniciando {action_text} de archivos grandes...\n"
                             f"🏷️ Grupo: {process_command['group_id']}\n"
                             f"📅 Últimos {process_command['days_back']} días\n"
-                            f"📊 Límite: {process_command['limit'] or 'Sin límite'}\n\n"
+                            f"📊 Límite: {process_command['limit'] or 'Sin límite'}\n"
+                            f"{incremental_text}\n"
                             f"ℹ️ Recibirás actualizaciones del progreso."
                         )
+                    elif process_command['action'] == 'scan_batch':
+                        asyncio.create_task(
+                            self.group_scanner.scan_groups(
+                                group_ids=process_command['group_ids'],
+                                days_back=process_command['days_back'],
+                                limit=process_command['limit'],
+                                auto_download=process_command['auto_download'],
+                                incremental=process_command['incremental']
+                            )
+                        )
+
+                        action_text = "descarga" if process_command['auto_download'] else "listado"
+                        await message.respond(
+                            f"🔍 Iniciando {action_text} de archivos grandes en "
+                            f"{len(process_command['group_ids'])} grupos...\n"
+                            f"🏷️ Grupos: {', '.join(str(group_id) for group_id in process_command['group_ids'])}\n"
+                            f"📅 Últimos {process_command['days_back']} días\n"
+                            f"📊 Límite por grupo: {process_command['limit'] or 'Sin límite'}\n\n"
+                            f"ℹ️ Recibirás un único informe al terminar."
+                        )
                 elif process_command:
                     await message.respond(process_command)
                     
@@ -1066,55 +1625,27 @@ class TelegramBot:
             logger.logger.error(f"format_time {seconds}. {e}")
             return seconds
 
-    def progress_callback(self, message, event_id, from_id=None):
-        async def callback(current, total):
-            if not self.TG_PROGRESS_DOWNLOAD:
-                return
-
-            try:
-                nonlocal last_percentage
-
-                percentage = int(current / total * 100)
-                if (
-                    percentage <= 5
-                    and percentage % 1 == 0
-                    and percentage != last_percentage
-                ) or (percentage % 10 == 0 and percentage != last_percentage):
-                    speed = current / (time.time() - start_time) / (1024 * 1024)
-
-                    megabytes_total = total / 1024 / 1024
-                    message_text = self.templatesLanguage.template(
-                        "PROGRESS_CALLBACK_PATH"
-                    ).format(path=self.PATH_TMP)
-                    if from_id:
-                        message_text += self.templatesLanguage.template(
-                            "MESSAGE_DOWNLOAD_FROM_ID"
-                        ).format(from_id=from_id)
-                    message_text += self.templatesLanguage.template(
-                        "PROGRESS_CALLBACK_STARTING"
-                    ).format(starting=_start_time)
-
-                    message_text += self.templatesLanguage.template(
-                        "PROGRESS_CALLBACK_PROGRESS"
-                    ).format(
-                        percentage=int(percentage), total=megabytes_total, speed=speed
-                    )
-
-                    await self.client.edit_message(
-                        message.chat_id, message.id, message_text
-                    )
-                    last_percentage = percentage
-                    if percentage % 10 == 0:
-                        logger.logger.info(
-                            f"Downloading... {event_id} > {message.id} >> {int(percentage)}% - Speed: {speed:.2f} MB/s"
-                        )
-            except Exception:
-                return
+    def progress_callback(self, message, event_id, from_id=None, path=None):
+        header = self.templatesLanguage.template("PROGRESS_CALLBACK_PATH").format(
+            path=path or self.PATH_TMP
+        )
+        if from_id:
+            header += self.templatesLanguage.template(
+                "MESSAGE_DOWNLOAD_FROM_ID"
+            ).format(from_id=from_id)
+        tracker = self.progress_bus.track(message, header, event_id)
 
-        last_percentage = -1
-        start_time = time.time()
-        _start_time = time.strftime("%H:%M:%S", time.localtime())
-        logger.logger.info(f"progress_callback started {message.id}.")
+        async def callback(current, total):
+            nonlocal last_current
+            # El primer valor puede incluir lo ya descargado antes de
+            # reanudar: solo sirve de referencia, no son bytes transferidos
+            if last_current is not None:
+                self.concurrency_controller.record_bytes(current - last_current)
+            last_current = current
+            tracker.update(current, total)
+
+        last_current = None
+        callback.tracker = tracker
         return callback
 
     def create_directoryTmp(self, path):
@@ -1185,7 +1716,7 @@ class TelegramBot:
                     logger.logger.info(
                         f"renameFilesReply => newFilenameRename: {original_filename}, {renameFilesReply}"
                     )
-                    if self.utils.rename_file(original_filename, renameFilesReply):
+                    if await self.fs.rename_file(original_filename, renameFilesReply):
                         self.downloadFilesDB.update_download_files(
                             reply_to_msg_id, renameFilesReply
                         )
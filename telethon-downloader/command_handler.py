@@ -12,9 +12,14 @@ class CommandHandler:
             "/id": self.handle_id,
             "/scanlarge": self.handle_scan_large,
             "/scanlist": self.handle_scan_list,
+            "/scanbatch": self.handle_scan_batch,
+            "/scanbatchlist": self.handle_scan_batch_list,
             "/autostatus": self.handle_auto_status,
             "/autoadd": self.handle_auto_add_group,
             "/autoremove": self.handle_auto_remove_group,
+            "/queue": self.handle_queue,
+            "/ytcancel": self.handle_youtube_cancel,
+            "/route": self.handle_route,
         }
 
         self.environments = environments
@@ -49,12 +54,19 @@ class CommandHandler:
         help_message += "/help - Displays the help message\n"
         help_message += "/rename - Change file name by replying or selecting the file and typing the new name\n"
         help_message += "/telethon - Displays the Telethon version\n"
-        help_message += "/version - Displays the bot version\n\n"
+        help_message += "/version - Displays the bot version\n"
+        help_message += "/queue - Shows the download queue by source\n"
+        help_message += "/ytcancel - Cancels the running YouTube downloads\n"
+        help_message += "/route <filename> [group=<group_id>] - Shows where a file would be saved, without downloading\n\n"
         help_message += "🔍 Large File Scanner Commands:\n"
         help_message += f"/scanlarge <group_id> [days] [limit] - Scan and download large files (>{self.environments.constants.get_variable('SCAN_MIN_FILE_SIZE_MB')}MB) from a group\n"
         help_message += "   Example: /scanlarge -1001234567890 30 1000\n"
         help_message += "/scanlist <group_id> [days] [limit] - Only list large files without downloading\n"
-        help_message += "   Example: /scanlist -1001234567890 7\n\n"
+        help_message += "   Example: /scanlist -1001234567890 7\n"
+        help_message += "   Add 'inc' to only scan messages newer than the last scan: /scanlarge -1001234567890 30 inc\n"
+        help_message += "/scanbatch <group_id,group_id...|auto|paths|all> [days] [limit] [inc] - Scan several groups at once and download, with one merged report\n"
+        help_message += "   auto = AUTO_SCAN_GROUPS, paths = GROUP_PATH groups, all = both\n"
+        help_message += "/scanbatchlist <groups> [days] [limit] [inc] - Same, only listing\n\n"
         help_message += "🤖 Auto Scanner Commands:\n"
         help_message += "/autostatus - Show auto scanner status and monitored groups\n"
         help_message += "/autoadd <group_id> - Add group to auto monitoring (runtime only)\n"
@@ -82,12 +94,16 @@ class CommandHandler:
     def handle_scan_large(self, message, args):
         """
         Maneja el comando /scanlarge para escanear y descargar archivos grandes
-        Formato: /scanlarge <group_id> [days] [limit]
+        Formato: /scanlarge <group_id> [days] [limit] [inc]
         """
         try:
+            # "inc" en cualquier posición: escaneo incremental
+            incremental = bool(args) and any(arg.lower() == "inc" for arg in args)
+            args = [arg for arg in args or [] if arg.lower() != "inc"]
+
             if not args or len(args) < 1:
                 return ("❌ Error: Group ID requerido\n"
-                       "Uso: /scanlarge <group_id> [days] [limit]\n"
+                       "Uso: /scanlarge <group_id> [days] [limit] [inc]\n"
                        "Ejemplo: /scanlarge -1001234567890 30 1000")
             
             group_id = args[0]
@@ -113,6 +129,7 @@ class CommandHandler:
                 'group_id': group_id,
                 'days_back': days_back,
                 'limit': limit,
+                'incremental': incremental,
                 'auto_download': True
             }
             
@@ -123,12 +140,16 @@ class CommandHandler:
     def handle_scan_list(self, message, args):
         """
         Maneja el comando /scanlist para solo listar archivos grandes sin descargar
-        Formato: /scanlist <group_id> [days] [limit]
+        Formato: /scanlist <group_id> [days] [limit] [inc]
         """
         try:
+            # "inc" en cualquier posición: escaneo incremental
+            incremental = bool(args) and any(arg.lower() == "inc" for arg in args)
+            args = [arg for arg in args or [] if arg.lower() != "inc"]
+
             if not args or len(args) < 1:
                 return ("❌ Error: Group ID requerido\n"
-                       "Uso: /scanlist <group_id> [days] [limit]\n"
+                       "Uso: /scanlist <group_id> [days] [limit] [inc]\n"
                        "Ejemplo: /scanlist -1001234567890 7")
             
             group_id = args[0]
@@ -154,6 +175,7 @@ class CommandHandler:
                 'group_id': group_id,
                 'days_back': days_back,
                 'limit': limit,
+                'incremental': incremental,
                 'auto_download': False
             }
             
@@ -161,6 +183,75 @@ class CommandHandler:
             logger.logger.error(f"handle_scan_list error: {e}")
             return f"❌ Error procesando comando: {e}"
 
+    def handle_scan_batch(self, message, args):
+        """
+        Maneja el comando /scanbatch para escanear y descargar varios grupos
+        Formato: /scanbatch <group_id,group_id...|auto|paths|all> [days] [limit] [inc]
+        """
+        return self._scan_batch_command("/scanbatch", args, auto_download=True)
+
+    def handle_scan_batch_list(self, message, args):
+        """
+        Maneja el comando /scanbatchlist para solo listar varios grupos
+        Formato: /scanbatchlist <group_id,group_id...|auto|paths|all> [days] [limit] [inc]
+        """
+        return self._scan_batch_command("/scanbatchlist", args, auto_download=False)
+
+    def _scan_batch_command(self, command, args, auto_download):
+        try:
+            incremental = bool(args) and any(arg.lower() == "inc" for arg in args)
+            args = [arg for arg in args or [] if arg.lower() != "inc"]
+
+            if not args:
+                return ("❌ Error: Grupos requeridos\n"
+                       f"Uso: {command} <group_id,group_id...|auto|paths|all> [days] [limit] [inc]\n"
+                       f"Ejemplo: {command} -1001234567890,-1009876543210 30")
+
+            target = args[0].lower()
+            group_ids = []
+            if target in ("auto", "all"):
+                group_ids += self.environments.auto_scanner.monitored_groups
+            if target in ("paths", "all"):
+                for group_id in self.environments.routing_config.snapshot().group_path:
+                    try:
+                        # 0000000000 es la regla de ejemplo de config.ini
+                        if int(group_id) != 0:
+                            group_ids.append(int(group_id))
+                    except ValueError:
+                        logger.logger.info(f"{command}: GROUP_PATH {group_id} no es un ID")
+            if target not in ("auto", "paths", "all"):
+                try:
+                    group_ids = [int(group_id) for group_id in args[0].split(",") if group_id]
+                except ValueError:
+                    return "❌ Error: Los Group ID deben ser números válidos separados por comas"
+            group_ids = list(dict.fromkeys(group_ids))
+            if not group_ids:
+                return f"❌ Error: No hay grupos configurados para '{args[0]}'"
+
+            days_back = int(args[1]) if len(args) > 1 and args[1].isdigit() else self.environments.constants.get_variable('SCAN_DEFAULT_DAYS')
+            limit = int(args[2]) if len(args) > 2 and args[2].isdigit() else self.environments.constants.get_variable('SCAN_DEFAULT_LIMIT')
+
+            # Validar parámetros
+            max_days = self.environments.constants.get_variable('SCAN_MAX_DAYS')
+            if days_back <= 0 or days_back > max_days:
+                return f"❌ Error: Los días deben estar entre 1 y {max_days}"
+
+            if limit is not None and (limit <= 0 or limit > 10000):
+                return "❌ Error: El límite debe estar entre 1 y 10000"
+
+            return {
+                'action': 'scan_batch',
+                'group_ids': group_ids,
+                'days_back': days_back,
+                'limit': limit,
+                'incremental': incremental,
+                'auto_download': auto_download
+            }
+
+        except Exception as e:
+            logger.logger.error(f"{command} error: {e}")
+            return f"❌ Error procesando comando: {e}"
+
     def handle_auto_status(self, message, args=None):
         """
         Muestra el estado actual del auto scanner
@@ -175,7 +266,8 @@ class CommandHandler:
                 status_message += f"📊 **Tamaño mínimo:** {status['min_file_size_mb']} MB\n"
                 status_message += f"🔔 **Notificaciones:** {'Habilitadas' if status['notify_user'] else 'Deshabilitadas'}\n"
                 status_message += f"📋 **Modo lista:** {'Solo grupos listados' if status['whitelist_only'] else 'Todos excepto listados'}\n"
-                status_message += f"🏷️ **Total grupos configurados:** {status['total_monitored_groups']}\n\n"
+                status_message += f"🏷️ **Total grupos configurados:** {status['total_monitored_groups']}\n"
+                status_message += f"♻️ **Duplicados omitidos:** {status['skipped_files']} ({status['skipped_mb']} MB)\n\n"
                 
                 if status['monitored_groups']:
                     status_message += "📝 **Grupos configurados:**\n"
@@ -254,3 +346,93 @@ class CommandHandler:
         except Exception as e:
             logger.logger.error(f"handle_auto_remove_group error: {e}")
             return f"❌ Error removiendo grupo: {e}"
+
+    def handle_queue(self, message, args=None):
+        """
+        Muestra el estado de las colas del planificador de descargas
+        """
+        try:
+            status = self.environments.scheduler.get_status_info()
+
+            status_message = "📥 **Cola de descargas**\n\n"
+            status_message += f"⚙️ **Límite de descargas:** {status['limit']}\n"
+            status_message += f"🔄 **Activas:** {status['active']}\n"
+            status_message += f"⏳ **En cola:** {status['queued']}\n"
+
+            adaptive = self.environments.concurrency_controller.get_status_info()
+            if adaptive['enabled']:
+                status_message += (
+                    f"📈 **Límite adaptativo:** {adaptive['limit']} "
+                    f"(entre {adaptive['min_limit']} y {adaptive['max_limit']}), "
+                    f"{adaptive['throughput_mb']:.2f} MB/s\n"
+                )
+                if adaptive['history']:
+                    last_change = adaptive['history'][-1]
+                    status_message += (
+                        f"   último cambio {last_change['time']}: "
+                        f"{last_change['old']} → {last_change['new']} ({last_change['reason']})\n"
+                    )
+
+            post = self.environments.post_processor.get_status_info()
+            status_message += (
+                f"📦 **Post-proceso:** {post['active']}/{post['workers']} activos, "
+                f"{post['queued']} en cola, {post['processed']} terminados, "
+                f"{post['failed']} fallidos (media {post['avg_time']:.1f}s)\n"
+            )
+            status_message += "\n"
+
+            for source, info in status['sources'].items():
+                status_message += (
+                    f"• **{source}** (peso {info['weight']}): "
+                    f"{info['active']} activas, {info['queued']} en cola\n"
+                    f"   espera media {info['avg_wait']:.1f}s, "
+                    f"máxima {info['max_wait']:.1f}s, "
+                    f"más antigua en cola {info['oldest_wait']:.1f}s\n"
+                )
+
+            return status_message
+
+        except Exception as e:
+            logger.logger.error(f"handle_queue error: {e}")
+            return f"❌ Error obteniendo cola: {e}"
+
+    def handle_youtube_cancel(self, message, args=None):
+        """
+        Cancela las descargas de YouTube en curso
+        """
+        cancelled = self.environments.ytdownloader.cancel()
+        logger.logger.info(f"handle_youtube_cancel: {cancelled}")
+        if not cancelled:
+            return "ℹ️ No hay descargas de YouTube en curso"
+        return f"🛑 Cancelando {cancelled} descarga(s) de YouTube"
+
+    def handle_route(self, message, args):
+        """
+        Simula el enrutado de un nombre de archivo con las reglas de
+        config.ini (/route <filename> [group=<group_id>])
+        """
+        try:
+            if not args:
+                return "❌ Uso: /route <filename> [group=<group_id>]\nEjemplo: /route The.Show.S01E01.mkv"
+
+            # El grupo va marcado (group=<id>): un número suelto al final
+            # forma parte del nombre (/route Movie 1080)
+            from_id = None
+            if len(args) > 1 and args[-1].startswith("group="):
+                from_id = args[-1][len("group="):]
+                if not from_id.lstrip("-").isdigit():
+                    return f"❌ group_id inválido: {from_id}"
+                args = args[:-1]
+            filename = " ".join(args)
+
+            final_path, rule = self.environments.getRoute(filename, from_id)
+            logger.logger.info(f"handle_route: {filename} => {final_path} ({rule})")
+
+            route_message = f"🧭 **{filename}**\n\n"
+            route_message += f"📁 **Destino:** {final_path}\n"
+            route_message += f"📐 **Regla:** {rule}"
+            return route_message
+
+        except Exception as e:
+            logger.logger.error(f"handle_route error: {e}")
+            return f"❌ Error resolviendo ruta: {e}"
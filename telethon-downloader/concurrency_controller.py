@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+import logging
+from collections import deque
+
+import logger
+from constants import EnvironmentReader
+
+
+class FloodWaitLogHandler(logging.Handler):
+    """
+    Telethon duerme en silencio los FloodWait por debajo de
+    flood_sleep_threshold y solo lo deja en su log; este handler
+    convierte esos avisos en eventos de congestión
+    """
+
+    def __init__(self, controller):
+        super().__init__(logging.INFO)
+        self.controller = controller
+
+    def emit(self, record):
+        try:
+            if "flood wait" in record.getMessage():
+                self.controller.record_congestion("FloodWait")
+        except Exception:
+            pass
+
+
+class AdaptiveConcurrencyController:
+    """
+    Ajusta en caliente el límite de descargas del planificador (AIMD)
+
+    Cada intervalo mide los bytes/s agregados que reportan los
+    progress_callback. Si hubo FloodWait o timeouts reduce el límite a la
+    mitad; si hay trabajos en cola y no hubo congestión lo sube de uno en
+    uno, y deshace la subida si el caudal no ha mejorado.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.constants = EnvironmentReader()
+
+        self.enabled = self.constants.get_variable("TG_ADAPTIVE_PARALLEL") in ("True", "true", True)
+        self.min_limit = max(1, self.constants.get_variable("TG_ADAPTIVE_MIN_PARALLEL"))
+        self.max_limit = max(self.min_limit, self.constants.get_variable("TG_ADAPTIVE_MAX_PARALLEL"))
+        self.interval = max(1, self.constants.get_variable("TG_ADAPTIVE_INTERVAL"))
+        self.min_gain = 0.05
+        self.decrease_factor = 0.5
+        self.hold_ticks = 3
+
+        self.window_bytes = 0
+        self.window_start = time.time()
+        self.congestion = {}
+        self.throughput = 0.0
+        self.last_throughput = 0.0
+        self.last_action = None
+        self.hold = 0
+        self.history = deque(maxlen=5)
+        self.task = None
+
+        if self.enabled:
+            limit = min(max(self.scheduler.limit, self.min_limit), self.max_limit)
+            if limit != self.scheduler.limit:
+                self._change(limit, "initial limit")
+
+            flood_logger = logging.getLogger("telethon.client.users")
+            flood_logger.setLevel(logging.INFO)
+            flood_logger.addHandler(FloodWaitLogHandler(self))
+
+        logger.logger.info(
+            f"AdaptiveConcurrencyController initialized: enabled={self.enabled} "
+            f"bounds=[{self.min_limit}, {self.max_limit}] interval={self.interval}s"
+        )
+
+    def start(self):
+        if self.enabled and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def record_bytes(self, count):
+        if count > 0:
+            self.window_bytes += count
+
+    def record_congestion(self, kind):
+        self.congestion[kind] = self.congestion.get(kind, 0) + 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.logger.error(f"AdaptiveConcurrencyController tick Exception: {e}")
+
+    def tick(self):
+        now = time.time()
+        elapsed = now - self.window_start
+        self.throughput = self.window_bytes / elapsed if elapsed > 0 else 0.0
+        congestion = self.congestion
+        self.window_bytes = 0
+        self.window_start = now
+        self.congestion = {}
+
+        if not self.scheduler.active and not self.throughput and not congestion:
+            self.last_action = None
+            return
+
+        limit = self.scheduler.limit
+        megabytes = self.throughput / 1024 / 1024
+        self.hold = max(0, self.hold - 1)
+
+        if congestion:
+            events = ", ".join(f"{kind} x{count}" for kind, count in congestion.items())
+            new_limit = max(self.min_limit, int(limit * self.decrease_factor))
+            self.hold = self.hold_ticks
+            self.last_action = "decrease"
+            if new_limit != limit:
+                self._change(new_limit, f"{events} at {megabytes:.2f} MB/s")
+
+        elif self.last_action == "increase" and self.throughput < self.last_throughput * (1 + self.min_gain):
+            self.hold = self.hold_ticks
+            self.last_action = "revert"
+            self._change(
+                max(self.min_limit, limit - 1),
+                f"no throughput gain ({self.last_throughput / 1024 / 1024:.2f} -> {megabytes:.2f} MB/s)",
+            )
+
+        elif self.scheduler.queue_depth() and limit < self.max_limit and not self.hold:
+            self.last_action = "increase"
+            self._change(
+                limit + 1,
+                f"{self.scheduler.queue_depth()} queued at {megabytes:.2f} MB/s",
+            )
+
+        else:
+            self.last_action = None
+
+        self.last_throughput = self.throughput
+
+    def _change(self, new_limit, reason):
+        old_limit = self.scheduler.limit
+        self.scheduler.set_limit(new_limit)
+        self.history.append(
+            {
+                "time": time.strftime("%H:%M:%S", time.localtime()),
+                "old": old_limit,
+                "new": new_limit,
+                "reason": reason,
+            }
+        )
+        logger.logger.info(
+            f"AdaptiveConcurrencyController limit {old_limit} -> {new_limit}: {reason}"
+        )
+
+    def get_status_info(self):
+        """
+        Obtiene el estado del control adaptativo
+
+        Returns:
+            dict: Límite actual, cotas, caudal medido y últimos cambios
+        """
+        return {
+            "enabled": self.enabled,
+            "limit": self.scheduler.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "throughput_mb": self.throughput / 1024 / 1024,
+            "history": list(self.history),
+        }
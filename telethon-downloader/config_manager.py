@@ -1,4 +1,11 @@
+import os
+import threading
 import configparser
+from types import MappingProxyType
+from collections import namedtuple
+
+import logger
+from download_manager import DownloadPathManager
 
 
 class ConfigurationManager:
@@ -65,3 +72,81 @@ class ConfigurationManager:
         for section in self.config.sections():
             all_data[section] = dict(self.config.items(section))
         return all_data
+
+
+# Reglas de enrutado ya leídas de config.ini; no se modifica nunca, se sustituye
+RoutingSnapshot = namedtuple(
+    "RoutingSnapshot",
+    ["version", "default_path", "group_path", "regex_path", "sections", "path_manager"],
+)
+
+
+class RoutingConfig:
+    """
+    Configuración de rutas de config.ini leída una sola vez
+
+    snapshot() devuelve una instantánea inmutable y solo vuelve a leer el
+    archivo cuando cambia su mtime o su tamaño; la nueva instantánea
+    sustituye a la anterior de una vez, así que quien ya tiene una no ve
+    cambios a medias. Si config.ini no se puede leer se sigue usando la
+    última instantánea válida.
+    """
+
+    def __init__(self, config_path):
+        self.config_path = config_path
+        self.lock = threading.Lock()
+        self.version = None
+        self.current = None
+        self.snapshot()
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.config_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self):
+        """
+        Returns:
+            RoutingSnapshot: Reglas DEFAULT_PATH, GROUP_PATH, REGEX_PATH vigentes
+        """
+        version = self._file_version()
+        if self.current is not None and version == self.version:
+            return self.current
+
+        with self.lock:
+            version = self._file_version()
+            if self.current is None or version != self.version:
+                try:
+                    self.current = self._load()
+                    self.version = self._file_version()
+                    logger.logger.info(
+                        f"RoutingConfig loaded {self.config_path}: "
+                        f"{len(self.current.group_path)} group rules, "
+                        f"{len(self.current.regex_path)} regex rules"
+                    )
+                except Exception as e:
+                    logger.logger.error(f"RoutingConfig reload Exception: {e}")
+                    if self.current is None:
+                        raise
+                    self.version = version
+        return self.current
+
+    def _load(self):
+        manager = ConfigurationManager(self.config_path)
+        sections = manager.get_all_sections()
+
+        def section(name):
+            return MappingProxyType(
+                dict(manager.config[name]) if name in manager.config else {}
+            )
+
+        return RoutingSnapshot(
+            version=self._file_version(),
+            default_path=section("DEFAULT_PATH"),
+            group_path=section("GROUP_PATH"),
+            regex_path=section("REGEX_PATH"),
+            sections=MappingProxyType(sections),
+            path_manager=DownloadPathManager(sections),
+        )
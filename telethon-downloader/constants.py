@@ -16,11 +16,20 @@ class EnvironmentReader:
 
         self.PERMISSIONS_FOLDER = os.environ.get("PERMISSIONS_FOLDER", 777)
         self.PERMISSIONS_FILE = os.environ.get("PERMISSIONS_FILE", 755)
+        self.PERMISSIONS_WORKERS = int(os.environ.get("PERMISSIONS_WORKERS", 8))
 
         self.TG_AUTHORIZED_USER_ID = os.environ.get("TG_AUTHORIZED_USER_ID", False)
         self.TG_MAX_PARALLEL = int(os.environ.get("TG_MAX_PARALLEL", 4))
+        self.TG_SCHEDULER_WEIGHTS = os.environ.get("TG_SCHEDULER_WEIGHTS", "interactive:8,youtube:4,auto:2,scan:1")
+        self.TG_SCHEDULER_SMALL_FILE_MB = int(os.environ.get("TG_SCHEDULER_SMALL_FILE_MB", 50))
+        self.TG_ADAPTIVE_PARALLEL = os.environ.get("TG_ADAPTIVE_PARALLEL", False)
+        self.TG_ADAPTIVE_MIN_PARALLEL = int(os.environ.get("TG_ADAPTIVE_MIN_PARALLEL", 1))
+        self.TG_ADAPTIVE_MAX_PARALLEL = int(os.environ.get("TG_ADAPTIVE_MAX_PARALLEL", 8))
+        self.TG_ADAPTIVE_INTERVAL = int(os.environ.get("TG_ADAPTIVE_INTERVAL", 30))
         self.TG_PROGRESS_DOWNLOAD = os.environ.get("TG_PROGRESS_DOWNLOAD", True)
         self.PROGRESS_STATUS_SHOW = os.environ.get("PROGRESS_STATUS_SHOW", 10)
+        self.PROGRESS_EDITS_PER_SECOND = float(os.environ.get("PROGRESS_EDITS_PER_SECOND", 1))
+        self.PROGRESS_MIN_INTERVAL = int(os.environ.get("PROGRESS_MIN_INTERVAL", 5))
         self.TG_DOWNLOAD_PATH = os.environ.get("TG_DOWNLOAD_PATH", "/download")
         self.TG_DOWNLOAD_PATH_TORRENTS = os.environ.get("TG_DOWNLOAD_PATH_TORRENTS", "/watch")  # fmt: skip
 
@@ -28,6 +37,13 @@ class EnvironmentReader:
         self.PATH_LINKS = os.path.join(self.TG_DOWNLOAD_PATH, "links")
         self.PATH_TMP = os.path.join(self.TG_DOWNLOAD_PATH, "tmp")
 
+        ## LINKS
+        self.HTTP_SEGMENTS = int(os.environ.get("HTTP_SEGMENTS", 4))
+        self.HTTP_SEGMENT_MIN_MB = int(os.environ.get("HTTP_SEGMENT_MIN_MB", 16))
+        self.HTTP_CHUNK_SIZE_KB = int(os.environ.get("HTTP_CHUNK_SIZE_KB", 1024))
+        self.HTTP_MAX_PER_HOST = int(os.environ.get("HTTP_MAX_PER_HOST", 2))
+        self.HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", 10))
+
         ## YOUTUBE
         self.PATH_YOUTUBE = os.path.join(self.TG_DOWNLOAD_PATH, "youtube")
         self.YOUTUBE_AUDIO_FOLDER = os.environ.get("YOUTUBE_AUDIO_FOLDER", os.path.join(self.PATH_YOUTUBE, "youtube_audios"))  # fmt: skip
@@ -52,14 +68,31 @@ class EnvironmentReader:
             os.environ.get("YOUTUBE_SHOW_OPTION_TIMEOUT", 5)
         )
         self.YOUTUBE_SHOW_OPTION = os.environ.get("YOUTUBE_SHOW_OPTION", True)
+        self.YOUTUBE_MAX_WORKERS = int(os.environ.get("YOUTUBE_MAX_WORKERS", 4))
+        self.YOUTUBE_PLAYLIST_WORKERS = int(os.environ.get("YOUTUBE_PLAYLIST_WORKERS", 3))
+        self.YOUTUBE_PLAYLIST_RETRIES = int(os.environ.get("YOUTUBE_PLAYLIST_RETRIES", 2))
+        self.YOUTUBE_INFO_CACHE_TTL = int(os.environ.get("YOUTUBE_INFO_CACHE_TTL", 600))
+        self.YOUTUBE_INFO_CACHE_SIZE = int(os.environ.get("YOUTUBE_INFO_CACHE_SIZE", 64))
 
         ## TELEGRAM
         self.TG_DL_TIMEOUT = int(os.environ.get("TG_DL_TIMEOUT", 3600))
+        self.TG_DOWNLOAD_WORKERS = int(os.environ.get("TG_DOWNLOAD_WORKERS", 4))
+        self.TG_DOWNLOAD_PART_SIZE_KB = int(os.environ.get("TG_DOWNLOAD_PART_SIZE_KB", 512))
+        self.TG_DOWNLOAD_PARALLEL_MIN_MB = int(os.environ.get("TG_DOWNLOAD_PARALLEL_MIN_MB", 20))
+        self.TG_DOWNLOAD_RESUME = os.environ.get("TG_DOWNLOAD_RESUME", True)
+        self.TG_STAGING_SAME_DEVICE = os.environ.get("TG_STAGING_SAME_DEVICE", True)
+        self.TG_STAGING_DIR_NAME = os.environ.get("TG_STAGING_DIR_NAME", "telethon_tmp")
+        self.TG_RESUME_CHECKPOINT_MB = int(os.environ.get("TG_RESUME_CHECKPOINT_MB", 32))
+        self.FS_MAX_WORKERS = int(os.environ.get("FS_MAX_WORKERS", 4))
         self.TG_FOLDER_BY_AUTHORIZED = os.environ.get("TG_FOLDER_BY_AUTHORIZED", False)
         self.TG_UNZIP_TORRENTS = os.environ.get("TG_UNZIP_TORRENTS", False)
         self.ENABLED_UNZIP = os.environ.get("ENABLED_UNZIP", False)
         self.ENABLED_UNRAR = os.environ.get("ENABLED_UNRAR", False)
         self.ENABLED_7Z = os.environ.get("ENABLED_7Z", False)
+        self.EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", 4))
+        self.EXTRACT_VOLUMES_CLEANUP = os.environ.get("EXTRACT_VOLUMES_CLEANUP", "keep").lower()
+        self.POST_WORKERS = int(os.environ.get("POST_WORKERS", 2))
+        self.POST_QUEUE_SIZE = int(os.environ.get("POST_QUEUE_SIZE", 100))
 
         ## GROUP SCANNER
         self.SCAN_MIN_FILE_SIZE_MB = int(os.environ.get("SCAN_MIN_FILE_SIZE_MB", 100))
@@ -67,6 +100,11 @@ class EnvironmentReader:
         self.SCAN_DEFAULT_DAYS = int(os.environ.get("SCAN_DEFAULT_DAYS", 30))
         self.SCAN_MAX_DAYS = int(os.environ.get("SCAN_MAX_DAYS", 365))
         self.SCAN_DEFAULT_LIMIT = int(os.environ.get("SCAN_DEFAULT_LIMIT", 0)) if os.environ.get("SCAN_DEFAULT_LIMIT", "0") != "0" else None
+        self.SCAN_SERVER_FILTER = os.environ.get("SCAN_SERVER_FILTER", "True").lower() == "true"
+        self.SCAN_PAGE_SIZE = int(os.environ.get("SCAN_PAGE_SIZE", 100))
+        self.SCAN_QUEUE_SIZE = int(os.environ.get("SCAN_QUEUE_SIZE", 10))
+        self.SCAN_REQUESTS_PER_SECOND = float(os.environ.get("SCAN_REQUESTS_PER_SECOND", 3))
+        self.SCAN_BATCH_PARALLEL = int(os.environ.get("SCAN_BATCH_PARALLEL", 3))
         
         ## AUTO SCANNER (Monitoreo automático en tiempo real)
         self.AUTO_SCAN_ENABLED = os.environ.get("AUTO_SCAN_ENABLED", "False").lower() == "true"
@@ -75,11 +113,19 @@ class EnvironmentReader:
         self.AUTO_SCAN_NOTIFY_USER = int(os.environ.get("AUTO_SCAN_NOTIFY_USER")) if os.environ.get("AUTO_SCAN_NOTIFY_USER") else None
         self.AUTO_SCAN_WHITELIST_ONLY = os.environ.get("AUTO_SCAN_WHITELIST_ONLY", "True").lower() == "true"
 
+        ## DEDUP (Documentos ya descargados en otros grupos)
+        self.DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "True").lower() == "true"
+        self.DEDUP_ACTION = os.environ.get("DEDUP_ACTION", "skip").lower()
+        self.DEDUP_MATCH_DC = os.environ.get("DEDUP_MATCH_DC", "False").lower() == "true"
+
         self.LANGUAGE = os.environ.get("APP_LANGUAGE", "en_EN")
+        self.PENDING_JOURNAL_COMPACT_OPS = int(os.environ.get("PENDING_JOURNAL_COMPACT_OPS", 500))
 
         self.PATH_CONFIG = "/config/config.ini"
         self.PATH_PENDING_MESSAGES = "/config/pending_messages.json"
+        self.PATH_PENDING_JOURNAL = "/config/pending_messages.journal"
         self.PATH_DOWNLOAD_FILES = "/config/download_files.json"
+        self.PATH_DOWNLOAD_FILES_DB = "/config/download_files.db"
 
         self.YOUTUBE = "youtube"
 
@@ -1,33 +1,106 @@
 import json
 import os
+import sys
+import time
+import sqlite3
+import threading
 from datetime import datetime
 from constants import EnvironmentReader
 import logger
 
 
 class DownloadFilesDB:
-    def __init__(self):
+    """
+    Historial de descargas en SQLite (modo WAL)
+
+    Cada descarga es una fila indexada por message_id, event_id, user_id y
+    fecha, así que insertar no reescribe nada y /rename encuentra archivos
+    de cualquier antigüedad. La primera vez importa download_files.json.
+    """
+
+    COLUMNS = [
+        "user_id",
+        "event_id",
+        "message_id",
+        "original_filename",
+        "new_filename",
+        "download_date",
+        "update_date",
+    ]
+
+    def __init__(self, db_file=None, json_file=None):
         self.constants = EnvironmentReader()
-        self.json_file = self.constants.get_variable("PATH_DOWNLOAD_FILES")
-        self.downloads = self.load_from_json()
-        self.limit = 500
+        self.db_file = db_file or self.constants.get_variable("PATH_DOWNLOAD_FILES_DB")
+        self.json_file = json_file or self.constants.get_variable("PATH_DOWNLOAD_FILES")
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(
+            self.db_file, check_same_thread=False, isolation_level=None
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_tables()
+        self.migrate_from_json()
+
+    def create_tables(self):
+        with self.lock:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS download_files (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    event_id INTEGER,
+                    message_id INTEGER,
+                    original_filename TEXT,
+                    new_filename TEXT,
+                    download_date TEXT,
+                    update_date TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_download_files_message_id ON download_files (message_id);
+                CREATE INDEX IF NOT EXISTS idx_download_files_event_id ON download_files (event_id);
+                CREATE INDEX IF NOT EXISTS idx_download_files_user_id ON download_files (user_id);
+                CREATE INDEX IF NOT EXISTS idx_download_files_download_date ON download_files (download_date);
+                """
+            )
+
+    def migrate_from_json(self):
+        """Importa download_files.json una sola vez (PRAGMA user_version)"""
+        with self.lock:
+            if self.connection.execute("PRAGMA user_version").fetchone()[0] >= 1:
+                return
+
+            records = DownloadFilesJSON(self.json_file, limit=None).downloads
+            try:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    f"INSERT INTO download_files ({', '.join(self.COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(self.COLUMNS))})",
+                    [
+                        tuple(record.get(column) for column in self.COLUMNS)
+                        for record in records
+                    ],
+                )
+                self.connection.execute("PRAGMA user_version = 1")
+                self.connection.execute("COMMIT")
+            except Exception as e:
+                self.connection.execute("ROLLBACK")
+                logger.logger.error(f"DownloadFilesDB migrate_from_json Exception: {e}")
+                return
+
+        if records:
+            logger.logger.info(
+                f"DownloadFilesDB migrated {len(records)} records from {self.json_file}"
+            )
 
     def add_download_files(self, user_id, event_id, message_id, original_filename):
-        download_info = {
-            "user_id": user_id,
-            "event_id": event_id,
-            "message_id": message_id,
-            "original_filename": original_filename,
-            "new_filename": None,
-            "download_date": str(datetime.now()),
-            "update_date": None,  # Will be updated when necessary
-        }
-
-        # Add download information
-        self.downloads.append(download_info)
-
-        # Save to the JSON file
-        self.save_to_json()
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO download_files "
+                "(user_id, event_id, message_id, original_filename, download_date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, event_id, message_id, original_filename, str(datetime.now())),
+            )
 
     def update_download_files(self, message_id, new_filename):
         logger.logger.info(
@@ -35,23 +108,237 @@ class DownloadFilesDB:
         )
 
         try:
-            for record in self.downloads:
-                if (
-                    record["message_id"] == message_id
-                    or record["event_id"] == message_id
-                ):
-                    record["new_filename"] = new_filename
-                    record["update_date"] = str(datetime.now())
-
-                    self.save_to_json()
-
-                    return True
-            return False
+            with self.lock:
+                cursor = self.connection.execute(
+                    "UPDATE download_files SET new_filename = ?, update_date = ? "
+                    "WHERE id = (SELECT id FROM download_files "
+                    "WHERE message_id = ? OR event_id = ? ORDER BY id DESC LIMIT 1)",
+                    (new_filename, str(datetime.now()), message_id, message_id),
+                )
+            return cursor.rowcount > 0
 
         except Exception as e:
             logger.logger.info(f"update_download_files => Exception: {e}")
             return None
 
+    def get_download_file(self, message_id):
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM download_files "
+                "WHERE message_id = ? OR event_id = ? ORDER BY id DESC LIMIT 1",
+                (message_id, message_id),
+            ).fetchone()
+        return dict(row) if row else None
+
+
+class DocumentIndexDB:
+    """
+    Índice de documentos de Telegram ya descargados
+
+    La clave es la identidad del documento (id y tamaño, y opcionalmente
+    dc_id), que se mantiene cuando el mismo archivo se reenvía a otros
+    grupos. Comparte la base de datos con DownloadFilesDB.
+    """
+
+    def __init__(self, db_file=None):
+        self.constants = EnvironmentReader()
+        self.db_file = db_file or self.constants.get_variable("PATH_DOWNLOAD_FILES_DB")
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(
+            self.db_file, check_same_thread=False, isolation_level=None
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS document_index (
+                    document_id INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    dc_id INTEGER,
+                    file_path TEXT NOT NULL,
+                    chat_id INTEGER,
+                    message_id INTEGER,
+                    download_date TEXT,
+                    PRIMARY KEY (document_id, size)
+                )
+                """
+            )
+
+    def add_document(self, document_id, size, dc_id, file_path, chat_id=None, message_id=None):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO document_index "
+                "(document_id, size, dc_id, file_path, chat_id, message_id, download_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (document_id, size, dc_id, file_path, chat_id, message_id, str(datetime.now())),
+            )
+
+    def get_document(self, document_id, size, dc_id=None):
+        """
+        Busca un documento ya descargado
+
+        Args:
+            document_id: document.id de Telegram
+            size: Tamaño en bytes
+            dc_id: Si se indica, también debe coincidir el data center
+
+        Returns:
+            dict: Fila del índice o None
+        """
+        query = "SELECT * FROM document_index WHERE document_id = ? AND size = ?"
+        params = [document_id, size]
+        if dc_id is not None:
+            query += " AND dc_id = ?"
+            params.append(dc_id)
+        with self.lock:
+            row = self.connection.execute(query, params).fetchone()
+        return dict(row) if row else None
+
+    def remove_document(self, document_id, size):
+        with self.lock:
+            self.connection.execute(
+                "DELETE FROM document_index WHERE document_id = ? AND size = ?",
+                (document_id, size),
+            )
+
+
+class ScanCheckpointDB:
+    """
+    Puntos de control de los escaneos de grupos
+
+    Por cada grupo guarda el último mensaje revisado, su fecha y desde qué
+    fecha está cubierto el historial, junto con los archivos grandes
+    encontrados, para que un escaneo incremental solo pida los mensajes
+    nuevos (min_id) y los una a los anteriores. Comparte la base de datos
+    con DownloadFilesDB.
+    """
+
+    def __init__(self, db_file=None):
+        self.constants = EnvironmentReader()
+        self.db_file = db_file or self.constants.get_variable("PATH_DOWNLOAD_FILES_DB")
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(
+            self.db_file, check_same_thread=False, isolation_level=None
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                    group_id INTEGER PRIMARY KEY,
+                    last_message_id INTEGER NOT NULL,
+                    last_date TEXT,
+                    since_date TEXT NOT NULL,
+                    scan_date TEXT
+                );
+                CREATE TABLE IF NOT EXISTS scan_results (
+                    group_id INTEGER NOT NULL,
+                    message_id INTEGER NOT NULL,
+                    filename TEXT,
+                    size INTEGER,
+                    date TEXT,
+                    PRIMARY KEY (group_id, message_id)
+                );
+                """
+            )
+
+    def get_checkpoint(self, group_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM scan_checkpoints WHERE group_id = ?", (group_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def save_checkpoint(self, group_id, last_message_id, last_date, since_date):
+        """
+        Args:
+            group_id: ID del grupo
+            last_message_id: Mensaje más reciente ya revisado
+            last_date: Fecha de ese mensaje (datetime o None)
+            since_date: Fecha desde la que el historial está revisado
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO scan_checkpoints "
+                "(group_id, last_message_id, last_date, since_date, scan_date) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    group_id,
+                    last_message_id,
+                    last_date.isoformat() if last_date else None,
+                    since_date.isoformat(),
+                    str(datetime.now()),
+                ),
+            )
+
+    def add_results(self, group_id, files):
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO scan_results "
+                "(group_id, message_id, filename, size, date) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        group_id,
+                        file_info["message_id"],
+                        file_info["filename"],
+                        file_info["size"],
+                        file_info["date"].isoformat(),
+                    )
+                    for file_info in files
+                ],
+            )
+
+    def get_results(self, group_id, since_date, min_size=0):
+        """Archivos guardados del grupo desde since_date y de al menos min_size"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT * FROM scan_results WHERE group_id = ? AND date >= ? AND size >= ? "
+                "ORDER BY message_id DESC",
+                (group_id, since_date.isoformat(), min_size),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def remove_results(self, group_id, message_ids):
+        with self.lock:
+            self.connection.executemany(
+                "DELETE FROM scan_results WHERE group_id = ? AND message_id = ?",
+                [(group_id, message_id) for message_id in message_ids],
+            )
+
+
+class DownloadFilesJSON:
+    """
+    Historial antiguo en download_files.json, reescrito en cada cambio
+
+    Solo se usa para migrar a DownloadFilesDB y en el benchmark.
+    """
+
+    def __init__(self, json_file=None, limit=500):
+        self.constants = EnvironmentReader()
+        self.json_file = json_file or self.constants.get_variable("PATH_DOWNLOAD_FILES")
+        self.limit = limit
+        self.downloads = self.load_from_json()
+
+    def add_download_files(self, user_id, event_id, message_id, original_filename):
+        self.downloads.append(
+            {
+                "user_id": user_id,
+                "event_id": event_id,
+                "message_id": message_id,
+                "original_filename": original_filename,
+                "new_filename": None,
+                "download_date": str(datetime.now()),
+                "update_date": None,
+            }
+        )
+        self.save_to_json()
+
     def save_to_json(self):
         with open(self.json_file, "w") as file:
             json.dump(self.downloads[-self.limit :], file, indent=2)
@@ -60,15 +347,16 @@ class DownloadFilesDB:
         try:
             with open(self.json_file, "r") as json_file:
                 data = json.load(json_file)
-                return data[-500:]
+                return data[-self.limit :] if self.limit else data
 
         except FileNotFoundError:
             return []
         except Exception as e:
+            logger.logger.error(f"DownloadFilesJSON load_from_json Exception: {e}")
             return []
 
     def get_download_file(self, message_id):
-        found_element = next(
+        return next(
             (
                 download_info
                 for download_info in self.downloads
@@ -77,4 +365,42 @@ class DownloadFilesDB:
             ),
             None,
         )
-        return found_element
+
+
+# Benchmark: inserciones y búsquedas del JSON antiguo contra SQLite
+# Uso: python3 db_downloads.py [records] [lookups]
+if __name__ == "__main__":
+    import tempfile
+
+    records = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, store in (
+            ("json", DownloadFilesJSON(os.path.join(tmp, "download_files.json"))),
+            (
+                "sqlite",
+                DownloadFilesDB(
+                    os.path.join(tmp, "download_files.db"),
+                    os.path.join(tmp, "missing.json"),
+                ),
+            ),
+        ):
+            start = time.time()
+            for index in range(records):
+                store.add_download_files(1, index, records + index, f"/download/file_{index}.mkv")
+            insert_time = time.time() - start
+
+            start = time.time()
+            found = sum(
+                1
+                for index in range(lookups)
+                if store.get_download_file(records + (index * 7919) % records)
+            )
+            lookup_time = time.time() - start
+
+            print(
+                f"{name}: {records} inserts {insert_time:.3f}s "
+                f"({records / insert_time:.0f}/s), {lookups} lookups {lookup_time:.3f}s "
+                f"({lookups / lookup_time:.0f}/s), found {found}"
+            )
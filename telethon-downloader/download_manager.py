@@ -1,31 +1,201 @@
 import re
 import os
+import sys
+import time
 
 import logger
 import configparser
 
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
 
 class DownloadPathManager:
+    """
+    Reglas REGEX_PATH compiladas una sola vez
+
+    Cada regla "/patrón/" o "/patrón/i" se compila al crear el gestor y se
+    le extrae el literal más largo que toda coincidencia debe contener.
+    Para cada archivo las reglas se prueban en el orden de config.ini
+    (gana la primera que coincide, como siempre), pero solo se ejecuta la
+    regex de las reglas cuyo literal aparece en el nombre. Si ninguna
+    regla puede coincidir, una única regex con todas las alternativas lo
+    descarta de una pasada.
+    """
+
     def __init__(self, SECTIONS):
         self.SECTIONS = SECTIONS
+        self.rules = self._compile_rules(SECTIONS.get("REGEX_PATH", {}))
+        self.combined = self._compile_combined(self.rules)
+
+    def _compile_rules(self, regex_path):
+        rules = []
+        for REGEX_PATH, download_path in regex_path.items():
+            flags = 0
+            pattern = REGEX_PATH
+            if REGEX_PATH.endswith("/i"):
+                pattern = REGEX_PATH[:-2]
+                flags = re.IGNORECASE
+            pattern = pattern.strip("/")
+            try:
+                compiled = re.compile(pattern, flags)
+            except re.error as e:
+                logger.logger.error(f"DownloadPathManager invalid rule {REGEX_PATH}: {e}")
+                continue
+            # compiled.flags incluye las banderas en línea como (?i)
+            flags = compiled.flags & re.IGNORECASE
+            literal, combinable = self._analyze(pattern, flags)
+            rules.append(
+                {
+                    "rule": REGEX_PATH,
+                    "path": os.path.join(download_path),
+                    "regex": compiled,
+                    "literal": literal,
+                    "ignorecase": bool(flags),
+                    "combinable": combinable,
+                }
+            )
+        return rules
+
+    def _analyze(self, pattern, flags):
+        """
+        Devuelve el literal más largo que toda coincidencia contiene (o
+        None) y si la regla se puede meter en la alternativa combinada
+        (no usa referencias a grupos)
+        """
+        try:
+            parsed = sre_parse.parse(pattern, flags)
+        except Exception:
+            return None, False
+
+        combinable = not re.search(r"\\[1-9]|\(\?P=|\(\?\(", pattern)
+
+        best, current = "", ""
+        for op, value in parsed:
+            if op is sre_parse.LITERAL:
+                current += chr(value)
+                best = max(best, current, key=len)
+            else:
+                current = ""
+
+        if not best or (flags & re.IGNORECASE and not best.isascii()):
+            return None, combinable
+        return (best.lower() if flags & re.IGNORECASE else best), combinable
+
+    def _compile_combined(self, rules):
+        if not rules or not all(rule["combinable"] for rule in rules):
+            return None
+        try:
+            return re.compile(
+                "|".join(
+                    f"(?{'i' if rule['ignorecase'] else ''}:{rule['regex'].pattern})"
+                    for rule in rules
+                )
+            )
+        except re.error:
+            return None
+
+    def match(self, filename):
+        """
+        Primera regla REGEX_PATH que coincide con filename
+
+        Returns:
+            dict: Regla (rule, path) o None
+        """
+        if self.combined is not None and not self.combined.search(filename):
+            return None
+
+        # Con IGNORECASE, lower() solo equivale a la regex en nombres ASCII
+        lower_filename = filename.lower() if filename.isascii() else None
+        for rule in self.rules:
+            literal = rule["literal"]
+            if literal is not None:
+                if rule["ignorecase"]:
+                    if lower_filename is not None and literal not in lower_filename:
+                        continue
+                elif literal not in filename:
+                    continue
+            if rule["regex"].search(filename):
+                return rule
+        return None
 
     def getREGEXPATH(self, filename):
         logger.logger.info(f"getREGEXPATH :::: filename=[{filename}]")
-        download_path = None
         try:
-            for REGEX_PATH in self.SECTIONS["REGEX_PATH"]:
-                flags = 0
-                pattern = REGEX_PATH
-                if re.search(r"/i$", REGEX_PATH):
-                    pattern = REGEX_PATH[:-2]
-                    flags = re.IGNORECASE
-                pattern = pattern.strip("/")
-                if re.search(pattern, filename, flags=flags):
-                    download_path = os.path.join(
-                        self.SECTIONS["REGEX_PATH"][REGEX_PATH]
-                    )
-                    return download_path
+            rule = self.match(filename)
+            return rule["path"] if rule else None
         except Exception as e:
             logger.logger.error(f"getREGEXPATH Exception: {e}")
+        return None
+
+
+# Benchmark: reglas compiladas contra el recorrido anterior (re.search por regla)
+# Uso: python3 download_manager.py [rules] [filenames]
+if __name__ == "__main__":
+    import random
+    import logging
+
+    logger.logger.setLevel(logging.WARNING)
+
+    def legacy_getREGEXPATH(sections, filename):
+        for REGEX_PATH in sections["REGEX_PATH"]:
+            flags = 0
+            pattern = REGEX_PATH
+            if re.search(r"/i$", REGEX_PATH):
+                pattern = REGEX_PATH[:-2]
+                flags = re.IGNORECASE
+            pattern = pattern.strip("/")
+            if re.search(pattern, filename, flags=flags):
+                return os.path.join(sections["REGEX_PATH"][REGEX_PATH])
+        return None
+
+    rules_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    names_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    random.seed(1)
+
+    regex_path = {}
+    for index in range(rules_count):
+        kind = index % 4
+        if kind == 0:
+            regex_path[f"/show{index}/i"] = f"/download/show{index}"
+        elif kind == 1:
+            regex_path[f"/Serie.{index}.S\\d+E\\d+/"] = f"/download/serie{index}"
+        elif kind == 2:
+            regex_path[f"/^movie_{index}_(720|1080)p/i"] = f"/download/movie{index}"
+        else:
+            regex_path[f"/artist {index} - .*\\.(mp3|flac)$/i"] = f"/download/music{index}"
+    sections = {"REGEX_PATH": regex_path}
+
+    filenames = []
+    for index in range(names_count):
+        target = random.randrange(rules_count * 2)
+        kind = target % 4
+        filenames.append(
+            [
+                f"The.SHOW{target}.2024.mkv",
+                f"Serie.{target}.S01E0{index % 9}.mkv",
+                f"movie_{target}_1080p.mp4",
+                f"Artist {target} - Song {index}.mp3",
+            ][kind]
+        )
+
+    start = time.time()
+    legacy = [legacy_getREGEXPATH(sections, filename) for filename in filenames]
+    legacy_time = time.time() - start
+
+    start = time.time()
+    manager = DownloadPathManager(sections)
+    compile_time = time.time() - start
+    start = time.time()
+    compiled = [
+        (rule["path"] if (rule := manager.match(filename)) else None)
+        for filename in filenames
+    ]
+    compiled_time = time.time() - start
 
-        return download_path
+    print(f"{rules_count} rules x {names_count} filenames")
+    print(f"legacy:   {legacy_time:.2f}s")
+    print(f"compiled: {compiled_time:.2f}s (+{compile_time:.2f}s compiling)")
+    print(f"same results: {legacy == compiled}, matched: {sum(1 for path in compiled if path)}")
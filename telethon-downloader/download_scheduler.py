@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import time
+import heapq
+import asyncio
+import itertools
+import contextlib
+
+import logger
+from constants import EnvironmentReader
+
+
+class DownloadScheduler:
+    """
+    Planificador de descargas con una cola de prioridad por origen
+
+    Sustituye al semáforo global: cada origen (interactive, youtube, auto,
+    scan) tiene su propia cola y los huecos libres se reparten por stride
+    scheduling según el peso de cada origen, de modo que un escaneo con
+    muchos archivos no bloquea lo que envía el usuario. Dentro de cada
+    cola los archivos pequeños pasan primero (shortest-job-first) y el
+    resto mantiene el orden de llegada.
+    """
+
+    SOURCES = ["interactive", "youtube", "auto", "scan"]
+
+    def __init__(self, limit):
+        self.constants = EnvironmentReader()
+
+        self.limit = max(1, int(limit))
+        self.small_file_size = (
+            self.constants.get_variable("TG_SCHEDULER_SMALL_FILE_MB") * 1024 * 1024
+        )
+        self.weights = self._parse_weights(
+            self.constants.get_variable("TG_SCHEDULER_WEIGHTS")
+        )
+
+        self.active = 0
+        self.sequence = itertools.count()
+        self.queues = {source: [] for source in self.weights}
+        self.pass_values = {source: 0.0 for source in self.weights}
+        self.stats = {
+            source: {"active": 0, "served": 0, "total_wait": 0.0, "max_wait": 0.0}
+            for source in self.weights
+        }
+
+        logger.logger.info(
+            f"DownloadScheduler initialized: limit={self.limit} weights={self.weights}"
+        )
+
+    def _parse_weights(self, weights):
+        parsed = {source: 1 for source in self.SOURCES}
+        try:
+            for item in str(weights).replace(" ", "").split(","):
+                if ":" in item:
+                    source, weight = item.split(":", 1)
+                    parsed[source] = max(1, int(weight))
+        except Exception as e:
+            logger.logger.error(f"DownloadScheduler weights Exception: {weights} [{e}]")
+        return parsed
+
+    @contextlib.asynccontextmanager
+    async def slot(self, source="interactive", size=0, label=None):
+        """
+        Reserva un hueco de descarga durante el bloque ``async with``
+
+        Args:
+            source: Origen del trabajo (interactive, youtube, auto, scan)
+            size: Tamaño en bytes, 0 si no se conoce
+            label: Texto para identificar el trabajo en los logs
+        """
+        await self.acquire(source, size, label)
+        try:
+            yield
+        finally:
+            self.release(source)
+
+    async def acquire(self, source="interactive", size=0, label=None):
+        if source not in self.queues:
+            source = "interactive"
+
+        enqueued_at = time.time()
+        if self.active < self.limit and not self.queue_depth():
+            self._start(source, enqueued_at)
+            return
+
+        if not self.queues[source]:
+            # Un origen que vuelve a tener trabajo no acumula crédito del tiempo inactivo
+            self.pass_values[source] = max(
+                self.pass_values[source], self._virtual_time()
+            )
+
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(
+            self.queues[source],
+            (self._job_key(size), next(self.sequence), enqueued_at, future, label),
+        )
+        logger.logger.info(
+            f"DownloadScheduler queued: {label} source={source} size={size} depth={self.queue_depth()}"
+        )
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # El hueco ya se había concedido: devolverlo
+                self.release(source)
+            raise
+
+    def release(self, source="interactive"):
+        if source not in self.queues:
+            source = "interactive"
+        self.active -= 1
+        self.stats[source]["active"] -= 1
+        self._dispatch()
+
+    def set_limit(self, limit):
+        self.limit = max(1, int(limit))
+        self._dispatch()
+
+    def _job_key(self, size):
+        if size and size < self.small_file_size:
+            return (0, size)
+        return (1, 0)
+
+    def _virtual_time(self):
+        backlogged = [
+            self.pass_values[source] for source, queue in self.queues.items() if queue
+        ]
+        return min(backlogged) if backlogged else max(self.pass_values.values())
+
+    def _start(self, source, enqueued_at):
+        wait = time.time() - enqueued_at
+        self.active += 1
+        self.stats[source]["active"] += 1
+        self.stats[source]["served"] += 1
+        self.stats[source]["total_wait"] += wait
+        self.stats[source]["max_wait"] = max(self.stats[source]["max_wait"], wait)
+
+    def _dispatch(self):
+        while self.active < self.limit:
+            source = self._next_source()
+            if source is None:
+                return
+
+            _, _, enqueued_at, future, label = heapq.heappop(self.queues[source])
+            if future.done():
+                continue
+
+            self.pass_values[source] += 1.0 / self.weights[source]
+            self._start(source, enqueued_at)
+            future.set_result(True)
+            logger.logger.info(
+                f"DownloadScheduler started: {label} source={source} "
+                f"waited={time.time() - enqueued_at:.1f}s"
+            )
+
+    def _next_source(self):
+        candidates = []
+        for position, source in enumerate(self.weights):
+            queue = self.queues[source]
+            while queue and queue[0][3].done():
+                heapq.heappop(queue)
+            if queue:
+                candidates.append((self.pass_values[source], position, source))
+        return min(candidates)[2] if candidates else None
+
+    def queue_depth(self, source=None):
+        sources = [source] if source else self.queues
+        return sum(
+            1
+            for name in sources
+            for item in self.queues[name]
+            if not item[3].done()
+        )
+
+    def get_status_info(self):
+        """
+        Obtiene el estado de las colas del planificador
+
+        Returns:
+            dict: Límite, huecos activos y profundidad/espera por origen
+        """
+        now = time.time()
+        sources = {}
+        for source, stats in self.stats.items():
+            waiting = [item[2] for item in self.queues[source] if not item[3].done()]
+            sources[source] = {
+                "weight": self.weights[source],
+                "queued": len(waiting),
+                "active": stats["active"],
+                "served": stats["served"],
+                "avg_wait": stats["total_wait"] / stats["served"] if stats["served"] else 0.0,
+                "max_wait": stats["max_wait"],
+                "oldest_wait": now - min(waiting) if waiting else 0.0,
+            }
+
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queue_depth(),
+            "sources": sources,
+        }
@@ -1,41 +1,337 @@
 import os
+import re
+import time
+import shutil
 import asyncio
+import tarfile
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import logger
+from constants import EnvironmentReader
 
 
 class FileExtractor:
-    def __init__(self):
-        self.data = []
+    """
+    Extracción de archivos comprimidos con progreso y resultado
 
-    async def extract_unrar(self, file, destination_directory):
-        try:
-            command = f'unrar x "{file}" -o "{destination_directory}"'
-            logger.logger.info(f"extract_unrar starting => command: {command}")
+    zip y tar se leen en el propio proceso: los miembros de un zip (y de
+    un tar sin comprimir) se reparten entre EXTRACT_WORKERS hilos, cada uno
+    con su propio descriptor del archivo; un tar comprimido se extrae en
+    flujo porque su descompresión es secuencial. rar y 7z se ejecutan con
+    unrar/7z sin shell, leyendo su salida por trozos para obtener el
+    porcentaje. Todas las extracciones devuelven un dict con success,
+    files, bytes, elapsed, speed (MB/s) y error.
+    """
+
+    TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+    def __init__(self, workers=None):
+        self.constants = EnvironmentReader()
+        self.workers = workers or max(1, self.constants.get_variable("EXTRACT_WORKERS"))
+
+    @classmethod
+    def archive_type(cls, file_name):
+        """zip, tar, rar, 7z o None según la extensión"""
+        name = file_name.lower()
+        if name.endswith(".zip"):
+            return "zip"
+        if name.endswith(cls.TAR_SUFFIXES):
+            return "tar"
+        if name.endswith(".rar"):
+            return "rar"
+        if name.endswith(".7z"):
+            return "7z"
+        return None
 
-            process = await asyncio.create_subprocess_shell(
-                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    @classmethod
+    def base_name(cls, file_name):
+        """Nombre sin la extensión del archivo comprimido (también .tar.gz)"""
+        lower = file_name.lower()
+        for suffix in sorted(cls.TAR_SUFFIXES, key=len, reverse=True):
+            if lower.endswith(suffix):
+                return file_name[: -len(suffix)]
+        return os.path.splitext(file_name)[0]
+
+    async def extract(self, file, destination_directory, tracker=None):
+        """
+        Extrae file en destination_directory según su tipo
+
+        Args:
+            file: Archivo comprimido
+            destination_directory: Carpeta de destino (se crea si no existe)
+            tracker: ProgressTracker del ProgressBus
+
+        Returns:
+            dict: Resultado de la extracción
+        """
+        extractors = {
+            "zip": self.extract_unzip,
+            "tar": self.extract_tar,
+            "rar": self.extract_unrar,
+            "7z": self.extract_7z,
+        }
+        archive_type = self.archive_type(file)
+        if archive_type is None:
+            return self._result(file, destination_directory, error="unsupported archive")
+        return await extractors[archive_type](file, destination_directory, tracker)
+
+    def _result(self, file, destination_directory, start=None, files=0, size=0, error=None):
+        elapsed = time.time() - start if start else 0.0
+        result = {
+            "success": error is None,
+            "archive": file,
+            "destination": destination_directory,
+            "files": files,
+            "bytes": size,
+            "elapsed": elapsed,
+            "speed": size / elapsed / 1024 / 1024 if elapsed > 0 else 0.0,
+            "error": error,
+        }
+        if error is None:
+            logger.logger.info(
+                f"FileExtractor extracted {file}: {files} files, "
+                f"{size / 1024 / 1024:.2f} MB in {elapsed:.2f}s ({result['speed']:.2f} MB/s)"
             )
-            await process.communicate()
-            logger.logger.info(f"extract_unrar finish => command: {command}")
-        except Exception as e:
-            logger.logger.error(f"Error extracting with unrar: {str(e)}")
+        else:
+            logger.logger.error(f"FileExtractor failed {file}: {error}")
+        return result
 
-    async def extract_unzip(self, file, destination_directory):
+    async def extract_unzip(self, file, destination_directory, tracker=None):
+        start = time.time()
         try:
-            command = f'unzip -o "{file}" -d "{destination_directory}"'
-            process = await asyncio.create_subprocess_shell(
-                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            files, size = await asyncio.to_thread(
+                self._extract_members,
+                file,
+                destination_directory,
+                self._open_zip,
+                tracker,
             )
-            await process.communicate()
+            return self._result(file, destination_directory, start, files, size)
         except Exception as e:
-            logger.logger.error(f"Error extracting with unzip: {str(e)}")
+            return self._result(file, destination_directory, start, error=str(e))
 
-    async def extract_7z(self, file, destination_directory):
+    async def extract_tar(self, file, destination_directory, tracker=None):
+        start = time.time()
         try:
-            command = f'7z x "{file}" -o"{destination_directory}"'
-            process = await asyncio.create_subprocess_shell(
-                command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
-            await process.communicate()
+            if file.lower().endswith(".tar"):
+                files, size = await asyncio.to_thread(
+                    self._extract_members,
+                    file,
+                    destination_directory,
+                    self._open_tar,
+                    tracker,
+                )
+            else:
+                files, size = await asyncio.to_thread(
+                    self._extract_tar_stream, file, destination_directory, tracker
+                )
+            return self._result(file, destination_directory, start, files, size)
         except Exception as e:
-            logger.logger.error(f"Error extracting with 7z: {str(e)}")
+            return self._result(file, destination_directory, start, error=str(e))
+
+    async def extract_unrar(self, file, destination_directory, tracker=None):
+        return await self._extract_process(
+            ["unrar", "x", "-o+", "-y", file, os.path.join(destination_directory, "")],
+            file,
+            destination_directory,
+            tracker,
+        )
+
+    async def extract_7z(self, file, destination_directory, tracker=None):
+        return await self._extract_process(
+            ["7z", "x", "-y", "-bsp1", f"-o{destination_directory}", file],
+            file,
+            destination_directory,
+            tracker,
+        )
+
+    # zip / tar en proceso
+
+    def _open_zip(self, file):
+        archive = zipfile.ZipFile(file)
+        members = [
+            (info.filename, info.file_size, "dir" if info.is_dir() else "file")
+            for info in archive.infolist()
+        ]
+
+        def extract_member(name, destination_directory):
+            archive.extract(name, destination_directory)
+
+        return archive, members, extract_member
+
+    def _open_tar(self, file):
+        archive = tarfile.open(file, "r:")
+        members = {member.name: member for member in archive.getmembers()}
+
+        def extract_member(name, destination_directory):
+            self._extract_tar_member(archive, members[name], destination_directory)
+
+        return (
+            archive,
+            [
+                (
+                    member.name,
+                    member.size,
+                    "dir" if member.isdir() else "file" if member.isfile() else "link",
+                )
+                for member in members.values()
+            ],
+            extract_member,
+        )
+
+    def _extract_tar_member(self, archive, member, destination_directory):
+        if hasattr(tarfile, "data_filter"):
+            archive.extract(member, destination_directory, filter="data")
+            return
+        # Python sin filtros de tarfile: no salir de la carpeta de destino
+        target = os.path.realpath(os.path.join(destination_directory, member.name))
+        root = os.path.realpath(destination_directory)
+        if os.path.commonpath([root, target]) != root or member.issym() or member.islnk():
+            raise ValueError(f"unsafe tar member {member.name}")
+        archive.extract(member, destination_directory)
+
+    def _extract_members(self, file, destination_directory, opener, tracker):
+        """
+        Reparte los miembros entre hilos; cada hilo abre su propio
+        descriptor del archivo porque ZipFile/TarFile no admiten lecturas
+        concurrentes sobre el mismo
+        """
+        os.makedirs(destination_directory, exist_ok=True)
+        archive, members, extract_member = opener(file)
+        files = [member for member in members if member[2] == "file"]
+        total = sum(size for _, size, _ in files)
+        try:
+            # Las carpetas antes que los archivos que contienen
+            for name, _, kind in members:
+                if kind == "dir":
+                    extract_member(name, destination_directory)
+        finally:
+            archive.close()
+        # Y las carpetas padre de cada archivo, aunque el archivo comprimido
+        # no las incluya, para que dos hilos no las creen a la vez
+        for parent in {os.path.dirname(name) for name, _, _ in files}:
+            parts = [part for part in parent.split("/") if part not in ("", ".", "..")]
+            if parts:
+                os.makedirs(os.path.join(destination_directory, *parts), exist_ok=True)
+
+        lock = threading.Lock()
+        progress = {"bytes": 0}
+        workers = max(1, min(self.workers, len(files)))
+        # Reparto por tamaño: cada miembro va al hilo con menos bytes
+        batches = [[] for _ in range(workers)]
+        loads = [0] * workers
+        for member in sorted(files, key=lambda member: member[1], reverse=True):
+            index = loads.index(min(loads))
+            batches[index].append(member)
+            loads[index] += member[1]
+
+        def run(batch):
+            archive, _, extract_member = opener(file)
+            try:
+                for name, size, _ in batch:
+                    extract_member(name, destination_directory)
+                    with lock:
+                        progress["bytes"] += size
+                        done = progress["bytes"]
+                    if tracker:
+                        tracker.update(done, total)
+            finally:
+                archive.close()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as executor:
+            for future in [executor.submit(run, batch) for batch in batches if batch]:
+                future.result()
+
+        # Los enlaces de un tar apuntan a archivos que ya deben existir
+        links = [member for member in members if member[2] == "link"]
+        if links:
+            archive, _, extract_member = opener(file)
+            try:
+                for name, _, _ in links:
+                    extract_member(name, destination_directory)
+            finally:
+                archive.close()
+        return len(files), total
+
+    def _extract_tar_stream(self, file, destination_directory, tracker):
+        os.makedirs(destination_directory, exist_ok=True)
+        total = os.path.getsize(file)
+        files = size = 0
+        with open(file, "rb") as raw, tarfile.open(fileobj=raw, mode="r|*") as archive:
+            for member in archive:
+                self._extract_tar_member(archive, member, destination_directory)
+                if member.isfile():
+                    files += 1
+                    size += member.size
+                if tracker:
+                    # Progreso sobre los bytes comprimidos ya leídos
+                    tracker.update(raw.tell(), total)
+        return files, size
+
+    # rar / 7z con subprocess
+
+    async def _extract_process(self, command, file, destination_directory, tracker):
+        start = time.time()
+        if shutil.which(command[0]) is None:
+            return self._result(
+                file, destination_directory, start, error=f"{command[0]} not installed"
+            )
+        os.makedirs(destination_directory, exist_ok=True)
+        total = os.path.getsize(file)
+        # El destino puede tener ya otros archivos: solo cuentan los que
+        # aparecen o cambian durante la extracción
+        before = await asyncio.to_thread(self._tree_snapshot, destination_directory)
+
+        logger.logger.info(f"FileExtractor starting => command: {command}")
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        # Solo se guardan las últimas líneas de error, no toda la salida
+        errors = deque(maxlen=20)
+
+        async def read_stdout():
+            while chunk := await process.stdout.read(4096):
+                percentages = re.findall(rb"(\d{1,3})%", chunk)
+                if percentages and tracker:
+                    tracker.update(total * min(100, int(percentages[-1])) // 100, total)
+
+        async def read_stderr():
+            async for line in process.stderr:
+                line = line.decode(errors="replace").strip()
+                if line:
+                    errors.append(line)
+
+        await asyncio.gather(read_stdout(), read_stderr())
+        returncode = await process.wait()
+        logger.logger.info(f"FileExtractor finish => {command[0]} returncode: {returncode}")
+
+        if returncode != 0:
+            return self._result(
+                file,
+                destination_directory,
+                start,
+                error=f"{command[0]} exit code {returncode}: {' | '.join(errors)}",
+            )
+        after = await asyncio.to_thread(self._tree_snapshot, destination_directory)
+        changed = [stat for path, stat in after.items() if before.get(path) != stat]
+        size = sum(stat[0] for stat in changed)
+        return self._result(file, destination_directory, start, len(changed), size)
+
+    def _tree_snapshot(self, directory):
+        """Tamaño y fechas de cada archivo bajo directory ({ruta: (size, mtime, ctime)})"""
+        snapshot = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+        return snapshot
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 
+import time
 import asyncio
-from telethon.tl.types import MessageMediaDocument, DocumentAttributeFilename
+from telethon.tl.types import (
+    MessageMediaDocument,
+    DocumentAttributeFilename,
+    InputMessagesFilterDocument,
+    InputMessagesFilterVideo,
+)
 from telethon.utils import get_peer_id
-from datetime import datetime, timedelta
+from telethon.errors import FloodWaitError
+from datetime import datetime, timedelta, timezone
+from db_downloads import ScanCheckpointDB
+from rate_limiter import RequestRateLimiter
 import logger
 
 
@@ -15,100 +24,401 @@ class GroupScanner:
         
         # Configuración desde variables de entorno
         self.MIN_FILE_SIZE = self.constants.get_variable("SCAN_MIN_FILE_SIZE_MB") * 1024 * 1024  # MB a bytes
-        self.semaphore = asyncio.Semaphore(self.constants.get_variable("SCAN_MAX_PARALLEL"))
+        self.MAX_PARALLEL = max(1, self.constants.get_variable("SCAN_MAX_PARALLEL"))
+        self.semaphore = asyncio.Semaphore(self.MAX_PARALLEL)
+        self.QUEUE_SIZE = max(1, self.constants.get_variable("SCAN_QUEUE_SIZE"))
         self.DEFAULT_DAYS = self.constants.get_variable("SCAN_DEFAULT_DAYS")
         self.MAX_DAYS = self.constants.get_variable("SCAN_MAX_DAYS")
         self.DEFAULT_LIMIT = self.constants.get_variable("SCAN_DEFAULT_LIMIT")
+        self.SERVER_FILTER = self.constants.get_variable("SCAN_SERVER_FILTER")
+        # messages.search devuelve como mucho 100 mensajes por petición
+        self.PAGE_SIZE = max(1, min(100, self.constants.get_variable("SCAN_PAGE_SIZE")))
+        self.SERVER_FILTERS = [InputMessagesFilterDocument(), InputMessagesFilterVideo()]
+        self.checkpoints = ScanCheckpointDB()
+        # Compartido por todos los escaneos, también los de /scanbatch
+        self.rate_limiter = RequestRateLimiter(
+            self.constants.get_variable("SCAN_REQUESTS_PER_SECOND")
+        )
+        self.BATCH_PARALLEL = max(1, self.constants.get_variable("SCAN_BATCH_PARALLEL"))
         
-    async def scan_group_for_large_files(self, group_id, days_back=30, limit=None):
+    async def scan_group_for_large_files(
+        self, group_id, days_back=30, limit=None, stats=None, incremental=False, queue=None
+    ):
         """
         Escanea un grupo en busca de archivos grandes
-        
+
+        Con SCAN_SERVER_FILTER se le piden a Telegram solo los mensajes con
+        documento o vídeo (messages.search), en páginas de SCAN_PAGE_SIZE y
+        pidiendo la siguiente página mientras se procesa la actual. Si la
+        búsqueda falla se recorre el historial completo como antes.
+
+        Cada escaneo guarda en ScanCheckpointDB el último mensaje revisado
+        y los archivos encontrados. En modo incremental solo se piden los
+        mensajes posteriores a ese punto de control (min_id) y el resultado
+        se une con los archivos guardados dentro de la ventana de días.
+
         Args:
             group_id: ID del grupo a escanear
             days_back: Días hacia atrás para buscar (default: 30)
             limit: Límite de mensajes a revisar (None = sin límite)
+            stats: dict opcional que se rellena con mode, fetched, pages,
+                elapsed, rate (mensajes/s), new y previous
+            incremental: Continuar desde el punto de control del grupo
+            queue: asyncio.Queue a la que se envía cada archivo en cuanto se
+                encuentra, para descargarlo mientras sigue el escaneo
         """
         try:
             logger.logger.info(f"Iniciando escaneo de archivos grandes (>{self.constants.get_variable('SCAN_MIN_FILE_SIZE_MB')}MB) en grupo: {group_id}")
             
             # Obtener información del grupo
+            stats = stats if stats is not None else {}
             try:
+                await self.rate_limiter.acquire()
                 entity = await self.client.get_entity(group_id)
                 group_name = getattr(entity, 'title', f'Grupo_{group_id}')
+                stats['group_name'] = group_name
                 logger.logger.info(f"Escaneando grupo: {group_name}")
             except Exception as e:
                 logger.logger.error(f"Error obteniendo entidad del grupo {group_id}: {e}")
+                stats['error'] = str(e)
                 return []
             
-            # Calcular fecha límite
-            date_limit = datetime.now() - timedelta(days=days_back)
-            
-            large_files = []
-            scanned_count = 0
-            
-            # Escanear mensajes del grupo
-            async for message in self.client.iter_messages(
-                entity, 
-                limit=limit,
-                offset_date=date_limit
-            ):
-                scanned_count += 1
-                
-                if scanned_count % 100 == 0:
-                    logger.logger.info(f"Escaneados {scanned_count} mensajes...")
-                
-                # Verificar si el mensaje tiene un documento
-                if (message.media and 
-                    isinstance(message.media, MessageMediaDocument) and 
-                    message.media.document):
-                    
-                    document = message.media.document
-                    file_size = document.size
-                    
-                    # Verificar si el archivo es mayor a 100MB
-                    if file_size >= self.MIN_FILE_SIZE:
-                        # Obtener nombre del archivo
-                        filename = "unknown_file"
-                        for attr in document.attributes:
-                            if isinstance(attr, DocumentAttributeFilename):
-                                filename = attr.file_name
-                                break
-                        
-                        file_info = {
-                            'message_id': message.id,
-                            'filename': filename,
-                            'size': file_size,
-                            'size_mb': round(file_size / (1024 * 1024), 2),
-                            'date': message.date,
-                            'group_id': group_id,
-                            'group_name': group_name,
-                            'message': message
-                        }
-                        
-                        large_files.append(file_info)
-                        logger.logger.info(
-                            f"Archivo grande encontrado: {filename} ({file_info['size_mb']} MB)"
-                        )
-            
+            # Calcular fecha límite (las fechas de Telegram están en UTC)
+            date_limit = datetime.now(timezone.utc) - timedelta(days=days_back)
+            start = time.time()
+
+            checkpoint = self.checkpoints.get_checkpoint(group_id) if incremental else None
+            if checkpoint and datetime.fromisoformat(checkpoint['since_date']) > date_limit:
+                logger.logger.info(
+                    f"El punto de control de {group_id} no cubre los últimos "
+                    f"{days_back} días, escaneo completo"
+                )
+                checkpoint = None
+            min_id = checkpoint['last_message_id'] if checkpoint else 0
+            if checkpoint:
+                logger.logger.info(
+                    f"Escaneo incremental de {group_id} desde el mensaje {min_id} "
+                    f"({checkpoint['last_date']})"
+                )
+
+            # Ids ya enviados a la cola: si el escaneo filtrado falla a medias,
+            # el recorrido completo no vuelve a encolarlos
+            queued = set()
+            large_files = None
+            if self.SERVER_FILTER:
+                try:
+                    large_files = await self._scan_filtered(
+                        entity, group_id, group_name, date_limit, limit, stats, min_id,
+                        queue, queued,
+                    )
+                except Exception as e:
+                    logger.logger.error(
+                        f"Escaneo filtrado no disponible en {group_id}, "
+                        f"recorriendo el historial completo: {e}"
+                    )
+            if large_files is None:
+                large_files = await self._scan_full(
+                    entity, group_id, group_name, date_limit, limit, stats, min_id,
+                    queue, queued,
+                )
+
+            large_files = await self._save_checkpoint(
+                entity, group_id, group_name, date_limit, checkpoint, large_files, stats, queue
+            )
+
+            stats['elapsed'] = time.time() - start
+            stats['rate'] = stats['fetched'] / stats['elapsed'] if stats['elapsed'] > 0 else 0.0
             logger.logger.info(
                 f"Escaneo completado. Encontrados {len(large_files)} archivos grandes "
-                f"de {scanned_count} mensajes revisados"
+                f"de {stats['fetched']} mensajes revisados en {stats['elapsed']:.1f}s "
+                f"({stats['rate']:.0f} msg/s, modo {stats['mode']})"
             )
             
             return large_files
             
         except Exception as e:
             logger.logger.error(f"Error escaneando grupo {group_id}: {e}")
+            if stats is not None:
+                stats['error'] = str(e)
             return []
+
+    async def _scan_filtered(
+        self, entity, group_id, group_name, date_limit, limit, stats, min_id=0,
+        queue=None, queued=None,
+    ):
+        """
+        Búsqueda en el servidor por cada filtro (documentos y vídeos); un
+        mensaje que aparece en ambos se cuenta una sola vez
+        """
+        found = {}
+        fetched = pages = 0
+        newest = None
+        truncated = False
+        for message_filter in self.SERVER_FILTERS:
+            remaining = None if limit is None else limit - fetched
+            if remaining is not None and remaining <= 0:
+                truncated = True
+                break
+            next_page = asyncio.create_task(
+                self._fetch_page(entity, message_filter, 0, remaining, min_id)
+            )
+            try:
+                while next_page is not None:
+                    page = await next_page
+                    next_page = None
+                    pages += 1
+                    messages = [message for message in page if message.date >= date_limit]
+                    if remaining is not None:
+                        truncated = truncated or len(messages) > remaining
+                        messages = messages[:remaining]
+                        remaining -= len(messages)
+                    if messages and (newest is None or messages[0].id > newest.id):
+                        newest = messages[0]
+
+                    # La siguiente página sale antes de procesar esta
+                    if (
+                        page
+                        and len(messages) == len(page)
+                        and (remaining is None or remaining > 0)
+                    ):
+                        next_page = asyncio.create_task(
+                            self._fetch_page(
+                                entity, message_filter, page[-1].id, remaining, min_id
+                            )
+                        )
+                    elif page and remaining == 0:
+                        truncated = True
+
+                    fetched += len(messages)
+                    for message in messages:
+                        file_info = self._file_info(message, group_id, group_name)
+                        if file_info and message.id not in found:
+                            found[message.id] = file_info
+                            await self._enqueue(queue, queued, file_info)
+                    logger.logger.info(
+                        f"Escaneados {fetched} mensajes ({type(message_filter).__name__}, "
+                        f"página {pages})..."
+                    )
+            finally:
+                if next_page is not None:
+                    next_page.cancel()
+
+        stats.update(
+            {
+                'mode': 'filter',
+                'fetched': fetched,
+                'pages': pages,
+                'newest': newest,
+                'truncated': truncated,
+            }
+        )
+        return sorted(found.values(), key=lambda file_info: file_info['message_id'], reverse=True)
+
+    async def _fetch_page(self, entity, message_filter, offset_id, remaining=None, min_id=0):
+        page_size = self.PAGE_SIZE if remaining is None else min(self.PAGE_SIZE, remaining)
+        return await self._get_messages(
+            entity,
+            limit=page_size,
+            offset_id=offset_id,
+            min_id=min_id,
+            filter=message_filter,
+        )
+
+    async def _get_messages(self, entity, **kwargs):
+        """get_messages con turno del limitador y reintento tras FloodWait"""
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                return await self.client.get_messages(entity, **kwargs)
+            except FloodWaitError as e:
+                # Pausa todos los escaneos y reintenta la misma petición
+                self.rate_limiter.pause(e.seconds)
+
+    async def _scan_full(
+        self, entity, group_id, group_name, date_limit, limit, stats, min_id=0,
+        queue=None, queued=None,
+    ):
+        """Recorrido de todo el historial (texto, stickers, fotos...)"""
+        large_files = []
+        scanned_count = pages = 0
+        newest = None
+        truncated = False
+
+        # Escanear mensajes del grupo, de más nuevo a más antiguo, en páginas
+        # de 100 (el máximo de Telegram) pedidas con _get_messages para que
+        # cada una pase por el limitador y un FloodWait pause todos los
+        # escaneos en vez de cortar este
+        offset_id = 0
+        while True:
+            page = await self._get_messages(
+                entity, limit=100, offset_id=offset_id, min_id=min_id
+            )
+            if not page:
+                break
+            pages += 1
+            offset_id = page[-1].id
+
+            finished = False
+            for message in page:
+                if message.date < date_limit:
+                    finished = True
+                    break
+                if limit is not None and scanned_count >= limit:
+                    truncated = finished = True
+                    break
+                scanned_count += 1
+                newest = newest or message
+
+                file_info = self._file_info(message, group_id, group_name)
+                if file_info:
+                    large_files.append(file_info)
+                    await self._enqueue(queue, queued, file_info)
+
+            logger.logger.info(f"Escaneados {scanned_count} mensajes (página {pages})...")
+            if finished:
+                break
+
+        stats.update(
+            {
+                'mode': 'full',
+                'fetched': scanned_count,
+                'pages': pages,
+                'newest': newest,
+                'truncated': truncated,
+            }
+        )
+        return large_files
+
+    async def _enqueue(self, queue, queued, file_info):
+        """Envía file_info a la cola si no se había enviado ya"""
+        if queue is None or (queued is not None and file_info['message_id'] in queued):
+            return
+        if queued is not None:
+            queued.add(file_info['message_id'])
+        await queue.put(file_info)
+
+    async def _save_checkpoint(
+        self, entity, group_id, group_name, date_limit, checkpoint, large_files, stats, queue=None
+    ):
+        """
+        Guarda los archivos encontrados y, si el escaneo no se cortó por el
+        límite de mensajes, avanza el punto de control del grupo. En modo
+        incremental devuelve los archivos nuevos unidos a los guardados; de
+        los guardados solo vuelven a la cola los que no están en el índice
+        de documentos descargados (un /scanlist o una descarga fallida).
+        """
+        self.checkpoints.add_results(group_id, large_files)
+
+        newest = stats.get('newest')
+        if not stats.get('truncated'):
+            # Un escaneo completo que llega hasta el punto de control anterior
+            # amplía su cobertura en vez de sustituirla
+            stored = checkpoint or self.checkpoints.get_checkpoint(group_id)
+            contiguous = stored is not None and (
+                checkpoint is not None
+                or (stored['last_date'] and date_limit <= datetime.fromisoformat(stored['last_date']))
+            )
+            last_message_id, last_date, since_date = 0, None, date_limit
+            if contiguous:
+                last_message_id = stored['last_message_id']
+                last_date = datetime.fromisoformat(stored['last_date']) if stored['last_date'] else None
+                since_date = min(since_date, datetime.fromisoformat(stored['since_date']))
+            if newest is not None and newest.id > last_message_id:
+                last_message_id, last_date = newest.id, newest.date
+            self.checkpoints.save_checkpoint(group_id, last_message_id, last_date, since_date)
+
+        stats['new'] = len(large_files)
+        stats['previous'] = 0
+        stats['previous_queued'] = 0
+        stats['incremental'] = checkpoint is not None
+        if not checkpoint:
+            return large_files
+
+        # Los archivos de escaneos anteriores se vuelven a pedir por id para
+        # comprobar que siguen ahí; los mensajes borrados salen del registro
+        found = {file_info['message_id'] for file_info in large_files}
+        stored = [
+            row
+            for row in self.checkpoints.get_results(group_id, date_limit, self.MIN_FILE_SIZE)
+            if row['message_id'] not in found
+        ]
+        if not stored:
+            return large_files
+        # Telegram devuelve como mucho 100 ids por petición
+        messages = []
+        for index in range(0, len(stored), 100):
+            messages += await self._get_messages(
+                entity, ids=[row['message_id'] for row in stored[index:index + 100]]
+            )
+        previous = []
+        for row, message in zip(stored, messages):
+            file_info = self._file_info(message, group_id, group_name) if message else None
+            if file_info:
+                previous.append(file_info)
+                if queue is not None and not self._downloaded(file_info):
+                    await queue.put(file_info)
+                    stats['previous_queued'] += 1
+        missing = [row['message_id'] for row, message in zip(stored, messages) if not message]
+        if missing:
+            self.checkpoints.remove_results(group_id, missing)
+
+        stats['previous'] = len(previous)
+        return sorted(
+            large_files + previous,
+            key=lambda file_info: file_info['message_id'],
+            reverse=True,
+        )
+
+    def _downloaded(self, file_info):
+        """Si el documento ya está en el índice de documentos descargados"""
+        document = file_info['message'].media.document
+        return self.bot.documentIndexDB.get_document(document.id, document.size) is not None
+
+    def _file_info(self, message, group_id, group_name):
+        """Datos del documento del mensaje si supera MIN_FILE_SIZE, o None"""
+        # Verificar si el mensaje tiene un documento
+        if not (message.media and 
+                isinstance(message.media, MessageMediaDocument) and 
+                message.media.document):
+            return None
+
+        document = message.media.document
+        file_size = document.size
+        
+        # Verificar si el archivo es mayor a 100MB
+        if file_size < self.MIN_FILE_SIZE:
+            return None
+
+        # Obtener nombre del archivo
+        filename = "unknown_file"
+        for attr in document.attributes:
+            if isinstance(attr, DocumentAttributeFilename):
+                filename = attr.file_name
+                break
+        
+        file_info = {
+            'message_id': message.id,
+            'filename': filename,
+            'size': file_size,
+            'size_mb': round(file_size / (1024 * 1024), 2),
+            'date': message.date,
+            'group_id': group_id,
+            'group_name': group_name,
+            'message': message
+        }
+        logger.logger.info(
+            f"Archivo grande encontrado: {filename} ({file_info['size_mb']} MB)"
+        )
+        return file_info
     
-    async def download_large_files_from_scan(self, large_files, auto_download=True):
+    async def download_large_files_from_scan(self, large_files, auto_download=True, stats=None):
         """
         Descarga los archivos grandes encontrados en el escaneo
         
         Args:
             large_files: Lista de archivos encontrados por scan_group_for_large_files
             auto_download: Si True, descarga automáticamente. Si False, solo lista
+            stats: Estadísticas del escaneo para el resumen
         """
         try:
             if not large_files:
@@ -116,91 +426,155 @@ class GroupScanner:
                 return
             
             logger.logger.info(f"Procesando {len(large_files)} archivos grandes...")
-            
-            downloaded_count = 0
-            failed_count = 0
-            
+
+            queue = asyncio.Queue()
             for file_info in large_files:
-                try:
-                    if auto_download:
-                        # Usar el semáforo para limitar descargas concurrentes
-                        async with self.semaphore:
-                            logger.logger.info(
-                                f"Descargando: {file_info['filename']} "
-                                f"({file_info['size_mb']} MB)"
-                            )
-                            
-                            # Crear un mensaje de respuesta ficticio para el progreso
-                            progress_message = await self.client.send_message(
-                                int(self.bot.TG_AUTHORIZED_USER_ID[0]),
-                                f"🔄 Descargando archivo grande del grupo:\n"
-                                f"📁 {file_info['filename']}\n"
-                                f"📊 {file_info['size_mb']} MB\n"
-                                f"🏷️ Grupo: {file_info['group_name']}"
-                            )
-                            
-                            # Usar el método de descarga existente del bot
-                            download_result = await self.bot.download_media_with_retries(
-                                file_info['message'], 
-                                message=progress_message
-                            )
-                            
-                            if download_result and not download_result.get('exception'):
-                                downloaded_count += 1
-                                await progress_message.edit(
-                                    f"✅ Descarga completada:\n"
-                                    f"📁 {file_info['filename']}\n"
-                                    f"📊 {file_info['size_mb']} MB\n"
-                                    f"🏷️ Grupo: {file_info['group_name']}"
-                                )
-                            else:
-                                failed_count += 1
-                                await progress_message.edit(
-                                    f"❌ Error en descarga:\n"
-                                    f"📁 {file_info['filename']}\n"
-                                    f"📊 {file_info['size_mb']} MB\n"
-                                    f"🏷️ Grupo: {file_info['group_name']}"
-                                )
-                                
+                queue.put_nowait(file_info)
+            counters = await self._run_pipeline(queue, None, auto_download)
+            await self._send_summary(counters, auto_download, stats)
+            
+        except Exception as e:
+            logger.logger.error(f"Error en download_large_files_from_scan: {e}")
+
+    async def _run_pipeline(self, queue, producer, auto_download):
+        """
+        Consume la cola con SCAN_MAX_PARALLEL trabajadores mientras el
+        productor (el escaneo, o None si la cola ya está llena) la alimenta
+
+        Returns:
+            dict: Contadores found, downloaded, failed, skipped y skipped_bytes
+        """
+        counters = {'found': 0, 'downloaded': 0, 'failed': 0, 'skipped': 0, 'skipped_bytes': 0}
+        workers = [
+            asyncio.create_task(self._consume(queue, auto_download, counters))
+            for _ in range(self.MAX_PARALLEL if auto_download else 1)
+        ]
+        try:
+            if producer is not None:
+                await producer
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return counters
+
+    async def _consume(self, queue, auto_download, counters):
+        while True:
+            file_info = await queue.get()
+            try:
+                if file_info is None:
+                    return
+                counters['found'] += 1
+                await self._process_file(file_info, auto_download, counters)
+            finally:
+                queue.task_done()
+
+    async def _process_file(self, file_info, auto_download, counters):
+        try:
+            # Omitir documentos ya descargados desde este u otro grupo
+            duplicate = await self.bot.deduplicate(file_info['message']) if auto_download else None
+            if duplicate:
+                counters['skipped'] += 1
+                counters['skipped_bytes'] += duplicate['size']
+                logger.logger.info(
+                    f"Duplicado omitido: {file_info['filename']} "
+                    f"=> {duplicate['link_path'] or duplicate['file_path']}"
+                )
+            elif auto_download:
+                # El semáforo limita las descargas de todos los escaneos a la vez
+                async with self.semaphore:
+                    logger.logger.info(
+                        f"Descargando: {file_info['filename']} "
+                        f"({file_info['size_mb']} MB)"
+                    )
+                    
+                    # Crear un mensaje de respuesta ficticio para el progreso
+                    progress_message = await self.client.send_message(
+                        int(self.bot.TG_AUTHORIZED_USER_ID[0]),
+                        f"🔄 Descargando archivo grande del grupo:\n"
+                        f"📁 {file_info['filename']}\n"
+                        f"📊 {file_info['size_mb']} MB\n"
+                        f"🏷️ Grupo: {file_info['group_name']}"
+                    )
+                    
+                    # Usar el método de descarga existente del bot
+                    download_result = await self.bot.download_media_with_retries(
+                        file_info['message'], 
+                        message=progress_message,
+                        source="scan"
+                    )
+                    
+                    if download_result and not download_result.get('exception'):
+                        counters['downloaded'] += 1
+                        await progress_message.edit(
+                            f"✅ Descarga completada:\n"
+                            f"📁 {file_info['filename']}\n"
+                            f"📊 {file_info['size_mb']} MB\n"
+                            f"🏷️ Grupo: {file_info['group_name']}"
+                        )
                     else:
-                        # Solo listar archivo sin descargar
-                        logger.logger.info(
-                            f"Archivo encontrado: {file_info['filename']} "
-                            f"({file_info['size_mb']} MB) - "
-                            f"Grupo: {file_info['group_name']}"
+                        counters['failed'] += 1
+                        await progress_message.edit(
+                            f"❌ Error en descarga:\n"
+                            f"📁 {file_info['filename']}\n"
+                            f"📊 {file_info['size_mb']} MB\n"
+                            f"🏷️ Grupo: {file_info['group_name']}"
                         )
                         
-                except Exception as e:
-                    failed_count += 1
-                    logger.logger.error(
-                        f"Error procesando archivo {file_info['filename']}: {e}"
-                    )
-            
-            summary_message = (
-                f"📊 Resumen del escaneo de archivos grandes:\n"
-                f"🔍 Total encontrados: {len(large_files)}\n"
-            )
-            
-            if auto_download:
-                summary_message += (
-                    f"✅ Descargados exitosamente: {downloaded_count}\n"
-                    f"❌ Fallos en descarga: {failed_count}"
-                )
             else:
-                summary_message += "ℹ️ Modo solo listado (sin descargas)"
-            
-            # Enviar resumen al usuario autorizado
-            await self.client.send_message(
-                int(self.bot.TG_AUTHORIZED_USER_ID[0]),
-                summary_message
-            )
-            
-            logger.logger.info(summary_message.replace('📊', '').replace('🔍', '').replace('✅', '').replace('❌', '').replace('ℹ️', ''))
-            
+                # Solo listar archivo sin descargar
+                logger.logger.info(
+                    f"Archivo encontrado: {file_info['filename']} "
+                    f"({file_info['size_mb']} MB) - "
+                    f"Grupo: {file_info['group_name']}"
+                )
+                
         except Exception as e:
-            logger.logger.error(f"Error en download_large_files_from_scan: {e}")
+            counters['failed'] += 1
+            logger.logger.error(
+                f"Error procesando archivo {file_info['filename']}: {e}"
+            )
+
+    async def _send_summary(self, counters, auto_download, stats=None, found=None):
+        summary_message = (
+            f"📊 Resumen del escaneo de archivos grandes:\n"
+            f"🔍 Total encontrados: {counters['found'] if found is None else found}\n"
+        )
+        if stats and stats.get('fetched') is not None:
+            summary_message += (
+                f"📨 Mensajes revisados: {stats['fetched']} en {stats['elapsed']:.1f}s "
+                f"({stats['rate']:.0f} msg/s, "
+                f"{'filtro del servidor' if stats['mode'] == 'filter' else 'historial completo'})\n"
+            )
+        if stats and stats.get('incremental'):
+            summary_message += (
+                f"🆕 Nuevos desde el último escaneo: {stats['new']} "
+                f"(+{stats['previous']} anteriores)\n"
+            )
+        
+        if auto_download:
+            summary_message += (
+                f"✅ Descargados exitosamente: {counters['downloaded']}\n"
+                f"♻️ Duplicados omitidos: {counters['skipped']} "
+                f"({round(counters['skipped_bytes'] / (1024 * 1024), 2)} MB)\n"
+                f"❌ Fallos en descarga: {counters['failed']}"
+            )
+        else:
+            summary_message += "ℹ️ Modo solo listado (sin descargas)"
+        
+        # Enviar resumen al usuario autorizado
+        await self.client.send_message(
+            int(self.bot.TG_AUTHORIZED_USER_ID[0]),
+            summary_message
+        )
+        
+        logger.logger.info(summary_message.replace('📊', '').replace('🔍', '').replace('✅', '').replace('❌', '').replace('♻️', '').replace('ℹ️', '').replace('📨', '').replace('🆕', ''))
     
-    async def scan_and_download_group(self, group_id, days_back=30, limit=None, auto_download=True):
+    async def scan_and_download_group(
+        self, group_id, days_back=30, limit=None, auto_download=True, incremental=False
+    ):
         """
         Función combinada que escanea y descarga archivos grandes de un grupo
         
@@ -209,6 +583,7 @@ class GroupScanner:
             days_back: Días hacia atrás para buscar
             limit: Límite de mensajes a revisar
             auto_download: Si descargar automáticamente o solo listar
+            incremental: Solo mensajes nuevos desde el último escaneo
         """
         try:
             # Notificar inicio del proceso
@@ -218,15 +593,31 @@ class GroupScanner:
                 f"🏷️ Grupo ID: {group_id}\n"
                 f"📅 Últimos {days_back} días\n"
                 f"🔄 Modo: {'Descargar' if auto_download else 'Solo listar'}"
+                f"{' (incremental)' if incremental else ''}"
             )
             
-            # Escanear archivos grandes
-            large_files = await self.scan_group_for_large_files(
-                group_id, days_back, limit
+            # El escaneo alimenta la cola y los trabajadores descargan a la
+            # vez; si la cola se llena, el escaneo espera
+            stats = {}
+            queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+            counters = await self._run_pipeline(
+                queue,
+                self.scan_group_for_large_files(
+                    group_id, days_back, limit, stats, incremental, queue=queue
+                ),
+                auto_download,
             )
-            
-            # Procesar archivos encontrados
-            await self.download_large_files_from_scan(large_files, auto_download)
+
+            # Los archivos anteriores ya descargados no pasan por la cola
+            found = (
+                counters['found']
+                + stats.get('previous', 0)
+                - stats.get('previous_queued', 0)
+            )
+            if found:
+                await self._send_summary(counters, auto_download, stats, found)
+            else:
+                logger.logger.info("No hay archivos grandes para descargar")
             
         except Exception as e:
             error_msg = f"❌ Error en escaneo del grupo {group_id}: {e}"
@@ -234,4 +625,129 @@ class GroupScanner:
             await self.client.send_message(
                 int(self.bot.TG_AUTHORIZED_USER_ID[0]),
                 error_msg
-            )
\ No newline at end of file
+            )
+    async def scan_groups(
+        self, group_ids, days_back=30, limit=None, auto_download=True, incremental=False
+    ):
+        """
+        Escanea varios grupos a la vez y envía un único informe
+
+        Se escanean SCAN_BATCH_PARALLEL grupos en paralelo; todos comparten
+        el limitador de peticiones (SCAN_REQUESTS_PER_SECOND) y la misma
+        cola de descargas, y el informe final une los archivos de todos los
+        grupos ordenados por tamaño.
+
+        Args:
+            group_ids: Lista de IDs de grupo
+            days_back: Días hacia atrás para buscar
+            limit: Límite de mensajes a revisar por grupo
+            auto_download: Si descargar automáticamente o solo listar
+            incremental: Solo mensajes nuevos desde el último escaneo
+        """
+        try:
+            group_ids = list(dict.fromkeys(group_ids))
+            await self.client.send_message(
+                int(self.bot.TG_AUTHORIZED_USER_ID[0]),
+                f"🔍 Iniciando escaneo de {len(group_ids)} grupos "
+                f"(>{self.constants.get_variable('SCAN_MIN_FILE_SIZE_MB')}MB)\n"
+                f"📅 Últimos {days_back} días\n"
+                f"🔄 Modo: {'Descargar' if auto_download else 'Solo listar'}"
+                f"{' (incremental)' if incremental else ''}"
+            )
+
+            start = time.time()
+            semaphore = asyncio.Semaphore(self.BATCH_PARALLEL)
+            results = {group_id: {'stats': {}, 'files': []} for group_id in group_ids}
+            queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+
+            async def scan(group_id):
+                async with semaphore:
+                    results[group_id]['files'] = await self.scan_group_for_large_files(
+                        group_id,
+                        days_back,
+                        limit,
+                        results[group_id]['stats'],
+                        incremental,
+                        queue=queue,
+                    )
+
+            counters = await self._run_pipeline(
+                queue,
+                asyncio.gather(*(scan(group_id) for group_id in group_ids)),
+                auto_download,
+            )
+            await self._send_batch_report(
+                results, counters, auto_download, time.time() - start
+            )
+
+        except Exception as e:
+            error_msg = f"❌ Error en escaneo de grupos {group_ids}: {e}"
+            logger.logger.error(error_msg)
+            await self.client.send_message(
+                int(self.bot.TG_AUTHORIZED_USER_ID[0]),
+                error_msg
+            )
+
+    async def _send_batch_report(self, results, counters, auto_download, elapsed, max_files=30):
+        files = sorted(
+            (file_info for result in results.values() for file_info in result['files']),
+            key=lambda file_info: file_info['size'],
+            reverse=True,
+        )
+        total_size = sum(file_info['size'] for file_info in files)
+        fetched = sum(result['stats'].get('fetched') or 0 for result in results.values())
+
+        lines = [
+            f"📊 Informe del escaneo de {len(results)} grupos:",
+            f"🔍 Total encontrados: {len(files)} ({round(total_size / (1024 ** 3), 2)} GB)",
+            f"📨 Mensajes revisados: {fetched} en {elapsed:.1f}s "
+            f"({fetched / elapsed if elapsed > 0 else 0:.0f} msg/s, "
+            f"máx. {self.rate_limiter.rate:g} peticiones/s)",
+        ]
+        if auto_download:
+            lines += [
+                f"✅ Descargados exitosamente: {counters['downloaded']}",
+                f"♻️ Duplicados omitidos: {counters['skipped']} "
+                f"({round(counters['skipped_bytes'] / (1024 * 1024), 2)} MB)",
+                f"❌ Fallos en descarga: {counters['failed']}",
+            ]
+        else:
+            lines.append("ℹ️ Modo solo listado (sin descargas)")
+
+        lines.append("\n🏷️ Por grupo:")
+        for group_id, result in results.items():
+            stats = result['stats']
+            group_size = sum(file_info['size'] for file_info in result['files'])
+            line = (
+                f"• {stats.get('group_name', group_id)}: {len(result['files'])} archivos, "
+                f"{round(group_size / (1024 * 1024), 2)} MB, "
+                f"{stats.get('fetched') or 0} mensajes"
+            )
+            if stats.get('error'):
+                line += f" ❌ {stats['error']}"
+            lines.append(line)
+
+        if files:
+            lines.append("\n📁 Archivos por tamaño:")
+        # Un mensaje de Telegram admite 4096 caracteres
+        length = sum(len(line) + 1 for line in lines)
+        shown = 0
+        for file_info in files[:max_files]:
+            line = (
+                f"{shown + 1}. {file_info['filename']} - {file_info['size_mb']} MB "
+                f"({file_info['group_name']})"
+            )
+            if length + len(line) + 1 > 3900:
+                break
+            lines.append(line)
+            length += len(line) + 1
+            shown += 1
+        if shown < len(files):
+            lines.append(f"... y {len(files) - shown} más")
+
+        report = "\n".join(lines)
+        await self.client.send_message(
+            int(self.bot.TG_AUTHORIZED_USER_ID[0]),
+            report
+        )
+        logger.logger.info(report)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import json
+import asyncio
+import functools
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import logger
+from constants import EnvironmentReader
+
+
+class HttpDownloader:
+    """
+    Descargas de enlaces directos sin bloquear el event loop
+
+    Las peticiones se hacen con requests en hilos de trabajo, escribiendo
+    en disco por trozos de tamaño fijo. Si el servidor acepta Range y el
+    archivo es grande, se reparte en segmentos que se descargan en
+    paralelo sobre un .part preasignado. El avance de cada segmento se
+    guarda junto al .part para poder reanudar la descarga.
+
+    Todas las descargas comparten una sesión con keep-alive y un pool de
+    conexiones por host, y cada host admite como mucho HTTP_MAX_PER_HOST
+    descargas a la vez. Los hilos salen de un pool propio, así que los
+    segmentos no ocupan el executor por defecto del loop que usan otros
+    asyncio.to_thread.
+    """
+
+    def __init__(self):
+        self.constants = EnvironmentReader()
+
+        self.segments = max(1, self.constants.get_variable("HTTP_SEGMENTS"))
+        self.segment_min_size = (
+            self.constants.get_variable("HTTP_SEGMENT_MIN_MB") * 1024 * 1024
+        )
+        self.chunk_size = self.constants.get_variable("HTTP_CHUNK_SIZE_KB") * 1024
+        self.checkpoint_size = 16 * 1024 * 1024
+        self.timeout = (15, 60)
+        self.max_per_host = max(1, self.constants.get_variable("HTTP_MAX_PER_HOST"))
+        self.host_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(self.max_per_host)
+        )
+        self.session = self._create_session()
+        # Un hilo por segmento de cada descarga que admiten los hosts del pool
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.segments
+            * self.max_per_host
+            * max(1, self.constants.get_variable("HTTP_POOL_HOSTS")),
+            thread_name_prefix="http",
+        )
+
+        logger.logger.info(
+            f"HttpDownloader initialized: segments={self.segments} "
+            f"segment_min_size={self.segment_min_size} chunk_size={self.chunk_size}"
+        )
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.constants.get_variable("HTTP_POOL_HOSTS"),
+            pool_maxsize=self.max_per_host * self.segments,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["HEAD", "GET"],
+                # Tras los reintentos se devuelve la respuesta y la revisan
+                # _probe (fallback a GET) y los segmentos, en vez de RetryError
+                raise_on_status=False,
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    async def _run(self, func, *args):
+        """Ejecuta func(*args) en el pool de hilos de HttpDownloader"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(func, *args)
+        )
+
+    def host_slot(self, url):
+        """Semáforo que limita las descargas simultáneas contra un mismo host"""
+        return self.host_semaphores[urlparse(url).netloc.lower()]
+
+    async def probe(self, url):
+        """
+        Obtiene tipo, tamaño y soporte de Range de un enlace
+
+        Returns:
+            dict: url final, status, content_type, size, ranges y filename
+        """
+        return await self._run(self._probe, url)
+
+    def _probe(self, url):
+        response = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+        if response.status_code >= 400:
+            # Algunos servidores no implementan HEAD
+            response = self.session.get(
+                url,
+                headers={"Range": "bytes=0-0"},
+                allow_redirects=True,
+                stream=True,
+                timeout=self.timeout,
+            )
+            response.close()
+
+        headers = response.headers
+        size = int(headers.get("content-length", 0) or 0)
+        content_range = headers.get("content-range", "")
+        if response.status_code == 206 and "/" in content_range:
+            total = content_range.rsplit("/", 1)[-1]
+            size = int(total) if total.isdigit() else 0
+
+        return {
+            "url": response.url,
+            "status": 200 if response.status_code == 206 else response.status_code,
+            "content_type": headers.get("content-type", "").lower(),
+            "size": size,
+            "ranges": response.status_code == 206
+            or headers.get("accept-ranges", "").lower() == "bytes",
+            "filename": self._filename(url, headers.get("content-disposition", "")),
+        }
+
+    def _filename(self, url, content_disposition):
+        match = re.search(
+            r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", content_disposition, re.IGNORECASE
+        )
+        if match:
+            return os.path.basename(unquote(match.group(1)))
+        return os.path.basename(unquote(urlparse(url).path)) or "download"
+
+    async def download(self, url, file_path, probe, tracker=None, on_bytes=None):
+        """
+        Descarga un enlace a file_path
+
+        Args:
+            url: Enlace original
+            file_path: Ruta final del archivo
+            probe: Resultado de probe()
+            tracker: ProgressTracker del ProgressBus
+            on_bytes: Callback (bytes) con cada trozo escrito
+
+        Returns:
+            int: Bytes del archivo descargado
+        """
+        part_path = f"{file_path}.part"
+        state_path = f"{part_path}.json"
+        size = probe["size"]
+
+        if probe["ranges"] and size:
+            segments = self.segments if size >= self.segment_min_size else 1
+            state = self._load_state(state_path, url, size)
+            if state is None or not os.path.exists(part_path):
+                state = self._new_state(url, size, segments)
+                with open(part_path, "wb") as file:
+                    file.truncate(size)
+            else:
+                logger.logger.info(
+                    f"HttpDownloader resuming {url}: {self._done(state)} of {size} bytes"
+                )
+        else:
+            state = None
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        progress = {"written": self._done(state) if state else 0}
+
+        def report(count):
+            with lock:
+                progress["written"] += count
+                written = progress["written"]
+            if tracker:
+                tracker.update(written, size)
+            if on_bytes:
+                on_bytes(count)
+
+        try:
+            if state is None:
+                await self._run(
+                    self._fetch_stream, probe["url"], part_path, report, stop
+                )
+            else:
+                try:
+                    await asyncio.gather(
+                        *[
+                            self._run(
+                                self._fetch_segment,
+                                probe["url"],
+                                part_path,
+                                segment,
+                                state,
+                                state_path,
+                                lock,
+                                report,
+                                stop,
+                            )
+                            for segment in state["segments"]
+                            if segment["done"] < segment["end"] - segment["start"] + 1
+                        ]
+                    )
+                finally:
+                    self._save_state(state_path, state, lock)
+        except BaseException:
+            stop.set()
+            raise
+
+        if state is not None and self._done(state) != size:
+            raise IOError(f"Incomplete download {url}: {self._done(state)} of {size} bytes")
+
+        os.replace(part_path, file_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return progress["written"]
+
+    def _new_state(self, url, size, segments):
+        segment_size = -(-size // segments)
+        return {
+            "url": url,
+            "size": size,
+            "segments": [
+                {
+                    "start": start,
+                    "end": min(start + segment_size, size) - 1,
+                    "done": 0,
+                }
+                for start in range(0, size, segment_size)
+            ],
+        }
+
+    def _done(self, state):
+        return sum(segment["done"] for segment in state["segments"])
+
+    def _load_state(self, state_path, url, size):
+        try:
+            with open(state_path, "r") as state_file:
+                state = json.load(state_file)
+            if state["url"] == url and state["size"] == size:
+                return state
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.logger.error(f"HttpDownloader load state Exception: {state_path} [{e}]")
+        return None
+
+    def _save_state(self, state_path, state, lock):
+        with lock:
+            data = json.dumps(state)
+        tmp_path = f"{state_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as state_file:
+            state_file.write(data)
+        os.replace(tmp_path, state_path)
+
+    def _fetch_stream(self, url, part_path, report, stop):
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            with open(part_path, "wb") as file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if stop.is_set():
+                        return
+                    if chunk:
+                        file.write(chunk)
+                        report(len(chunk))
+
+    def _fetch_segment(self, url, part_path, segment, state, state_path, lock, report, stop):
+        start = segment["start"] + segment["done"]
+        headers = {"Range": f"bytes={start}-{segment['end']}"}
+        since_checkpoint = 0
+
+        # Cada hilo usa su propio descriptor: si la descarga se cancela el
+        # hilo termina en el siguiente trozo y lo cierra él mismo
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 206:
+                    raise IOError(f"Range not honoured for {url}: status {response.status_code}")
+
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if stop.is_set():
+                        return
+                    if not chunk:
+                        continue
+                    chunk = chunk[: segment["end"] - segment["start"] + 1 - segment["done"]]
+                    os.pwrite(fd, chunk, segment["start"] + segment["done"])
+                    with lock:
+                        segment["done"] += len(chunk)
+                    report(len(chunk))
+
+                    since_checkpoint += len(chunk)
+                    if since_checkpoint >= self.checkpoint_size:
+                        since_checkpoint = 0
+                        os.fsync(fd)
+                        self._save_state(state_path, state, lock)
+        finally:
+            os.fsync(fd)
+            os.close(fd)
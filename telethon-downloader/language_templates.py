@@ -72,3 +72,12 @@ class LanguageTemplates:
         self, template_name, default_message="Language template not found."
     ):
         return self.templates.get(template_name, default_message)
+
+    def permissionsText(self, permissions):
+        """Línea de estadísticas de permisos recursivos para el mensaje final"""
+        if not permissions:
+            return ""
+        return self.template(
+            "MESSAGE_PERMISSIONS_FIXED",
+            "Permissions: {changed} of {entries} entries fixed in {elapsed:.2f}s",
+        ).format(**permissions)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import asyncio
+import inspect
+
+import logger
+from constants import EnvironmentReader
+
+# upload.getFile exige trozos múltiplos de 4 KB que dividan 1 MB
+MIN_PART_SIZE = 4 * 1024
+MAX_PART_SIZE = 512 * 1024
+
+
+class ParallelDownloader:
+    def __init__(self, client):
+        self.client = client
+        self.constants = EnvironmentReader()
+
+        self.workers = max(1, self.constants.get_variable("TG_DOWNLOAD_WORKERS"))
+        self.part_size = self._normalize_part_size(
+            self.constants.get_variable("TG_DOWNLOAD_PART_SIZE_KB") * 1024
+        )
+        self.min_size = (
+            self.constants.get_variable("TG_DOWNLOAD_PARALLEL_MIN_MB") * 1024 * 1024
+        )
+        self.checkpoint_size = (
+            self.constants.get_variable("TG_RESUME_CHECKPOINT_MB") * 1024 * 1024
+        )
+
+        # Offsets verificados por ruta .tmp, para reintentos dentro del proceso
+        self.checkpoints = {}
+
+        logger.logger.info(
+            f"ParallelDownloader initialized: workers={self.workers} "
+            f"part_size={self.part_size} min_size={self.min_size}"
+        )
+
+    def _normalize_part_size(self, part_size):
+        """
+        Ajusta el tamaño de parte a una potencia de dos entre 4 KB y 512 KB,
+        que es lo que acepta Telegram sin cruzar límites de 1 MB
+        """
+        size = MIN_PART_SIZE
+        while size * 2 <= min(part_size, MAX_PART_SIZE):
+            size *= 2
+        return size
+
+    def should_use(self, total_size):
+        """Indica si merece la pena repartir el archivo entre varios workers"""
+        return self.workers > 1 and total_size >= self.min_size
+
+    def get_checkpoint(self, file_path):
+        """Último offset verificado en esta ejecución para un .tmp"""
+        return self.checkpoints.get(file_path, 0)
+
+    def workers_for(self, total_size):
+        """Workers a usar para un archivo, uno solo si es pequeño"""
+        return self.workers if self.should_use(total_size) else 1
+
+    async def download(
+        self,
+        media,
+        file_path,
+        total_size,
+        progress_callback=None,
+        workers=None,
+        offset=0,
+        checkpoint_callback=None,
+    ):
+        """
+        Descarga un documento repartiendo sus partes entre varios workers
+
+        Cada worker pide las partes w, w+N, w+2N... y las escribe en su
+        posición dentro de un archivo preasignado, de modo que el archivo
+        final es idéntico al de una descarga secuencial.
+
+        Args:
+            media: Media del mensaje (MessageMediaDocument)
+            file_path: Ruta del archivo .tmp de destino
+            total_size: Tamaño total del documento en bytes
+            progress_callback: Callback (current, total) del bot
+            workers: Número de workers (None = TG_DOWNLOAD_WORKERS)
+            offset: Bytes ya verificados en el .tmp, se descarga solo el resto
+            checkpoint_callback: Callback (offset) con el último offset verificado
+
+        Returns:
+            str: Ruta del archivo descargado
+        """
+        workers = max(1, workers or self.workers)
+        total_parts = (total_size + self.part_size - 1) // self.part_size
+
+        # Solo se reanuda sobre un .tmp preasignado del mismo tamaño
+        offset -= offset % self.part_size
+        if offset <= 0 or not self._can_resume(file_path, total_size):
+            offset = 0
+            with open(file_path, "wb") as file:
+                file.truncate(total_size)
+
+        first_part = offset // self.part_size
+        workers = min(workers, max(1, total_parts - first_part))
+
+        logger.logger.info(
+            f"ParallelDownloader download => {file_path} size={total_size} "
+            f"parts={total_parts} workers={workers} offset={offset}"
+        )
+
+        state = {
+            "file_path": file_path,
+            "downloaded": offset,
+            "next_parts": [first_part + index for index in range(workers)],
+            "verified": offset,
+            "checkpoint": offset,
+        }
+        fd = os.open(file_path, os.O_WRONLY)
+        try:
+            tasks = [
+                asyncio.create_task(
+                    self._worker(
+                        media,
+                        fd,
+                        index,
+                        workers,
+                        first_part,
+                        total_parts,
+                        total_size,
+                        state,
+                        progress_callback,
+                        checkpoint_callback,
+                    )
+                )
+                for index in range(workers)
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            self._checkpoint(fd, state, checkpoint_callback, force=True)
+            os.close(fd)
+
+        if state["downloaded"] != total_size:
+            raise IOError(
+                f"Incomplete download {file_path}: {state['downloaded']} of {total_size} bytes"
+            )
+
+        self.checkpoints.pop(file_path, None)
+        return file_path
+
+    def _can_resume(self, file_path, total_size):
+        try:
+            return os.path.getsize(file_path) == total_size
+        except OSError:
+            return False
+
+    def _checkpoint(self, fd, state, checkpoint_callback, force=False):
+        """
+        Persiste el offset verificado: el prefijo contiguo de partes
+        escritas, sincronizado a disco antes de anunciarlo
+        """
+        verified = state["verified"]
+        if verified == state["checkpoint"]:
+            return
+        if not force and verified - state["checkpoint"] < self.checkpoint_size:
+            return
+        try:
+            os.fsync(fd)
+            self.checkpoints[state["file_path"]] = verified
+            state["checkpoint"] = verified
+            if checkpoint_callback:
+                checkpoint_callback(verified)
+        except Exception as e:
+            logger.logger.error(f"ParallelDownloader checkpoint Exception: {e}")
+
+    async def _worker(
+        self,
+        media,
+        fd,
+        index,
+        workers,
+        first_part,
+        total_parts,
+        total_size,
+        state,
+        progress_callback,
+        checkpoint_callback,
+    ):
+        part = first_part + index
+        parts = len(range(part, total_parts, workers))
+        if parts == 0:
+            state["next_parts"][index] = total_parts
+            return
+
+        async for chunk in self.client.iter_download(
+            media,
+            offset=part * self.part_size,
+            stride=self.part_size * workers,
+            limit=parts,
+            chunk_size=self.part_size,
+            request_size=self.part_size,
+            file_size=total_size,
+        ):
+            os.pwrite(fd, chunk, part * self.part_size)
+            part += workers
+            state["downloaded"] += len(chunk)
+            state["next_parts"][index] = min(part, total_parts)
+            state["verified"] = min(
+                min(state["next_parts"]) * self.part_size, total_size
+            )
+            self._checkpoint(fd, state, checkpoint_callback)
+
+            if progress_callback:
+                result = progress_callback(state["downloaded"], total_size)
+                if inspect.isawaitable(result):
+                    await result
+
+
+# Benchmark: compara download_media (un solo stream) contra el motor paralelo
+# Uso: python3 parallel_downloader.py <chat_id> <message_id> [workers]
+if __name__ == "__main__":
+    from telethon import TelegramClient
+
+    async def benchmark(chat_id, message_id, workers):
+        constants = EnvironmentReader()
+        client = TelegramClient(
+            constants.get_variable("SESSION"),
+            constants.get_variable("API_ID"),
+            constants.get_variable("API_HASH"),
+        )
+        await client.start(bot_token=str(constants.get_variable("BOT_TOKEN")))
+
+        message = await client.get_messages(chat_id, ids=message_id)
+        total_size = message.media.document.size
+        megabytes_total = total_size / 1024 / 1024
+        path_tmp = constants.get_variable("PATH_TMP")
+        os.makedirs(path_tmp, exist_ok=True)
+
+        single_path = os.path.join(path_tmp, "benchmark_single.tmp")
+        start = time.time()
+        await client.download_media(message.media, file=single_path)
+        single_time = time.time() - start
+
+        parallel_path = os.path.join(path_tmp, "benchmark_parallel.tmp")
+        start = time.time()
+        await ParallelDownloader(client).download(
+            message.media, parallel_path, total_size, workers=workers
+        )
+        parallel_time = time.time() - start
+
+        print(f"file size: {megabytes_total:.2f} MB")
+        print(f"single stream: {single_time:.2f}s ({megabytes_total / single_time:.2f} MB/s)")
+        print(f"parallel x{workers}: {parallel_time:.2f}s ({megabytes_total / parallel_time:.2f} MB/s)")
+
+        with open(single_path, "rb") as a, open(parallel_path, "rb") as b:
+            print(f"identical: {a.read() == b.read()}")
+
+        os.remove(single_path)
+        os.remove(parallel_path)
+        await client.disconnect()
+
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    asyncio.run(benchmark(int(sys.argv[1]), int(sys.argv[2]), workers))
@@ -1,49 +1,159 @@
+import os
 import json
+import threading
 
+import logger
 from constants import EnvironmentReader
 
 
 class PendingMessagesHandler:
+    """
+    Mensajes pendientes de descargar, con un diario de solo añadido
+
+    El estado vive en memoria indexado por (user_id, message). Cada cambio
+    se añade como una línea JSON al diario (PATH_PENDING_JOURNAL) en vez
+    de reescribir pending_messages.json; cada PENDING_JOURNAL_COMPACT_OPS
+    operaciones se compacta en una instantánea escrita de forma atómica.
+    Al arrancar se carga la instantánea y se reproduce el diario encima;
+    las operaciones son idempotentes, así que reproducirlo dos veces no
+    cambia el resultado.
+    """
+
     def __init__(self):
         self.constants = EnvironmentReader()
         self.file_name = self.constants.get_variable("PATH_PENDING_MESSAGES")
-        self.pending_messages = []
+        self.journal_name = self.constants.get_variable("PATH_PENDING_JOURNAL")
+        self.compact_ops = max(1, self.constants.get_variable("PENDING_JOURNAL_COMPACT_OPS"))
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.journal = None
+        self.journal_ops = 0
         self.load_from_json()
 
-    def add_pending_message(self, user_id, message):
-        if any(
-            item["user_id"] == user_id and item["message"] == message
-            for item in self.pending_messages
-        ):
-            pass
-        else:
-            self.pending_messages.append({"user_id": user_id, "message": message})
-            self.save_to_json()
+    @property
+    def pending_messages(self):
+        return list(self.pending.values())
+
+    def add_pending_message(self, user_id, message, source="interactive"):
+        """source es el origen del planificador con el que se reanuda"""
+        if (user_id, message) not in self.pending:
+            self._append(
+                {"op": "add", "user_id": user_id, "message": message, "source": source}
+            )
 
     def remove_pending_message(self, user_id, message):
-        self.pending_messages = [
-            item
-            for item in self.pending_messages
-            if not (item["user_id"] == user_id and item["message"] == message)
-        ]
+        if (user_id, message) in self.pending:
+            self._append({"op": "remove", "user_id": user_id, "message": message})
 
-        self.save_to_json()
+    def update_pending_offset(self, user_id, message, file_path, offset):
+        if (user_id, message) not in self.pending:
+            return False
+        self._append(
+            {
+                "op": "offset",
+                "user_id": user_id,
+                "message": message,
+                "file": file_path,
+                "offset": offset,
+            }
+        )
+        return True
 
-    def save_to_json(self):
-        with open(self.file_name, "w") as json_file:
+    def get_pending_offset(self, user_id, message):
+        item = self.pending.get((user_id, message))
+        if item:
+            return item.get("file"), item.get("offset", 0)
+        return None, 0
+
+    def _apply(self, entry):
+        key = (entry["user_id"], entry["message"])
+        if entry["op"] == "add":
+            self.pending.setdefault(
+                key,
+                {
+                    "user_id": entry["user_id"],
+                    "message": entry["message"],
+                    "source": entry.get("source", "interactive"),
+                },
+            )
+        elif entry["op"] == "remove":
+            self.pending.pop(key, None)
+        elif entry["op"] == "offset" and key in self.pending:
+            self.pending[key]["file"] = entry["file"]
+            self.pending[key]["offset"] = entry["offset"]
+
+    def _append(self, entry):
+        with self.lock:
+            self._apply(entry)
+            if self.journal is None:
+                self.journal = open(self.journal_name, "a")
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+            self.journal_ops += 1
+            if self.journal_ops >= self.compact_ops:
+                self._compact()
+
+    def _compact(self):
+        """Escribe la instantánea de forma atómica y vacía el diario"""
+        tmp_name = f"{self.file_name}.tmp"
+        with open(tmp_name, "w") as json_file:
             json.dump(self.pending_messages, json_file)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+        os.replace(tmp_name, self.file_name)
+
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = open(self.journal_name, "w")
+        self.journal_ops = 0
+
+    def save_to_json(self):
+        with self.lock:
+            self._compact()
 
     def load_from_json(self):
-        try:
-            with open(self.file_name, "r") as json_file:
-                loaded_messages = json.load(json_file)
-                self.pending_messages = loaded_messages
-                return loaded_messages
-        except FileNotFoundError:
-            return []
-
-        except Exception as e:
-            return []
+        """
+        Recupera el estado: instantánea + diario, y compacta
+
+        Returns:
+            list: Mensajes pendientes
+        """
+        with self.lock:
+            self.pending = {}
+            try:
+                with open(self.file_name, "r") as json_file:
+                    for item in json.load(json_file):
+                        self.pending[(item["user_id"], item["message"])] = item
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.logger.error(f"PendingMessagesHandler load Exception: {e}")
+
+            replayed = 0
+            try:
+                with open(self.journal_name, "r") as journal:
+                    for line in journal:
+                        try:
+                            self._apply(json.loads(line))
+                            replayed += 1
+                        except (ValueError, KeyError):
+                            # Última línea a medio escribir tras una caída
+                            continue
+            except FileNotFoundError:
+                pass
+
+            if replayed:
+                logger.logger.info(
+                    f"PendingMessagesHandler replayed {replayed} journal entries, "
+                    f"{len(self.pending)} pending"
+                )
+            try:
+                self._compact()
+            except Exception as e:
+                logger.logger.error(f"PendingMessagesHandler compact Exception: {e}")
+
+            return self.pending_messages
 
     def get_pending_messages(self):
         return self.pending_messages
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+
+import logger
+from constants import EnvironmentReader
+
+
+class PostProcessor:
+    """
+    Etapa de post-proceso de las descargas
+
+    Mover el archivo a su destino, extraerlo, corregir permisos y editar
+    el mensaje final ya no ocupa el hueco del planificador: la descarga
+    encola ese trabajo y libera su hueco en cuanto termina la transferencia.
+    POST_WORKERS tareas consumen una cola de POST_QUEUE_SIZE trabajos; si
+    la cola se llena, submit() espera y así la descarga no se adelanta
+    demasiado a un disco lento.
+    """
+
+    def __init__(self):
+        self.constants = EnvironmentReader()
+        self.workers = max(1, self.constants.get_variable("POST_WORKERS"))
+        self.queue = asyncio.Queue(
+            maxsize=max(0, self.constants.get_variable("POST_QUEUE_SIZE"))
+        )
+        self.tasks = []
+        self.active = 0
+        self.processed = 0
+        self.failed = 0
+        self.total_time = 0.0
+
+    def start(self):
+        """Arranca las tareas que falten (se llama desde submit)"""
+        self.tasks = [task for task in self.tasks if not task.done()]
+        for index in range(len(self.tasks), self.workers):
+            self.tasks.append(asyncio.create_task(self._worker(index)))
+
+    async def submit(self, job, label=None):
+        """
+        Encola un trabajo de post-proceso
+
+        Args:
+            job: Corrutina a ejecutar (todavía sin esperar)
+            label: Identificador para los logs
+
+        Returns:
+            asyncio.Future: Se resuelve con {"exception", "result"} al
+            terminar; nunca lanza la excepción del trabajo
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((label, job, future))
+        logger.logger.info(
+            f"PostProcessor submit {label}: {self.queue.qsize()} queued, {self.active} active"
+        )
+        return future
+
+    async def _worker(self, index):
+        while True:
+            label, job, future = await self.queue.get()
+            self.active += 1
+            start = time.time()
+            exception = result = None
+            try:
+                result = await job
+                self.processed += 1
+            except Exception as e:
+                logger.logger.exception(f"PostProcessor worker {index} Exception: {label} > {e}")
+                exception = e
+                self.failed += 1
+            finally:
+                elapsed = time.time() - start
+                self.total_time += elapsed
+                self.active -= 1
+                self.queue.task_done()
+            logger.logger.info(f"PostProcessor worker {index} finished {label} in {elapsed:.2f}s")
+            if not future.done():
+                future.set_result({"exception": exception, "result": result})
+
+    def get_status_info(self):
+        """
+        Obtiene el estado de la etapa de post-proceso
+
+        Returns:
+            dict: Tareas, trabajos activos, en cola y terminados
+        """
+        finished = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "queued": self.queue.qsize(),
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_time": self.total_time / finished if finished else 0.0,
+        }
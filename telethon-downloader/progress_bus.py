@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+import itertools
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+import logger
+from constants import EnvironmentReader
+
+
+class ProgressTracker:
+    """
+    Progreso de un trabajo (Telegram, enlace, yt-dlp o extracción)
+
+    update() solo guarda el estado, así que se puede llamar desde el
+    progress_callback, desde un hilo de trabajo o desde un hook de yt-dlp;
+    es el ticker del ProgressBus quien decide cuándo editar el mensaje.
+    """
+
+    def __init__(self, bus, key, message, header, label):
+        self.bus = bus
+        self.key = key
+        self.message = message
+        self.header = header
+        self.label = label
+        self.current = 0
+        self.total = 0
+        # Bytes que ya había al empezar (descarga reanudada)
+        self.start_bytes = None
+        self.start_time = time.time()
+        self.start_time_short = time.strftime("%H:%M:%S", time.localtime())
+        self.version = 0
+        self.rendered_version = 0
+        self.last_render = 0.0
+        self.last_text = None
+        self.last_logged = -1
+        self.closed = False
+        self.lock = asyncio.Lock()
+
+    def update(self, current, total):
+        if self.start_bytes is None:
+            self.start_bytes = current
+        self.current = current
+        self.total = total or 0
+        self.version += 1
+
+        percentage = self.percentage()
+        if percentage % 10 == 0 and percentage != self.last_logged:
+            self.last_logged = percentage
+            logger.logger.info(
+                f"Downloading... {self.label} > {self.message.id} >> {percentage}% - Speed: {self.speed():.2f} MB/s"
+            )
+
+    def percentage(self):
+        return int(self.current / self.total * 100) if self.total else 0
+
+    def speed(self):
+        elapsed = time.time() - self.start_time
+        transferred = self.current - (self.start_bytes or 0)
+        return transferred / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+
+    async def close(self):
+        """Deja de publicar; espera a que termine una edición en curso"""
+        async with self.lock:
+            self.closed = True
+        self.bus.trackers.pop(self.key, None)
+
+
+class ProgressBus:
+    """
+    Bus único de progreso para todas las descargas
+
+    Un solo ticker repasa los trabajos activos y edita sus mensajes
+    respetando un presupuesto global de ediciones por segundo
+    (PROGRESS_EDITS_PER_SECOND) y un intervalo mínimo por mensaje
+    (PROGRESS_MIN_INTERVAL), de modo que muchas descargas en paralelo no
+    provocan FloodWait. Las plantillas de idioma se resuelven una sola vez.
+    """
+
+    def __init__(self, client, templatesLanguage):
+        self.client = client
+        self.constants = EnvironmentReader()
+
+        self.enabled = self.constants.get_variable("TG_PROGRESS_DOWNLOAD") in ("True", "true", True)
+        self.edits_per_second = max(0.05, float(self.constants.get_variable("PROGRESS_EDITS_PER_SECOND")))
+        self.min_interval = max(1, int(self.constants.get_variable("PROGRESS_MIN_INTERVAL")))
+        self.tick_interval = 1.0
+
+        self.template_starting = templatesLanguage.template("PROGRESS_CALLBACK_STARTING")
+        self.template_progress = templatesLanguage.template("PROGRESS_CALLBACK_PROGRESS")
+
+        self.trackers = {}
+        self.keys = itertools.count(1)
+        self.tokens = self.edits_per_second
+        self.paused_until = 0.0
+        self.task = None
+
+    def track(self, message, header, label=None):
+        """
+        Registra un trabajo en el bus
+
+        Args:
+            message: Mensaje de Telegram que muestra el progreso
+            header: Texto fijo (ya localizado) sobre la línea de progreso
+            label: Identificador para los logs
+
+        Returns:
+            ProgressTracker: Objeto al que reportar (current, total)
+        """
+        key = next(self.keys)
+        tracker = ProgressTracker(self, key, message, header, label or message.id)
+        if self.enabled and message is not None:
+            self.trackers[key] = tracker
+            if self.task is None or self.task.done():
+                self.task = asyncio.create_task(self._run())
+        logger.logger.info(f"progress_bus track started {tracker.label} > {getattr(message, 'id', None)}.")
+        return tracker
+
+    async def _run(self):
+        while self.trackers:
+            await asyncio.sleep(self.tick_interval)
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.logger.error(f"ProgressBus tick Exception: {e}")
+
+    async def tick(self):
+        now = time.time()
+        self.tokens = min(
+            max(1.0, self.edits_per_second),
+            self.tokens + self.edits_per_second * self.tick_interval,
+        )
+        if now < self.paused_until:
+            return
+
+        pending = sorted(
+            (
+                tracker
+                for tracker in list(self.trackers.values())
+                if tracker.version != tracker.rendered_version
+                and now - tracker.last_render >= self.min_interval
+            ),
+            key=lambda tracker: tracker.last_render,
+        )
+
+        for tracker in pending:
+            if self.tokens < 1:
+                break
+            self.tokens -= 1
+            await self.render(tracker)
+
+    def render_text(self, tracker):
+        text = tracker.header
+        text += self.template_starting.format(starting=tracker.start_time_short)
+        text += self.template_progress.format(
+            percentage=tracker.percentage(),
+            total=(tracker.total or tracker.current) / 1024 / 1024,
+            speed=tracker.speed(),
+        )
+        return text
+
+    async def render(self, tracker):
+        async with tracker.lock:
+            if tracker.closed:
+                return
+            version = tracker.version
+            text = self.render_text(tracker)
+            tracker.rendered_version = version
+            tracker.last_render = time.time()
+            if text == tracker.last_text:
+                return
+            try:
+                await self.client.edit_message(
+                    tracker.message.chat_id, tracker.message.id, text
+                )
+                tracker.last_text = text
+            except MessageNotModifiedError:
+                tracker.last_text = text
+            except FloodWaitError as e:
+                logger.logger.info(f"ProgressBus FloodWait {e.seconds}s, pausing edits")
+                self.paused_until = time.time() + e.seconds
+            except Exception as e:
+                logger.logger.error(f"ProgressBus render Exception: {tracker.label} {e}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+
+import logger
+
+
+class RequestRateLimiter:
+    """
+    Presupuesto compartido de peticiones a la API (token bucket)
+
+    Todos los escaneos de grupos piden un turno antes de cada página de
+    mensajes, así que varios escaneos a la vez no superan en conjunto
+    requests_per_second. Un FloodWait en cualquiera de ellos pausa a todos
+    durante los segundos que indica Telegram.
+    """
+
+    def __init__(self, requests_per_second, burst=None):
+        self.rate = max(0.1, float(requests_per_second))
+        self.burst = max(1.0, float(burst or self.rate))
+        self.tokens = self.burst
+        self.last_refill = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.requests = 0
+        self.total_wait = 0.0
+
+    async def acquire(self):
+        """Espera hasta que haya un turno libre y lo consume"""
+        start = time.monotonic()
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        self.requests += 1
+        self.total_wait += time.monotonic() - start
+
+    def pause(self, seconds):
+        """Detiene todas las peticiones durante seconds (FloodWait)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+        logger.logger.info(f"RequestRateLimiter paused {seconds}s")
+
+    def get_status_info(self):
+        return {
+            "rate": self.rate,
+            "requests": self.requests,
+            "avg_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "paused": max(0.0, self.paused_until - time.monotonic()),
+        }
@@ -0,0 +1,25 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download_manager import DownloadPathManager
+
+
+class TestDownloadPathManager(unittest.TestCase):
+    def test_inline_ignorecase_flag(self):
+        # El prefiltro literal debe respetar banderas en línea como (?i)
+        manager = DownloadPathManager({"REGEX_PATH": {"/(?i)foo/": "/foo", "/bar/": "/bar"}})
+        rule = manager.match("FOO.mkv")
+        self.assertIsNotNone(rule)
+        self.assertEqual(rule["path"], "/foo")
+        self.assertIsNone(manager.match("BAR.mkv"))
+
+    def test_flag_suffix_ignorecase(self):
+        manager = DownloadPathManager({"REGEX_PATH": {"/foo/i": "/foo"}})
+        self.assertEqual(manager.match("Foo.mkv")["path"], "/foo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 import os
+import stat
+import time
 import shutil
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 import logger
 from constants import EnvironmentReader
@@ -33,12 +36,18 @@ class Utils:
 
     def change_permissions(self, file_name):
         try:
-            if os.path.isfile(file_name):
+            # Un solo stat en vez de isfile + isdir (cada uno es un viaje
+            # al servidor en NFS/SMB)
+            try:
+                mode = os.stat(file_name).st_mode
+            except FileNotFoundError:
+                mode = 0
+            if stat.S_ISREG(mode):
                 os.chmod(file_name, self.permisos_octal_file)
                 logger.logger.info(
                     f"Change permissions of the file {file_name} changed to {self.PERMISSIONS_FILE}"
                 )
-            elif os.path.isdir(file_name):
+            elif stat.S_ISDIR(mode):
                 os.chmod(file_name, self.permisos_octal_folder)
                 logger.logger.info(
                     f"Change permissions of the directory {file_name} changed to {self.PERMISSIONS_FOLDER}"
@@ -77,11 +86,15 @@ class Utils:
     def create_folders(self, folder_name):
         try:
             logger.logger.info(f"create_folders path: {folder_name}")
-            # Verificar si la folder_name es un archivo
-            if os.path.isfile(folder_name):
+            # Verificar si la folder_name es un archivo (un solo stat)
+            try:
+                mode = os.stat(folder_name).st_mode
+            except FileNotFoundError:
+                mode = 0
+            if stat.S_ISREG(mode):
                 base_directory = os.path.dirname(folder_name)
                 self.create_folder(base_directory)
-            elif os.path.isdir(folder_name):
+            elif stat.S_ISDIR(mode):
                 self.create_folder(folder_name)
             else:
                 dirname = os.path.dirname(folder_name)
@@ -112,6 +125,135 @@ class Utils:
                 f"change_owner_permissions Exception: {folder_name}: {e}"
             )
 
+    def change_owner_permissions_tree(self, root, workers=None):
+        """
+        Aplica PUID/PGID y PERMISSIONS_FILE/PERMISSIONS_FOLDER a todo un
+        árbol (extracciones, carpetas de listas de YouTube)
+
+        Recorre con os.scandir repartiendo las carpetas entre un pool de
+        hilos y solo hace chown/chmod en las entradas cuyo dueño o modo no
+        son ya los correctos. Los enlaces simbólicos no se siguen.
+
+        Returns:
+            dict: entries, changed, errors y elapsed (segundos)
+        """
+        start = time.time()
+        stats = {"entries": 0, "changed": 0, "errors": 0, "elapsed": 0.0}
+        workers = workers or max(1, int(self.constants.get_variable("PERMISSIONS_WORKERS")))
+
+        try:
+            root_stat = os.stat(root)
+        except OSError as e:
+            logger.logger.info(f"change_owner_permissions_tree => {root}: {e}")
+            return stats
+
+        self._add_stats(stats, self._fix_entry(root, root_stat))
+        if stat.S_ISDIR(root_stat.st_mode):
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="permissions"
+            ) as executor:
+                pending = {executor.submit(self._fix_directory, root)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        subdirectories, result = future.result()
+                        self._add_stats(stats, result)
+                        pending.update(
+                            executor.submit(self._fix_directory, subdirectory)
+                            for subdirectory in subdirectories
+                        )
+
+        stats["elapsed"] = time.time() - start
+        logger.logger.info(
+            f"change_owner_permissions_tree => {root}: {stats['changed']} of "
+            f"{stats['entries']} entries changed, {stats['errors']} errors "
+            f"in {stats['elapsed']:.2f}s"
+        )
+        return stats
+
+    def _add_stats(self, stats, result):
+        for key in ("entries", "changed", "errors"):
+            stats[key] += result[key]
+
+    def _fix_directory(self, directory):
+        subdirectories = []
+        result = {"entries": 0, "changed": 0, "errors": 0}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        entry_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        result["errors"] += 1
+                        continue
+                    if stat.S_ISLNK(entry_stat.st_mode):
+                        continue
+                    if stat.S_ISDIR(entry_stat.st_mode):
+                        subdirectories.append(entry.path)
+                    self._add_stats(result, self._fix_entry(entry.path, entry_stat))
+        except OSError as e:
+            logger.logger.info(f"change_owner_permissions_tree => {directory}: {e}")
+            result["errors"] += 1
+        return subdirectories, result
+
+    def _fix_entry(self, path, entry_stat):
+        result = {"entries": 1, "changed": 0, "errors": 0}
+        is_dir = stat.S_ISDIR(entry_stat.st_mode)
+        mode = self.permisos_octal_folder if is_dir else self.permisos_octal_file
+        try:
+            changed = False
+            if (
+                self.PUID
+                and self.PGID
+                and (entry_stat.st_uid, entry_stat.st_gid) != (self.PUID, self.PGID)
+            ):
+                os.chown(path, self.PUID, self.PGID, follow_symlinks=False)
+                changed = True
+            if stat.S_IMODE(entry_stat.st_mode) != mode:
+                os.chmod(path, mode)
+                changed = True
+            result["changed"] = int(changed)
+        except OSError as e:
+            logger.logger.info(f"change_owner_permissions_tree => {path}: {e}")
+            result["errors"] = 1
+        return result
+
+    def existing_ancestor(self, path):
+        path = os.path.abspath(path)
+        while not os.path.exists(path) and path != os.path.dirname(path):
+            path = os.path.dirname(path)
+        return path
+
+    def same_device(self, path_a, path_b):
+        """Indica si dos rutas (o sus carpetas existentes) están en el mismo dispositivo"""
+        return (
+            os.stat(self.existing_ancestor(path_a)).st_dev
+            == os.stat(self.existing_ancestor(path_b)).st_dev
+        )
+
+    def mount_point(self, path):
+        """Punto de montaje del sistema de archivos que contiene path"""
+        path = self.existing_ancestor(path)
+        while not os.path.ismount(path):
+            path = os.path.dirname(path)
+        return path
+
+    def copy_file(self, source, destination, progress=None, chunk_size=8 * 1024 * 1024):
+        """
+        Copia por trozos informando del avance con progress(copied, total);
+        pensada para ejecutarse en un hilo de trabajo
+        """
+        total = os.path.getsize(source)
+        copied = 0
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            while chunk := src.read(chunk_size):
+                dst.write(chunk)
+                copied += len(chunk)
+                if progress:
+                    progress(copied, total)
+        shutil.copystat(source, destination)
+        return destination
+
 
 # Example of usage
 if __name__ == "__main__":
@@ -0,0 +1,311 @@
+import os
+import re
+import struct
+import threading
+
+import logger
+
+
+class VolumeSetTracker:
+    """
+    Conjuntos de volúmenes de un archivo comprimido partido
+
+    Reconoce name.partN.rar, name.rar + name.rNN, name.zip + name.zNN y
+    los cortes por bytes name.zip.NNN / name.7z.NNN. Cada conjunto se
+    identifica por su nombre base y su carpeta de destino; moveFile
+    registra cada volumen al colocarlo y claim() decide, con los volúmenes
+    registrados más los que ya estén en la carpeta (por si hubo un
+    reinicio), si el conjunto está completo. Solo una llamada obtiene el
+    conjunto completo para extraerlo, aunque las partes lleguen en
+    paralelo desde un escaneo de grupo.
+
+    Un conjunto está completo cuando no falta ningún número entre el
+    primer y el último volumen y el último lo confirma su propio formato:
+    la cabecera de fin de archivo de rar, el número de disco del
+    directorio central de zip o el tamaño total de la cabecera de 7z.
+    """
+
+    PATTERNS = [
+        ("rar", re.compile(r"^(?P<base>.+)\.part(?P<index>\d+)\.rar$", re.IGNORECASE)),
+        ("rar_old", re.compile(r"^(?P<base>.+)\.(?:rar|r(?P<index>\d{2,3}))$", re.IGNORECASE)),
+        ("zip_split", re.compile(r"^(?P<base>.+)\.(?:zip|z(?P<index>\d{2,3}))$", re.IGNORECASE)),
+        ("split", re.compile(r"^(?P<base>.+)\.(?P<type>zip|7z)\.(?P<index>\d{3})$", re.IGNORECASE)),
+    ]
+
+    RAR4_SIGNATURE = b"Rar!\x1a\x07\x00"
+    RAR5_SIGNATURE = b"Rar!\x1a\x07\x01\x00"
+    SEVEN_ZIP_SIGNATURE = b"7z\xbc\xaf\x27\x1c"
+    ZIP_EOCD_SIGNATURE = b"PK\x05\x06"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> {"parts": {index: path}, "state": None | "extracting" | "done"}
+        self.sets = {}
+
+    def match(self, file_path):
+        """
+        Tipo, nombre base e índice de un volumen según su nombre
+
+        Returns:
+            tuple: (kind, base, index) o None
+        """
+        name = os.path.basename(file_path)
+        for kind, pattern in self.PATTERNS:
+            found = pattern.match(name)
+            if not found:
+                continue
+            if kind == "rar":
+                return kind, found["base"], int(found["index"])
+            if kind == "rar_old":
+                # name.rar es el primero, name.r00 el segundo...
+                index = 0 if found["index"] is None else int(found["index"]) + 1
+                return kind, found["base"], index
+            if kind == "zip_split":
+                # name.z01... y name.zip es el último (su índice sale del
+                # número de disco de su directorio central)
+                index = None if found["index"] is None else int(found["index"])
+                return kind, found["base"], index
+            return kind, f"{found['base']}.{found['type']}", int(found["index"])
+        return None
+
+    def archive_type(self, found):
+        """Formato (rar, zip o 7z) de un resultado de match()"""
+        kind, base, _ = found
+        if kind in ("rar", "rar_old"):
+            return "rar"
+        if kind == "zip_split" or base.lower().endswith(".zip"):
+            return "zip"
+        return "7z"
+
+    def key(self, file_path, kind, base):
+        return (kind, base, os.path.dirname(os.path.abspath(file_path)))
+
+    def add_part(self, file_path):
+        """Registra un volumen recién colocado por moveFile"""
+        found = self.match(file_path)
+        if not found:
+            return None
+        kind, base, index = found
+        key = self.key(file_path, kind, base)
+        with self.lock:
+            volume_set = self.sets.setdefault(key, {"parts": {}, "state": None})
+            volume_set["parts"][index] = file_path
+        logger.logger.info(f"VolumeSetTracker add_part {kind} {base} [{index}]: {file_path}")
+        return key
+
+    def claim(self, file_path):
+        """
+        Decide qué hacer con un archivo tras descargarlo
+
+        Returns:
+            tuple: ("single", None) si no es parte de un conjunto,
+            ("waiting", info) si faltan volúmenes o ya se está extrayendo,
+            ("ready", info) si el conjunto está completo y esta llamada
+            debe extraerlo; info tiene key, kind, base, first, volumes,
+            found y expected
+        """
+        found = self.match(file_path)
+        if not found:
+            return "single", None
+        kind, base, _ = found
+        if kind in ("rar_old", "zip_split") and not self._is_multivolume(kind, file_path):
+            return "single", None
+
+        key = self.key(file_path, kind, base)
+        with self.lock:
+            volume_set = self.sets.setdefault(key, {"parts": {}, "state": None})
+            parts = self._scan(key)
+            parts.update(
+                {
+                    index: path
+                    for index, path in volume_set["parts"].items()
+                    if os.path.exists(path)
+                }
+            )
+            volume_set["parts"] = parts
+
+            info = self._completion(kind, base, parts)
+            info["key"] = key
+            if volume_set["state"] is not None or not info["complete"]:
+                info["state"] = volume_set["state"]
+                return "waiting", info
+            volume_set["state"] = "extracting"
+            return "ready", info
+
+    def release(self, key, success):
+        """Marca el conjunto como extraído, o lo libera para reintentar"""
+        with self.lock:
+            if key in self.sets:
+                self.sets[key]["state"] = "done" if success else None
+
+    def _scan(self, key):
+        kind, base, directory = key
+        parts = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    found = self.match(entry.name)
+                    if found and found[0] == kind and found[1] == base and entry.is_file():
+                        parts[found[2]] = entry.path
+        except OSError as e:
+            logger.logger.info(f"VolumeSetTracker scan {directory}: {e}")
+        return parts
+
+    def _completion(self, kind, base, parts):
+        info = {"kind": kind, "base": base, "found": len(parts), "expected": None}
+
+        if kind == "zip_split":
+            last = parts.get(None)
+            disks = self._zip_disks(last) if last else None
+            numbered = sorted(index for index in parts if index is not None)
+            info["expected"] = disks
+            info["complete"] = bool(disks) and numbered == list(range(1, disks))
+            info["first"] = last
+            info["volumes"] = [parts[index] for index in numbered] + ([last] if last else [])
+            return info
+
+        indexes = sorted(parts)
+        first_index = 0 if kind == "rar_old" else 1
+        contiguous = indexes == list(range(first_index, first_index + len(indexes)))
+        info["first"] = parts.get(first_index)
+        info["volumes"] = [parts[index] for index in indexes]
+        if not contiguous or not indexes:
+            info["complete"] = False
+            return info
+
+        last = parts[indexes[-1]]
+        if kind == "split" and base.lower().endswith(".7z"):
+            total = self._seven_zip_size(info["first"])
+            size = sum(os.path.getsize(path) for path in info["volumes"])
+            info["complete"] = total is not None and size >= total
+        elif kind == "split":
+            info["complete"] = self._zip_disks(last) is not None
+        else:
+            more = self._rar_more_volumes(last)
+            if more is None:
+                # Formato no reconocido: el último volumen suele ser más pequeño
+                more = len(indexes) == 1 or os.path.getsize(last) >= os.path.getsize(info["first"])
+            info["complete"] = not more
+        if info["complete"]:
+            info["expected"] = len(indexes)
+        return info
+
+    def _is_multivolume(self, kind, file_path):
+        """name.rar y name.zip solo son conjunto si su cabecera lo indica"""
+        if kind == "zip_split":
+            found = self.match(file_path)
+            if found[2] is not None:
+                return True
+            return (self._zip_disks(file_path) or 1) > 1
+        if self.match(file_path)[2] != 0:
+            return True
+        return bool(self._rar_volume_flag(file_path))
+
+    # Cabeceras de formato
+
+    def _read(self, file_path, size, tail=False):
+        try:
+            with open(file_path, "rb") as file:
+                if tail:
+                    file.seek(max(0, os.path.getsize(file_path) - size))
+                return file.read(size)
+        except OSError:
+            return b""
+
+    def _vint(self, data, pos):
+        value = shift = 0
+        while pos < len(data):
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, pos
+        raise ValueError("truncated vint")
+
+    def _rar_volume_flag(self, file_path):
+        data = self._read(file_path, 64)
+        try:
+            if data.startswith(self.RAR5_SIGNATURE):
+                pos = len(self.RAR5_SIGNATURE) + 4
+                _, pos = self._vint(data, pos)
+                header_type, pos = self._vint(data, pos)
+                flags, pos = self._vint(data, pos)
+                if header_type != 1:
+                    return None
+                if flags & 0x0001:
+                    _, pos = self._vint(data, pos)
+                if flags & 0x0002:
+                    _, pos = self._vint(data, pos)
+                archive_flags, pos = self._vint(data, pos)
+                return bool(archive_flags & 0x0001)
+            if data.startswith(self.RAR4_SIGNATURE):
+                pos = len(self.RAR4_SIGNATURE)
+                header_type = data[pos + 2]
+                flags = struct.unpack_from("<H", data, pos + 3)[0]
+                return header_type == 0x73 and bool(flags & 0x0001)
+        except (ValueError, IndexError, struct.error):
+            pass
+        return None
+
+    def _rar_more_volumes(self, file_path):
+        """
+        Lee la cabecera de fin de archivo de un volumen rar
+
+        Returns:
+            bool: True si le siguen más volúmenes, None si no se reconoce
+        """
+        head = self._read(file_path, 8)
+        tail = self._read(file_path, 64, tail=True)
+        try:
+            if head.startswith(self.RAR5_SIGNATURE):
+                for start in range(len(tail) - 7, -1, -1):
+                    try:
+                        size, pos = self._vint(tail, start + 4)
+                    except ValueError:
+                        continue
+                    if pos + size != len(tail):
+                        continue
+                    header_type, pos = self._vint(tail, pos)
+                    if header_type != 5:
+                        continue
+                    flags, pos = self._vint(tail, pos)
+                    if flags & 0x0001:
+                        _, pos = self._vint(tail, pos)
+                    if flags & 0x0002:
+                        _, pos = self._vint(tail, pos)
+                    end_flags, _ = self._vint(tail, pos)
+                    return bool(end_flags & 0x0001)
+            elif head.startswith(self.RAR4_SIGNATURE):
+                for start in range(len(tail) - 7, -1, -1):
+                    if tail[start + 2] != 0x7B:
+                        continue
+                    flags, size = struct.unpack_from("<HH", tail, start + 3)
+                    if start + size == len(tail):
+                        return bool(flags & 0x0001)
+        except (ValueError, IndexError, struct.error):
+            pass
+        return None
+
+    def _zip_disks(self, file_path):
+        """Número de discos según el directorio central, o None si no está"""
+        tail = self._read(file_path, 65536 + 22, tail=True)
+        position = tail.rfind(self.ZIP_EOCD_SIGNATURE)
+        while position >= 0:
+            if position + 22 <= len(tail):
+                disk = struct.unpack_from("<H", tail, position + 4)[0]
+                comment_length = struct.unpack_from("<H", tail, position + 20)[0]
+                if position + 22 + comment_length == len(tail):
+                    return disk + 1
+            position = tail.rfind(self.ZIP_EOCD_SIGNATURE, 0, position)
+        return None
+
+    def _seven_zip_size(self, file_path):
+        """Tamaño total del archivo 7z según su cabecera inicial"""
+        if not file_path:
+            return None
+        head = self._read(file_path, 32)
+        if len(head) < 32 or not head.startswith(self.SEVEN_ZIP_SIGNATURE):
+            return None
+        next_header_offset, next_header_size = struct.unpack_from("<QQ", head, 12)
+        return 32 + next_header_offset + next_header_size
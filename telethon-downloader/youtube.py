@@ -1,18 +1,56 @@
 from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadCancelled
 
 import os
+import copy
 import time
 import asyncio
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs, urlencode
 
 import logger
 from constants import EnvironmentReader
 from utils import Utils
+from async_fs import AsyncFS
 
 
 class YouTubeDownloader:
-    def __init__(self):
+    """
+    Descargas de YouTube con yt-dlp
+
+    yt-dlp es bloqueante, así que extract_info y download se ejecutan en
+    un pool de YOUTUBE_MAX_WORKERS hilos; el progreso vuelve al event loop
+    con call_soon_threadsafe y cada trabajo se puede cancelar con cancel().
+
+    Los info_dict se guardan en una caché LRU por URL normalizada con
+    caducidad (YOUTUBE_INFO_CACHE_TTL), y la descarga los reutiliza con
+    process_ie_result, así que cada URL se resuelve una sola vez.
+
+    Las listas de reproducción se reparten entre YOUTUBE_PLAYLIST_WORKERS
+    descargas simultáneas por lista y solo se reintentan los vídeos que
+    fallan.
+    """
+
+    def __init__(self, progress_bus=None, templatesLanguage=None, fs=None):
         self.constants = EnvironmentReader()
+        self.progress_bus = progress_bus
+        self.templatesLanguage = templatesLanguage
         self.utils = Utils()
+        self.fs = fs or AsyncFS(self.utils)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, self.constants.get_variable("YOUTUBE_MAX_WORKERS")),
+            thread_name_prefix="yt-dlp",
+        )
+        # Eventos de cancelación de los trabajos en curso por message.id
+        self.cancel_events = {}
+        self.info_cache = OrderedDict()
+        self.info_cache_ttl = self.constants.get_variable("YOUTUBE_INFO_CACHE_TTL")
+        self.info_cache_size = max(1, self.constants.get_variable("YOUTUBE_INFO_CACHE_SIZE"))
+        self.playlist_workers = max(1, self.constants.get_variable("YOUTUBE_PLAYLIST_WORKERS"))
+        self.playlist_retries = max(0, self.constants.get_variable("YOUTUBE_PLAYLIST_RETRIES"))
         self.ydl_opts_VIDEO = {
             "format": self.constants.get_variable("YOUTUBE_FORMAT_VIDEO"),
             "outtmpl": f'{self.constants.get_variable("PATH_YOUTUBE")}/%(title)s.%(ext)s',
@@ -44,65 +82,347 @@ class YouTubeDownloader:
             percent = data["_percent_str"]
             logger.logger.info(f"Descargando: {percent}")
 
-    async def downloadVideo(self, url, message):
-        logger.logger.info(f"YouTubeDownloader downloadVideo [{url}] [{message}]")
-
-        YOUTUBE_VIDEO_FOLDER = os.path.join(
-            self.constants.get_variable("YOUTUBE_VIDEO_FOLDER")
+    def track(self, message, info_dict):
+        if not self.progress_bus or not self.templatesLanguage:
+            return None
+        header = self.templatesLanguage.template("PROGRESS_CALLBACK_YOUTUBE").format(
+            title=info_dict.get("title", "")
         )
+        return self.progress_bus.track(message, header, info_dict.get("id"))
 
-        with YoutubeDL(self.ydl_opts_VIDEO) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-            file_name = ydl.prepare_filename(info_dict)
-            total_downloads = 1
-            youtube_path = YOUTUBE_VIDEO_FOLDER
-            self.utils.change_owner_permissions(youtube_path)
-
-            if "_type" in info_dict and info_dict["_type"] == "playlist":
-                total_downloads = len(info_dict["entries"])
-                youtube_path = os.path.join(
-                    YOUTUBE_VIDEO_FOLDER,
-                    info_dict["uploader"],
-                    info_dict["title"],
+    def progress_hook_for(self, tracker, loop, cancel):
+        def hook(data):
+            if cancel.is_set():
+                raise DownloadCancelled("Download cancelled")
+            if tracker and data["status"] == "downloading":
+                loop.call_soon_threadsafe(
+                    tracker.update,
+                    data.get("downloaded_bytes") or 0,
+                    data.get("total_bytes") or data.get("total_bytes_estimate") or 0,
                 )
-            else:
-                youtube_path = os.path.join(YOUTUBE_VIDEO_FOLDER, info_dict["uploader"])
-
-            ydl_opts = {
-                "format": self.constants.get_variable("YOUTUBE_FORMAT_VIDEO"),
-                "outtmpl": f"{youtube_path}/%(title)s.%(ext)s",
-                "cachedir": "False",
-                "ignoreerrors": True,
-                "retries": 10,
-                "merge_output_format": self.constants.get_variable(
-                    "YOUTUBE_DEFAULT_EXTENSION"
-                ).lower(),
-            }
-            ydl_opts.update(ydl_opts)
 
+        return hook
+
+    def cancel(self, message_id=None):
+        """
+        Cancela un trabajo en curso, o todos si no se indica message_id
+
+        Returns:
+            int: Número de trabajos cancelados
+        """
+        events = (
+            [self.cancel_events[message_id]]
+            if message_id in self.cancel_events
+            else []
+            if message_id is not None
+            else list(self.cancel_events.values())
+        )
+        for event in events:
+            event.set()
+        return len(events)
+
+    async def run(self, func, *args):
+        """Ejecuta una llamada bloqueante de yt-dlp en el pool de hilos"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    def normalize_url(self, url):
+        """
+        Normaliza un enlace de YouTube para usarlo como clave de caché:
+        youtu.be/ID y m.youtube.com pasan a youtube.com/watch?v=ID y solo
+        se conservan los parámetros v y list
+        """
+        parsed = urlparse(url.strip())
+        host = parsed.netloc.lower()
+        for prefix in ("www.", "m.", "music."):
+            host = host[len(prefix):] if host.startswith(prefix) else host
+        query = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+
+        if host == "youtu.be":
+            host, query["v"] = "youtube.com", [path.lstrip("/")]
+            path = "/watch"
+        elif path.startswith("/shorts/"):
+            query["v"] = [path.split("/")[2]]
+            path = "/watch"
+
+        params = urlencode(
+            sorted((key, query[key][0]) for key in ("v", "list") if key in query)
+        )
+        return f"{host}{path}?{params}" if params else f"{host}{path}"
+
+    async def get_info(self, ydl_opts, url):
+        """
+        info_dict de url, desde la caché si no ha caducado
+
+        La clave incluye el formato pedido, porque extract_info ya deja
+        elegidos los formatos del info_dict.
+        """
+        key = (self.normalize_url(url), ydl_opts.get("format"))
+        cached = self.info_cache.get(key)
+        if cached and time.time() - cached[0] < self.info_cache_ttl:
+            self.info_cache.move_to_end(key)
+            logger.logger.info(f"YouTubeDownloader info cache hit [{url}]")
+            return cached[1]
+
+        info_dict = await self.run(self._extract_info, ydl_opts, url)
+        self.info_cache[key] = (time.time(), info_dict)
+        self.info_cache.move_to_end(key)
+        while len(self.info_cache) > self.info_cache_size:
+            self.info_cache.popitem(last=False)
+        return info_dict
+
+    def invalidate_info(self, ydl_opts, url):
+        """Quita url de la caché de info_dict"""
+        self.info_cache.pop((self.normalize_url(url), ydl_opts.get("format")), None)
+
+    def _extract_info(self, ydl_opts, url):
         with YoutubeDL(ydl_opts) as ydl:
-            logger.logger.info(f"DOWNLOADING VIDEO YOUTUBE [{url}] [{file_name}]")
-            await message.edit(f"downloading {total_downloads} videos...")
-            res_youtube = ydl.download([url])
+            return ydl.extract_info(url, download=False)
 
-            filename = os.path.basename(file_name)
-            final_file = os.path.join(youtube_path, filename)
+    def _prepare_filename(self, ydl_opts, info_dict):
+        with YoutubeDL(ydl_opts) as ydl:
+            return ydl.prepare_filename(info_dict)
 
-            if res_youtube == False:
-                os.chmod(youtube_path, 0o777)
-                logger.logger.info(
-                    f"DOWNLOADED ==> {total_downloads} VIDEO YOUTUBE [{file_name}] [{youtube_path}][{filename}]"
+    def _download(self, ydl_opts, url, info_dict):
+        with YoutubeDL(ydl_opts) as ydl:
+            try:
+                # process_ie_result modifica el info_dict: se trabaja sobre una copia
+                ydl.process_ie_result(copy.deepcopy(info_dict), download=True)
+                return ydl._download_retcode
+            except DownloadCancelled as e:
+                logger.logger.info(f"YouTubeDownloader cancelled [{url}] {e}")
+                return 1
+
+    async def download(self, ydl_opts, url, info_dict, message, tracker):
+        """
+        Descarga un info_dict ya resuelto en el pool de hilos
+
+        Si la tarea que espera se cancela, o se llama a cancel(), el hook
+        de progreso detiene yt-dlp en el siguiente fragmento.
+
+        Returns:
+            int: Código de retorno de ydl.download (0 si todo fue bien) o,
+            en una lista, el número de vídeos que no se han descargado
+        """
+        if info_dict.get("_type") == "playlist":
+            return await self.download_playlist(ydl_opts, url, info_dict, message, tracker)
+
+        cancel = threading.Event()
+        self.cancel_events[message.id] = cancel
+        ydl_opts["progress_hooks"] = [
+            self.progress_hook,
+            self.progress_hook_for(tracker, asyncio.get_running_loop(), cancel),
+        ]
+        try:
+            return await self.run(self._download, ydl_opts, url, info_dict)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+        finally:
+            self.cancel_events.pop(message.id, None)
+            if tracker:
+                await tracker.close()
+
+    async def download_playlist(self, ydl_opts, url, info_dict, message, tracker):
+        """
+        Descarga los vídeos de una lista en paralelo
+
+        Cada vídeo es un trabajo del pool de hilos; el tracker muestra los
+        bytes agregados de todos y cuántos van terminados o fallidos. Los
+        fallidos se reintentan hasta YOUTUBE_PLAYLIST_RETRIES veces; antes
+        de cada reintento se vuelven a extraer, porque las URL de formato
+        del info_dict caducan.
+
+        Returns:
+            int: Número de vídeos que no se han podido descargar
+        """
+        entries = [entry for entry in info_dict.get("entries") or [] if entry]
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        self.cancel_events[message.id] = cancel
+        semaphore = asyncio.Semaphore(self.playlist_workers)
+        header = tracker.header if tracker else ""
+        progress = {index: (0, 0) for index in range(len(entries))}
+        results = {}
+
+        logger.logger.info(
+            f"YouTubeDownloader playlist [{url}] entries={len(entries)} workers={self.playlist_workers}"
+        )
+
+        def report(index, downloaded, total):
+            progress[index] = (downloaded, total or progress[index][1])
+            if tracker:
+                tracker.update(
+                    sum(item[0] for item in progress.values()),
+                    sum(item[1] for item in progress.values()),
                 )
-                end_time_short = time.strftime("%H:%M", time.localtime())
-                await message.edit(
-                    f"Downloading finished {total_downloads} video at {end_time_short}\n{final_file}"
+
+        def hook_for(index):
+            def hook(data):
+                if cancel.is_set():
+                    raise DownloadCancelled("Download cancelled")
+                if data["status"] == "downloading":
+                    loop.call_soon_threadsafe(
+                        report,
+                        index,
+                        data.get("downloaded_bytes") or 0,
+                        data.get("total_bytes") or data.get("total_bytes_estimate") or 0,
+                    )
+
+            return hook
+
+        async def download_entry(index):
+            entry = entries[index]
+            async with semaphore:
+                if cancel.is_set():
+                    results[index] = 1
+                    return
+                entry_opts = dict(
+                    ydl_opts, progress_hooks=[self.progress_hook, hook_for(index)]
                 )
-                self.utils.change_owner_permissions(final_file)
-            else:
-                logger.logger.info(
-                    f"ERROR: ONE OR MORE YOUTUBE VIDEOS NOT DOWNLOADED [{total_downloads}] [{url}] [{youtube_path}]"
+                try:
+                    results[index] = await self.run(
+                        self._download, entry_opts, entry.get("webpage_url") or url, entry
+                    )
+                except Exception as e:
+                    logger.logger.error(
+                        f"YouTubeDownloader playlist entry Exception [{entry.get('title')}] {e}"
+                    )
+                    results[index] = 1
+
+            if tracker:
+                done = sum(1 for result in results.values() if not result)
+                tracker.header = f"{header}{done}/{len(entries)} ✔ {len(results) - done} ✖\n"
+                tracker.version += 1
+
+        async def refresh_entry(index):
+            entry = entries[index]
+            entry_url = entry.get("webpage_url") or entry.get("url")
+            if not entry_url:
+                return
+            self.invalidate_info(ydl_opts, entry_url)
+            try:
+                async with semaphore:
+                    entries[index] = await self.run(
+                        self._extract_info, dict(ydl_opts), entry_url
+                    )
+            except Exception as e:
+                logger.logger.error(
+                    f"YouTubeDownloader playlist entry extract Exception [{entry_url}] {e}"
                 )
-                await message.edit(f"ERROR: one or more videos not downloaded")
+
+        pending = list(range(len(entries)))
+        try:
+            for attempt in range(self.playlist_retries + 1):
+                if attempt:
+                    logger.logger.info(
+                        f"YouTubeDownloader playlist [{url}] retry {attempt}: {len(pending)} entries"
+                    )
+                    for index in pending:
+                        results.pop(index, None)
+                    self.invalidate_info(ydl_opts, url)
+                    await asyncio.gather(*[refresh_entry(index) for index in pending])
+                await asyncio.gather(*[download_entry(index) for index in pending])
+                pending = [index for index in pending if results.get(index)]
+                if not pending or cancel.is_set():
+                    break
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+        finally:
+            self.cancel_events.pop(message.id, None)
+            if tracker:
+                await tracker.close()
+
+        for index in pending:
+            logger.logger.info(
+                f"YouTubeDownloader playlist [{url}] not downloaded: {entries[index].get('title')}"
+            )
+        return len(pending)
+
+    async def fix_playlist_permissions(self, info_dict, youtube_path):
+        """
+        Corrige dueño y permisos de toda la carpeta de una lista de
+        reproducción (un vídeo suelto se corrige con su archivo)
+
+        Returns:
+            dict: Estadísticas de change_owner_permissions_tree, o None
+        """
+        if info_dict.get("_type") != "playlist":
+            return None
+        return await self.fs.change_owner_permissions_tree(youtube_path)
+
+    def permissions_text(self, permissions):
+        """Línea de permisos corregidos en el idioma configurado"""
+        if not self.templatesLanguage:
+            return ""
+        text = self.templatesLanguage.permissionsText(permissions)
+        return f"\n{text}" if text else ""
+
+    async def downloadVideo(self, url, message):
+        logger.logger.info(f"YouTubeDownloader downloadVideo [{url}] [{message}]")
+
+        YOUTUBE_VIDEO_FOLDER = os.path.join(
+            self.constants.get_variable("YOUTUBE_VIDEO_FOLDER")
+        )
+
+        info_dict = await self.get_info(self.ydl_opts_VIDEO, url)
+        file_name = await self.run(self._prepare_filename, self.ydl_opts_VIDEO, info_dict)
+        total_downloads = 1
+        youtube_path = YOUTUBE_VIDEO_FOLDER
+        await self.fs.change_owner_permissions(youtube_path)
+
+        if "_type" in info_dict and info_dict["_type"] == "playlist":
+            total_downloads = len(info_dict["entries"])
+            youtube_path = os.path.join(
+                YOUTUBE_VIDEO_FOLDER,
+                info_dict.get("uploader") or info_dict.get("channel") or "playlist",
+                info_dict["title"],
+            )
+        else:
+            youtube_path = os.path.join(YOUTUBE_VIDEO_FOLDER, info_dict["uploader"])
+
+        ydl_opts = {
+            "format": self.constants.get_variable("YOUTUBE_FORMAT_VIDEO"),
+            "outtmpl": f"{youtube_path}/%(title)s.%(ext)s",
+            "cachedir": "False",
+            "ignoreerrors": True,
+            "retries": 10,
+            "merge_output_format": self.constants.get_variable(
+                "YOUTUBE_DEFAULT_EXTENSION"
+            ).lower(),
+        }
+
+        tracker = self.track(message, info_dict)
+
+        logger.logger.info(f"DOWNLOADING VIDEO YOUTUBE [{url}] [{file_name}]")
+        await message.edit(f"downloading {total_downloads} videos...")
+        res_youtube = await self.download(ydl_opts, url, info_dict, message, tracker)
+        permissions = await self.fix_playlist_permissions(info_dict, youtube_path)
+
+        filename = os.path.basename(file_name)
+        final_file = os.path.join(youtube_path, filename)
+
+        if res_youtube == False:
+            await self.fs.run(os.chmod, youtube_path, 0o777)
+            logger.logger.info(
+                f"DOWNLOADED ==> {total_downloads} VIDEO YOUTUBE [{file_name}] [{youtube_path}][{filename}]"
+            )
+            end_time_short = time.strftime("%H:%M", time.localtime())
+            await message.edit(
+                f"Downloading finished {total_downloads} video at {end_time_short}\n{final_file}"
+                f"{self.permissions_text(permissions)}"
+            )
+            await self.fs.change_owner_permissions(final_file)
+        else:
+            logger.logger.info(
+                f"ERROR: ONE OR MORE YOUTUBE VIDEOS NOT DOWNLOADED [{total_downloads}] [{url}] [{youtube_path}]"
+            )
+            await message.edit(
+                f"ERROR: {res_youtube} of {total_downloads} videos not downloaded"
+                f"{self.permissions_text(permissions)}"
+            )
 
     async def downloadAudio(self, url, message):
         logger.logger.info(f"YouTubeDownloader downloadAudio [{url}] [{message}]")
@@ -110,70 +430,66 @@ class YouTubeDownloader:
         YOUTUBE_AUDIO_FOLDER = os.path.join(
             self.constants.get_variable("YOUTUBE_AUDIO_FOLDER")
         )
-        self.utils.create_folders(YOUTUBE_AUDIO_FOLDER)
-
-
-        with YoutubeDL(self.ydl_opts_AUDIO) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-            file_name = ydl.prepare_filename(info_dict)
-            total_downloads = 1
-            youtube_path = YOUTUBE_AUDIO_FOLDER
-            self.utils.change_owner_permissions(youtube_path)
-
-            if "_type" in info_dict and info_dict["_type"] == "playlist":
-                total_downloads = len(info_dict["entries"])
-                youtube_path = os.path.join(
-                    YOUTUBE_AUDIO_FOLDER,
-                    info_dict["uploader"],
-                    info_dict["title"],
-                )
-            else:
-                youtube_path = os.path.join(YOUTUBE_AUDIO_FOLDER, info_dict["uploader"])
+        await self.fs.create_folders(YOUTUBE_AUDIO_FOLDER)
 
-            ydl_opts = {
-                'extract_audio': True, 
-                'format': self.constants.get_variable('YOUTUBE_FORMAT_AUDIO'),
-                'outtmpl': f'{youtube_path}/%(title)s.%(ext)s',
-                'cachedir': 'False',
-                'ignoreerrors': True,
-                'retries': 10,
-                'postprocessors': [
-                    {
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '320',
-                    }
-                ],
-            }
-            ydl_opts.update(ydl_opts)
 
+        info_dict = await self.get_info(self.ydl_opts_AUDIO, url)
+        total_downloads = 1
+        youtube_path = YOUTUBE_AUDIO_FOLDER
+        await self.fs.change_owner_permissions(youtube_path)
+
+        if "_type" in info_dict and info_dict["_type"] == "playlist":
+            total_downloads = len(info_dict["entries"])
+            youtube_path = os.path.join(
+                YOUTUBE_AUDIO_FOLDER,
+                info_dict.get("uploader") or info_dict.get("channel") or "playlist",
+                info_dict["title"],
+            )
+        else:
+            youtube_path = os.path.join(YOUTUBE_AUDIO_FOLDER, info_dict["uploader"])
+
+        ydl_opts = {
+            'extract_audio': True, 
+            'format': self.constants.get_variable('YOUTUBE_FORMAT_AUDIO'),
+            'outtmpl': f'{youtube_path}/%(title)s.%(ext)s',
+            'cachedir': 'False',
+            'ignoreerrors': True,
+            'retries': 10,
+            'postprocessors': [
+                {
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '320',
+                }
+            ],
+        }
+
+        tracker = self.track(message, info_dict)
 
         logger.logger.info(f"downloadAudio [{url}] [{message}]")
 
+        file_name = await self.run(self._prepare_filename, ydl_opts, info_dict)
 
+        logger.logger.info(f"DOWNLOADING AUDIO YOUTUBE [{url}] [{file_name}]")
 
-        with YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=False)
-            file_name = ydl.prepare_filename(info_dict)
-
-            logger.logger.info(f"DOWNLOADING AUDIO YOUTUBE [{url}] [{file_name}]")
-            
-            file_name = (
-                ydl.prepare_filename(info_dict)[:-4] + ".mp3"
-                if ydl.prepare_filename(info_dict).endswith(".m4a")
-                else ydl.prepare_filename(info_dict)
-            )
-            await message.edit(f"downloading {total_downloads} audios...")
+        file_name = (
+            file_name[:-4] + ".mp3" if file_name.endswith(".m4a") else file_name
+        )
+        await message.edit(f"downloading {total_downloads} audios...")
 
-            res_youtube = ydl.download([url])
+        res_youtube = await self.download(ydl_opts, url, info_dict, message, tracker)
+        permissions = await self.fix_playlist_permissions(info_dict, youtube_path)
 
-            if res_youtube == False:
-                logger.logger.info(f"downloadAudio destination: [{file_name}]")
-                os.chmod(self.constants.get_variable("YOUTUBE_AUDIO_FOLDER"), 0o777)
-                end_time_short = time.strftime("%H:%M", time.localtime())
-                await message.edit(
-                    f"Downloading finished {total_downloads} audio at {end_time_short}\n{file_name}"
-                )
-                self.utils.change_owner_permissions(file_name)
-                return file_name
+        if res_youtube == False:
+            logger.logger.info(f"downloadAudio destination: [{file_name}]")
+            await self.fs.run(
+                os.chmod, self.constants.get_variable("YOUTUBE_AUDIO_FOLDER"), 0o777
+            )
+            end_time_short = time.strftime("%H:%M", time.localtime())
+            await message.edit(
+                f"Downloading finished {total_downloads} audio at {end_time_short}\n{file_name}"
+                f"{self.permissions_text(permissions)}"
+            )
+            await self.fs.change_owner_permissions(file_name)
+            return file_name
         return None